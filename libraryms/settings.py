@@ -49,20 +49,13 @@ INSTALLED_APPS = [
     'students',
 ]
 
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
 ROOT_URLCONF = 'libraryms.urls'
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, able to run in an async middleware chain under ASGI
+    'libraryms.middleware.WhiteNoiseMiddleware',
+    # After WhiteNoise, so static files are not timed
+    'students.performance.PerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,7 +69,7 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'students.performance.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -90,17 +83,114 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'libraryms.wsgi.application'
+ASGI_APPLICATION = 'libraryms.asgi.application'
+
+# Serve the read-heavy pages (dashboards, students, lockers, leads) from the
+# coroutines in students.async_views. Turn on when running under ASGI
+# (uvicorn workers); under WSGI each async view needs an event loop of its own.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Each gunicorn worker keeps its connection for DB_CONN_MAX_AGE seconds
+# instead of opening a new TCP+TLS connection per request, and checks it
+# still works before reusing it (0 closes it after every request).
+# DB_POOL=true uses a psycopg connection pool on PostgreSQL instead; keep
+# workers x DB_POOL_MAX_SIZE within the server's connection limit.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
 DATABASES = {
-        'default': dj_database_url.config(
-        default=config("DATABASE_URL")
+    'default': dj_database_url.config(
+        default=config("DATABASE_URL"),
+        conn_max_age=0 if DB_POOL else DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
     )
 }
 
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    # Pooled connections go back to the pool after each request, so they cannot also persist
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=4, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+    }
+
+# Trigram lookups used by students.search are only available on PostgreSQL
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# File-based by default so every gunicorn worker sees the same entries and
+# invalidations; set REDIS_URL (and install redis) to share it across hosts.
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=os.path.join(BASE_DIR, '.cache')),
+        }
+    }
+
+# Upper bound on how long students.cache entries live; signals normally
+# invalidate them much sooner
+STUDENTS_CACHE_TIMEOUT = config('STUDENTS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Students whose latest admission ends within this many days are shown as
+# "Expiring Soon" (see students.expiry.recompute_statuses)
+EXPIRING_SOON_DAYS = config('EXPIRING_SOON_DAYS', default=7, cast=int)
+
+
+# Request instrumentation (students.performance)
+# Share of requests timed, from 0 (off) to 1 (every request). Timed requests
+# fingerprint every query, so keep this low in production
+PERF_SAMPLE_RATE = config('PERF_SAMPLE_RATE', default=0.01, cast=float)
+
+# Timed requests slower than this are logged at WARNING rather than INFO
+PERF_SLOW_REQUEST_MS = config('PERF_SLOW_REQUEST_MS', default=1000, cast=int)
+
+# Queries of timed requests slower than this are logged by students.profiling
+# (0 turns it off)
+PERF_SLOW_QUERY_MS = config('PERF_SLOW_QUERY_MS', default=100, cast=int)
+
+# Lets a Prometheus scraper read /metrics/ with "Authorization: Bearer <token>"
+# instead of a staff login; empty disables token access
+PERF_METRICS_TOKEN = config('PERF_METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'students.performance': {
+            'handlers': ['console'],
+            'level': config('PERF_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+        'students.profiling': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,12 +1,16 @@
-from django.contrib import admin
-from .models import Student, Admission, Locker, Payment, ContactLead, TotalLockers
+from datetime import timedelta
+from django.contrib import admin, messages
+from django.db import transaction
+from django.utils import timezone
+from .models import Student, Admission, Locker, Payment, Charge, ContactLead, TotalLockers, AdmissionSweep, RevenueRollup, ExportJob, ImportJob, Seat, Slot
+from .lockers import LockerUnavailable, assign_lockers, release_lockers, set_lockers_available
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ['name', 'email', 'mobile', 'status', 'registration_fees', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['name', 'email', 'mobile', 'aadhaar_number']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['status', 'created_at', 'updated_at']  # status is derived from admissions
     fieldsets = (
         ('Personal Information', {
             'fields': ('name', 'email', 'mobile', 'date_of_birth', 'aadhaar_number', 'address', 'photo')
@@ -22,17 +26,41 @@ class StudentAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+    actions = ['assign_next_free_lockers']
+
+    @admin.action(description='Assign the next free locker to each selected student (30 days)')
+    def assign_next_free_lockers(self, request, queryset):
+        today = timezone.localdate()
+        try:
+            lockers = assign_lockers(queryset, start_date=today, end_date=today + timedelta(days=30))
+        except LockerUnavailable as e:
+            self.message_user(request, f'No lockers assigned: {e}', messages.ERROR)
+        else:
+            self.message_user(request, f'Assigned {len(lockers)} lockers.', messages.SUCCESS)
 
 @admin.register(Admission)
 class AdmissionAdmin(admin.ModelAdmin):
     list_display = ['student', 'seat_number', 'start_date', 'end_date', 'slot_timing', 'admission_fees']
+    list_select_related = ['student']
+    raw_id_fields = ['student', 'seat']
     list_filter = ['slot_timing', 'seat_type', 'start_date', 'end_date']
     search_fields = ['student__name', 'seat_number']
     readonly_fields = ['created_at', 'updated_at']
 
+@admin.register(Seat)
+class SeatAdmin(admin.ModelAdmin):
+    list_display = ['number', 'seat_type', 'is_active', 'created_at']
+    list_filter = ['seat_type', 'is_active']
+    search_fields = ['number']
+
+@admin.register(Slot)
+class SlotAdmin(admin.ModelAdmin):
+    list_display = ['name', 'start_time', 'end_time']
+
 @admin.register(Locker)
 class LockerAdmin(admin.ModelAdmin):
     list_display = ['total_locker_locker_number', 'student', 'required', 'start_date', 'end_date', 'monthly_fees']
+    list_select_related = ['student', 'total_locker']
     list_filter = ['required', 'start_date', 'end_date']
     search_fields = ['total_locker__locker_number', 'student__name']
     readonly_fields = ['created_at', 'updated_at']
@@ -42,14 +70,29 @@ class LockerAdmin(admin.ModelAdmin):
         return obj.total_locker.locker_number if obj.total_locker else ''
     total_locker_locker_number.short_description = 'Locker Number'
 
+    def delete_queryset(self, request, queryset):
+        # A bulk delete skips Locker.delete(), which frees the locker
+        with transaction.atomic():
+            release_lockers(queryset)
+            queryset.delete()
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ['student', 'amount', 'payment_date', 'payment_mode', 'payment_type']
+    list_select_related = ['student']
     list_filter = ['payment_mode', 'payment_type', 'payment_date']
     search_fields = ['student__name']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'payment_date'
 
+@admin.register(Charge)
+class ChargeAdmin(admin.ModelAdmin):
+    list_display = ['student', 'kind', 'amount', 'start_date', 'end_date', 'reference']
+    list_select_related = ['student']
+    list_filter = ['kind']
+    search_fields = ['student__name', 'reference']
+    readonly_fields = ['student', 'kind', 'amount', 'start_date', 'end_date', 'reference', 'created_at']
+
 @admin.register(ContactLead)
 class ContactLeadAdmin(admin.ModelAdmin):
     list_display = ['name', 'email', 'mobile', 'status', 'created_at']
@@ -59,8 +102,41 @@ class ContactLeadAdmin(admin.ModelAdmin):
 
 @admin.register(TotalLockers)
 class TotalLockersAdmin(admin.ModelAdmin):
-    list_display = ['locker_number', 'is_available', 'created_at', 'updated_at']
-    list_filter = ['is_available', 'created_at']
+    list_display = ['locker_number', 'is_available', 'retired', 'created_at', 'updated_at']
+    list_filter = ['is_available', 'retired', 'created_at']
     search_fields = ['locker_number']
     readonly_fields = ['created_at', 'updated_at']
-    actions = ['make_available', 'make_unavailable']
\ No newline at end of file
+    actions = ['make_available', 'make_unavailable']
+
+    @admin.action(description='Enable selected lockers')
+    def make_available(self, request, queryset):
+        changed = set_lockers_available(queryset, True)
+        self.message_user(request, f'{changed} lockers enabled. Lockers assigned to a student stay unavailable.')
+
+    @admin.action(description='Retire selected lockers')
+    def make_unavailable(self, request, queryset):
+        changed = set_lockers_available(queryset, False)
+        self.message_user(request, f'{changed} lockers retired.')
+
+@admin.register(AdmissionSweep)
+class AdmissionSweepAdmin(admin.ModelAdmin):
+    list_display = ['ran_at', 'swept_through', 'admissions_deleted', 'lockers_released', 'students_deactivated']
+    readonly_fields = ['ran_at', 'swept_through', 'admissions_deleted', 'lockers_released', 'students_deactivated']
+
+@admin.register(RevenueRollup)
+class RevenueRollupAdmin(admin.ModelAdmin):
+    list_display = ['month', 'payment_type', 'payment_mode', 'total_amount', 'payment_count']
+    list_filter = ['payment_type', 'payment_mode']
+    readonly_fields = ['month', 'payment_type', 'payment_mode', 'total_amount', 'payment_count', 'updated_at']
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'format', 'status', 'rows_written', 'rows_total', 'created_by', 'created_at']
+    list_filter = ['kind', 'format', 'status']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'rows_imported', 'rows_failed', 'rows_total', 'created_by', 'created_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
@@ -0,0 +1,76 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+from .cache import afragment_context
+from .kpis import acached_revenue_totals, acached_student_counts
+from .models import ContactLead, Payment
+from .pagination import KeysetPaginator, aestimate_count
+from .search import filter_students, substring_fallback
+from .views import (
+    dashboard_context, finance_context, locker_querysets, students_list_context, students_list_filters, substring_search,
+)
+
+# Async versions of the read-heavy pages, routed instead of their views.py
+# counterparts when settings.ASYNC_VIEWS is on. Independent queries run
+# together; context building is shared so both render the same page.
+
+# Templates read request.user and messages lazily, which can query, so
+# rendering runs in a thread like any other sync code
+arender = sync_to_async(render)
+
+
+@login_required
+async def dashboard(request):
+    revenue, counts = await asyncio.gather(acached_revenue_totals(), acached_student_counts())
+    return await arender(request, 'dashboard.html', dashboard_context(revenue, counts))
+
+
+@login_required
+async def students_list(request):
+    filters = students_list_filters(request)
+    page_obj, fragment = await asyncio.gather(
+        KeysetPaginator(filter_students(*filters), 10).aget_page(request.GET), afragment_context('students'),
+    )
+    if not page_obj and substring_fallback(*filters[2:]):
+        filters = substring_search(request)
+        page_obj = await KeysetPaginator(filter_students(*filters), 10).aget_page(request.GET)
+    context = {**students_list_context(request, page_obj), **fragment}
+    return await arender(request, 'students/list.html', context)
+
+
+@login_required
+async def contact_leads(request):
+    page_obj = await KeysetPaginator(ContactLead.objects.all(), 20).aget_page(request.GET)
+    return await arender(request, 'leads/list.html', {'leads': page_obj})
+
+
+async def _recent_payments():
+    return [payment async for payment in Payment.objects.select_related('student')[:10]]
+
+
+@login_required
+async def finance_dashboard(request):
+    revenue, recent_payments, fragment = await asyncio.gather(
+        acached_revenue_totals(), _recent_payments(), afragment_context('payments', 'students'),
+    )
+    context = {**finance_context(revenue, recent_payments), **fragment}
+    return await arender(request, 'finance/dashboard.html', context)
+
+
+@login_required
+async def lockers_list(request):
+    search_query = request.GET.get('q', '')
+    assigned_lockers, available_lockers = locker_querysets(search_query)
+    page_obj_assigned, available_count, fragment = await asyncio.gather(
+        KeysetPaginator(assigned_lockers, 10).aget_page(request.GET),
+        aestimate_count(available_lockers),
+        afragment_context('lockers', 'students'),
+    )
+    context = {
+        'assigned_lockers': page_obj_assigned,
+        'available_count': available_count,
+        'search_query': search_query,
+        **fragment,
+    }
+    return await arender(request, 'lockers/list.html', context)
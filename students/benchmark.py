@@ -0,0 +1,392 @@
+import asyncio
+import copy
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from importlib import import_module, reload
+import django
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+from . import urls
+from .models import Student, Admission, Locker, Payment, ContactLead, ExportJob, ImportJob, Slot
+
+# Views that would end the benchmark's session
+SKIPPED = {'logout'}
+
+# Extra query strings measured for a view, besides the bare URL
+VARIANTS = {
+    'students_list': ['filter=active', 'filter=expiring', 'filter=reserved&hours=6', 'q=Sharma', 'q=98'],
+    'lockers_list': ['q=G00'],
+}
+
+# Pages with an async version in students.async_views
+ASYNC_PAGES = ['dashboard', 'students_list', 'lockers_list', 'contact_leads', 'finance_dashboard']
+
+# Connection settings compared by connection_overhead
+CONNECTION_MODES = {
+    'fresh': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'pool': True},
+}
+
+
+def _percentile(cuts, p):
+    return round(cuts[p - 1], 2)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def _staff_user():
+    user, _ = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True})
+    return user
+
+
+class Harness:
+    """
+    Drives every GET view in ``students.urls`` through the test client as a
+    logged-in staff user and records latency percentiles, queries per
+    request and the peak Python memory allocated while serving one request.
+    """
+
+    def __init__(self, requests=20, warmup=1, cold=False, only=None):
+        self.requests = requests
+        self.warmup = warmup
+        self.cold = cold
+        self.only = set(only or [])
+        self.client = Client(raise_request_exception=False)
+        self.client.force_login(_staff_user())
+
+    def _samples(self):
+        """Primary keys to fill URL arguments with, by argument name."""
+        student = Student.objects.filter(admissions__isnull=False).order_by('-pk').first() or Student.objects.first()
+        return {
+            'student_id': student and student.pk,
+            'locker_id': Locker.objects.values_list('pk', flat=True).first(),
+            'payment_id': Payment.objects.values_list('pk', flat=True).first(),
+            'export:job_id': ExportJob.objects.filter(status='Done').values_list('pk', flat=True).first(),
+            'import:job_id': ImportJob.objects.exclude(error_report='').values_list('pk', flat=True).first(),
+        }
+
+    def _required_query(self, name):
+        # Query strings a view cannot answer without
+        if name == 'seats_available':
+            slot = Slot.objects.first()
+            if slot is None:
+                return None
+            today = timezone.localdate()
+            return f'start_date={today}&end_date={today + timedelta(days=30)}&slot={slot.pk}'
+        return ''
+
+    def targets(self):
+        """``(name, url, skip reason)`` for every route in urls.py order, plus VARIANTS."""
+        samples = self._samples()
+        for pattern in urls.urlpatterns:
+            name = pattern.name
+            if name in SKIPPED or (self.only and name not in self.only):
+                continue
+            kwargs = {}
+            for arg in pattern.pattern.converters:
+                key = f'{name.split("_")[0]}:{arg}' if arg == 'job_id' else arg
+                kwargs[arg] = samples.get(key)
+            missing = [arg for arg, value in kwargs.items() if value is None]
+            query = self._required_query(name)
+            if missing or query is None:
+                yield name, None, f'no sample row for {", ".join(missing) or "the query string"}'
+                continue
+            url = reverse(name, kwargs=kwargs)
+            yield name, f'{url}?{query}' if query else url, ''
+            for variant in VARIANTS.get(name, []):
+                yield f'{name}?{variant}', f'{url}?{variant}', ''
+
+    def _get(self, url):
+        response = self.client.get(url)
+        if response.streaming:
+            # Time the whole download, not just the first chunk
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def measure(self, url):
+        for _ in range(self.warmup):
+            self._get(url)
+
+        latencies, queries = [], []
+        for _ in range(self.requests):
+            if self.cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = self._get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+
+        # A separate request under tracemalloc, which slows everything it traces
+        if self.cold:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            self._get(url)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+        return {
+            'status': response.status_code,
+            'requests': len(latencies),
+            'p50_ms': _percentile(cuts, 50),
+            'p95_ms': _percentile(cuts, 95),
+            'p99_ms': _percentile(cuts, 99),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'max_ms': round(max(latencies), 2),
+            'queries': max(queries),
+            'peak_memory_kib': round(peak / 1024, 1),
+        }
+
+    def run(self, progress=None):
+        results = {}
+        for name, url, reason in self.targets():
+            if url is None:
+                results[name] = {'skipped': reason}
+            else:
+                results[name] = {'url': url, **self.measure(url)}
+            if progress:
+                progress(name, results[name])
+        return {
+            'meta': {
+                'commit': _git_commit(),
+                'date': date.today().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'requests': self.requests,
+                'cold_cache': self.cold,
+                'rows': {
+                    str(model._meta.verbose_name_plural): model.objects.count()
+                    for model in (Student, Admission, Locker, Payment, ContactLead)
+                },
+            },
+            'results': results,
+        }
+
+
+def compare(baseline, current, threshold):
+    """
+    ``(name, metric, before, after)`` for every view whose p95 latency grew by
+    more than ``threshold`` percent or that now runs more queries.
+    """
+    regressions = []
+    for name, after in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before or 'skipped' in before or 'skipped' in after:
+            continue
+        if after['p95_ms'] > before['p95_ms'] * (1 + threshold / 100):
+            regressions.append((name, 'p95_ms', before['p95_ms'], after['p95_ms']))
+        if after['queries'] > before['queries']:
+            regressions.append((name, 'queries', before['queries'], after['queries']))
+    return regressions
+
+
+def load(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def _pool_supported(db):
+    if db.vendor != 'postgresql':
+        return False
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+@contextmanager
+def _connection_mode(db, mode):
+    """Reconnect ``db`` with the settings of ``mode``, restoring its own afterwards."""
+    original = copy.deepcopy(db.settings_dict)
+    changes = dict(CONNECTION_MODES[mode])
+    options = {key: value for key, value in original.get('OPTIONS', {}).items() if key != 'pool'}
+    if changes.pop('pool', False):
+        options['pool'] = True
+    db.close()
+    db.settings_dict.update(changes, OPTIONS=options)
+    try:
+        yield
+    finally:
+        db.close()
+        if hasattr(db, 'close_pool'):
+            db.close_pool()
+        db.settings_dict.clear()
+        db.settings_dict.update(original)
+
+
+def connection_overhead(cycles=200, modes=tuple(CONNECTION_MODES), using=DEFAULT_DB_ALIAS):
+    """
+    Time ``cycles`` bare request cycles per connection mode: the
+    request_started and request_finished signals that open, check and
+    recycle connections around a ``SELECT 1``. The gap between "fresh" and
+    the other modes is what connecting costs each request. "pool" needs
+    PostgreSQL with psycopg[pool] and is skipped elsewhere.
+    """
+    db = connections[using]
+    if db.in_atomic_block:
+        raise RuntimeError('Connections are never recycled inside a transaction; run this outside one.')
+    results = {}
+    for mode in modes:
+        if mode == 'pool' and not _pool_supported(db):
+            results[mode] = {'skipped': 'needs PostgreSQL with psycopg[pool]'}
+            continue
+        connects = []
+
+        def count(sender, connection, **kwargs):
+            if connection.alias == using:
+                connects.append(1)
+
+        latencies = []
+        connection_created.connect(count)
+        try:
+            with _connection_mode(db, mode):
+                for _ in range(cycles):
+                    started = time.perf_counter()
+                    request_started.send(sender=__name__)
+                    with db.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                        cursor.fetchone()
+                    request_finished.send(sender=__name__)
+                    latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection_created.disconnect(count)
+
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+        results[mode] = {
+            'cycles': cycles,
+            'p50_ms': _percentile(cuts, 50),
+            'p95_ms': _percentile(cuts, 95),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'connects': len(connects),
+        }
+    return {'database': db.vendor, 'results': results}
+
+
+@contextmanager
+def views_mode(async_views):
+    """Route the pages in ASYNC_PAGES to their async or sync views until exit."""
+    try:
+        with override_settings(ASYNC_VIEWS=async_views):
+            _reload_urls()
+            yield
+    finally:
+        _reload_urls()
+
+
+def _reload_urls():
+    # students.urls picks the views when it is imported, and the root URLconf
+    # keeps the resolver built from it
+    reload(urls)
+    reload(import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+def _summary(latencies, elapsed, errors):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': _percentile(cuts, 50),
+        'p95_ms': _percentile(cuts, 95),
+    }
+
+
+def _wsgi_run(paths, concurrency):
+    """Every path once, ``concurrency`` at a time, from threads like gthread workers."""
+    user = _staff_user()
+
+    def logged_in():
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        return client
+
+    def worker(client, chunk):
+        timed = []
+        try:
+            for path in chunk:
+                started = time.perf_counter()
+                status = client.get(path).status_code
+                timed.append(((time.perf_counter() - started) * 1000, status))
+        finally:
+            connections.close_all()
+        return timed
+
+    # Log in up front: session writes from several threads at once lock SQLite
+    clients = [logged_in() for _ in range(concurrency)]
+    chunks = [paths[i::concurrency] for i in range(concurrency)]
+    with ThreadPoolExecutor(concurrency) as pool:
+        return [result for timed in pool.map(worker, clients, chunks) for result in timed]
+
+
+def _asgi_run(paths, concurrency):
+    """Every path once, ``concurrency`` at a time, as coroutines on one event loop."""
+    client = AsyncClient(raise_request_exception=False)
+    client.force_login(_staff_user())
+
+    async def worker(chunk):
+        timed = []
+        for path in chunk:
+            started = time.perf_counter()
+            status = (await client.get(path)).status_code
+            timed.append(((time.perf_counter() - started) * 1000, status))
+        return timed
+
+    async def run():
+        results = await asyncio.gather(*(worker(paths[i::concurrency]) for i in range(concurrency)))
+        return [result for timed in results for result in timed]
+
+    # async_to_sync runs the ORM's thread-sensitive calls back on this thread and its connection
+    return async_to_sync(run)()
+
+
+def concurrency_throughput(requests=200, concurrency=10, pages=ASYNC_PAGES):
+    """
+    Serve ``requests`` GETs spread over ``pages`` through the WSGI handler with
+    sync views on ``concurrency`` threads, then through the ASGI handler with
+    the async views as ``concurrency`` coroutines. Returns requests per
+    second and latency for each.
+    """
+    paths = [reverse(name) for name in pages] * (requests // len(pages) + 1)
+    paths = paths[:requests]
+    results = {}
+    for mode, async_views, run in (('wsgi', False, _wsgi_run), ('asgi', True, _asgi_run)):
+        with views_mode(async_views):
+            run(paths[:len(pages)], 1)  # warm-up
+            started = time.perf_counter()
+            timed = run(paths, concurrency)
+            elapsed = time.perf_counter() - started
+        errors = sum(1 for _, status in timed if status >= 400)
+        results[mode] = _summary([latency for latency, _ in timed], elapsed, errors)
+    return {'concurrency': concurrency, 'database': connection.vendor, 'results': results}
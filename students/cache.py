@@ -0,0 +1,92 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# What each namespace covers. A cached value lists the namespaces it reads
+# and its key embeds their current versions, so bumping a version makes
+# every dependent entry unreachable without having to find and delete it.
+#   students    Student rows (status counts, list pages and filters, names)
+#   admissions  Admission rows (seat bookings, occupancy)
+#   lockers     Locker and TotalLockers rows
+#   payments    Payment and RevenueRollup rows
+#   seats       Seat rows (occupancy heatmap)
+#   slots       Slot rows (the heatmap's opening hours)
+
+
+def _version_key(namespace):
+    return f'students:version:{namespace}'
+
+
+def version(*namespaces):
+    """Combined version string for ``namespaces``, e.g. ``'17.3'``."""
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        # Seed from the clock so an evicted counter never reuses an old version
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+async def aversion(*namespaces):
+    """version() for async views."""
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = await cache.aget_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, None)
+        versions.update(missing)
+    return '.'.join(str(versions[key]) for key in keys)
+
+
+def bump(*namespaces):
+    for namespace in namespaces:
+        try:
+            cache.incr(_version_key(namespace))
+        except ValueError:
+            cache.set(_version_key(namespace), time.time_ns(), None)
+
+
+def invalidate(*namespaces):
+    """
+    Bump ``namespaces`` once the current transaction commits, so a reader can
+    never cache pre-commit data under the new version.
+    """
+    transaction.on_commit(lambda: bump(*namespaces))
+
+
+def cached(namespaces, key, compute):
+    """Return the cached result of ``compute()`` for ``key`` under the current versions."""
+    full_key = f'students:{key}:{version(*namespaces)}'
+    value = cache.get(full_key)
+    if value is None:
+        value = compute()
+        cache.set(full_key, value, settings.STUDENTS_CACHE_TIMEOUT)
+    return value
+
+
+async def acached(namespaces, key, compute):
+    """cached() for async views; ``compute`` is a coroutine function."""
+    full_key = f'students:{key}:{await aversion(*namespaces)}'
+    value = await cache.aget(full_key)
+    if value is None:
+        value = await compute()
+        await cache.aset(full_key, value, settings.STUDENTS_CACHE_TIMEOUT)
+    return value
+
+
+def fragment_context(*namespaces):
+    """Template context for ``{% cache cache_timeout name cache_version ... %}`` blocks."""
+    return {
+        'cache_version': version(*namespaces),
+        'cache_timeout': settings.STUDENTS_CACHE_TIMEOUT,
+    }
+
+
+async def afragment_context(*namespaces):
+    return {
+        'cache_version': await aversion(*namespaces),
+        'cache_timeout': settings.STUDENTS_CACHE_TIMEOUT,
+    }
@@ -0,0 +1,109 @@
+from decimal import Decimal
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, ExtractDay, ExtractMonth, ExtractYear
+from .cache import invalidate
+from .models import Student, Admission, Locker, Payment, Charge
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Value(Decimal('0.00'), output_field=MONEY)
+
+
+def locker_months():
+    """
+    Months billed for a locker: every month started between its start and
+    end dates, so 1 Jan - 31 Jan is one month and 15 Jan - 15 Feb is two.
+    Built from EXTRACT so every backend evaluates it in SQL.
+    """
+    return (
+        (ExtractYear('end_date') - ExtractYear('start_date')) * 12
+        + ExtractMonth('end_date') - ExtractMonth('start_date')
+        + Case(When(end_date__day__gte=ExtractDay('start_date'), then=Value(1)), default=Value(0))
+    )
+
+
+def _total(model, amount):
+    # Correlated SUM per student; a join would multiply rows across the three tables
+    rows = model.objects.filter(student=OuterRef('pk')).order_by().values('student')
+    return Coalesce(Subquery(rows.annotate(total=Sum(amount, output_field=MONEY)).values('total')), ZERO)
+
+
+def locker_fees():
+    return ExpressionWrapper(F('security_fees') + F('monthly_fees') * locker_months(), output_field=MONEY)
+
+
+def _fees():
+    expected = (
+        F('registration_fees')
+        + _total(Admission, 'admission_fees')
+        + _total(Locker, locker_fees())
+        + _total(Charge, 'amount')
+    )
+    return expected, _total(Payment, 'amount')
+
+
+def balance_expression():
+    """What a student still owes, as an expression on Student."""
+    expected, paid = _fees()
+    return expected - paid
+
+
+def with_dues(students):
+    """Annotate ``students`` with ``fees_expected``, ``fees_paid`` and ``fees_due`` in the same query."""
+    expected, paid = _fees()
+    return students.annotate(
+        fees_expected=expected, fees_paid=paid,
+    ).annotate(fees_due=F('fees_expected') - F('fees_paid'))
+
+
+def close_charges(admissions=None, lockers=None):
+    """
+    Record the fees of the ``admissions`` and ``lockers`` querysets, which
+    are about to be deleted because they ended, were replaced or were
+    removed by hand, as Charge rows: the balance then keeps counting what
+    was paid for them. Call in the transaction that deletes them. Returns
+    the number of charges written.
+    """
+    charges = []
+    sources = (
+        ('Admission', admissions, F('admission_fees'), F('seat_number')),
+        ('Locker', lockers, locker_fees(), F('total_locker__locker_number')),
+    )
+    for kind, rows, fees, reference in sources:
+        if rows is None:
+            continue
+        rows = rows.order_by().annotate(fees=fees, reference=reference).values_list(
+            'student_id', 'fees', 'start_date', 'end_date', 'reference',
+        )
+        charges += [
+            Charge(student_id=student_id, kind=kind, amount=amount, start_date=start, end_date=end, reference=ref)
+            for student_id, amount, start, end, ref in rows
+        ]
+    Charge.objects.bulk_create(charges, batch_size=500)
+    return len(charges)
+
+
+def refresh_balances(student_ids=None):
+    """
+    Recompute the stored ``balance_due`` of every student, or only
+    ``student_ids``, with one UPDATE. Call in the transaction that changed
+    their fees or payments. Returns the number of rows written.
+    """
+    balance = balance_expression()
+    students = Student.objects.all() if student_ids is None else Student.objects.filter(id__in=student_ids)
+    updated = students.exclude(balance_due=balance).update(balance_due=balance)
+    if updated:
+        invalidate('students')
+    return updated
+
+
+def find_drift():
+    """Students whose stored balance differs from a fresh computation, as ``(id, stored, expected)``."""
+    return list(
+        Student.objects.annotate(expected=balance_expression()).exclude(balance_due=F('expected'))
+        .order_by('pk').values_list('pk', 'balance_due', 'expected')
+    )
+
+
+def students_owing():
+    """Students who owe money, largest balance first; served by the partial defaulters index."""
+    return Student.objects.filter(balance_due__gt=0).order_by('-balance_due')
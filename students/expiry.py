@@ -0,0 +1,102 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Student, Admission, Locker, TotalLockers, AdmissionSweep
+from .cache import invalidate
+from .dues import close_charges, refresh_balances
+
+
+def expired_admissions(today, last_sweep=None):
+    """Admissions that ended before ``today`` and were not seen by ``last_sweep``."""
+    expired = Admission.objects.filter(end_date__lt=today)
+    if last_sweep is not None:
+        # Everything that ended before the previous cutoff was already removed,
+        # unless it was created or back-dated after that run.
+        expired = expired.filter(
+            Q(end_date__gte=last_sweep.swept_through) |
+            Q(updated_at__gte=last_sweep.ran_at)
+        )
+    return expired
+
+
+def sweep_expired_admissions(today=None):
+    """
+    Expire finished admissions with a handful of set-based statements:
+    record their fees and the lockers' as charges, release the lockers,
+    delete the admissions and recompute every student's status. Returns the ``AdmissionSweep`` row recording the run.
+    """
+    today = today or timezone.localdate()
+
+    with transaction.atomic():
+        last_sweep = AdmissionSweep.objects.select_for_update().first()
+        expired = expired_admissions(today, last_sweep)
+        student_ids = list(expired.order_by().values_list('student_id', flat=True).distinct())
+
+        if student_ids:
+            lockers = Locker.objects.filter(student_id__in=student_ids)
+            close_charges(expired, lockers)
+            TotalLockers.objects.filter(
+                assigned_locker__student_id__in=student_ids, retired=False,
+            ).update(is_available=True, updated_at=timezone.now())
+            lockers_released, _ = lockers.delete()
+            admissions_deleted, _ = expired.delete()
+            refresh_admission_summaries(student_ids)
+            refresh_balances(student_ids)
+            invalidate('students', 'admissions', 'lockers')
+        else:
+            lockers_released = admissions_deleted = 0
+
+        # Every run re-derives all statuses, so students cross into
+        # "Expiring Soon" as the days pass without any write of their own
+        students_deactivated, _ = recompute_statuses(today=today)
+
+        return AdmissionSweep.objects.create(
+            swept_through=today,
+            admissions_deleted=admissions_deleted,
+            lockers_released=lockers_released,
+            students_deactivated=students_deactivated,
+        )
+
+
+def refresh_admission_summaries(student_ids=None):
+    """
+    Copy each student's latest admission (by end date) onto the Student row,
+    or clear the copy when none is left, in one UPDATE over every student
+    or only ``student_ids``. Call in the transaction that changed the admissions.
+    """
+    latest = Admission.objects.filter(student=OuterRef('pk')).order_by('-end_date', '-pk')
+    students = Student.objects.all() if student_ids is None else Student.objects.filter(id__in=student_ids)
+    updated = students.update(
+        current_seat_type=Coalesce(Subquery(latest.values('seat_type')[:1]), Value('')),
+        current_hours=Coalesce(Subquery(latest.values('hours')[:1]), Value('')),
+        current_seat_number=Coalesce(Subquery(latest.values('seat_number')[:1]), Value('')),
+        current_end_date=Subquery(latest.values('end_date')[:1]),
+    )
+    invalidate('students')
+    return updated
+
+
+def recompute_statuses(student_ids=None, today=None):
+    """
+    Derive each student's status from their latest admission end date:
+    Active past ``EXPIRING_SOON_DAYS`` from ``today``, Expiring Soon up to
+    then, Inactive once it has passed or with no admission at all. Two
+    single-table UPDATE statements cover every student (or only
+    ``student_ids``) and only rewrite rows whose status changes.
+    Returns ``(deactivated, changed)``.
+    """
+    today = today or timezone.localdate()
+    soon = today + timedelta(days=settings.EXPIRING_SOON_DAYS)
+    current = Q(current_end_date__gte=today)
+    status = Case(When(current_end_date__gt=soon, then=Value('Active')), default=Value('Expiring Soon'))
+    students = Student.objects.all() if student_ids is None else Student.objects.filter(id__in=student_ids)
+    now = timezone.now()
+
+    deactivated = students.exclude(current).exclude(status='Inactive').update(status='Inactive', updated_at=now)
+    changed = students.filter(current).exclude(status=status).update(status=status, updated_at=now)
+    if deactivated or changed:
+        invalidate('students')
+    return deactivated, changed
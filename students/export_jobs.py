@@ -0,0 +1,133 @@
+import csv
+import gzip
+import json
+import os
+import uuid
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from .models import Payment, TotalLockers, ExportJob
+from .search import filter_students
+from . import exports
+
+
+def _students(params):
+    return filter_students(
+        params.get('filter', 'all'), params.get('hours', ''), params.get('q', ''), params.get('match') == 'substring',
+    )
+
+
+def _payments(params):
+    return Payment.objects.all()
+
+
+def _lockers(params):
+    return TotalLockers.objects.all()
+
+
+# kind -> (queryset builder, chunk iterator, header, row builder)
+EXPORTERS = {
+    'students': (_students, exports.iter_chunks, exports.STUDENT_HEADER, exports.student_row),
+    'payments': (_payments, exports.payment_chunks, exports.PAYMENT_HEADER, exports.payment_row),
+    'lockers': (_lockers, exports.locker_chunks, exports.LOCKER_HEADER, exports.locker_row),
+}
+
+
+class CsvWriter:
+    def __init__(self, handle, header):
+        self.writer = csv.writer(handle)
+        self.writer.writerow(header)
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+
+class NdjsonWriter:
+    def __init__(self, handle, header):
+        self.handle = handle
+        self.header = header
+
+    def write(self, row):
+        self.handle.write(json.dumps(dict(zip(self.header, row)), cls=DjangoJSONEncoder))
+        self.handle.write('\n')
+
+
+def _open(path, export_format):
+    if export_format == 'csv.gz':
+        return gzip.open(path, 'wt', newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def create_job(kind, export_format, params=None, user=None):
+    if kind not in EXPORTERS:
+        raise ValueError(f'Unknown export kind: {kind}')
+    if export_format not in dict(ExportJob.FORMAT_CHOICES):
+        raise ValueError(f'Unknown export format: {export_format}')
+    return ExportJob.objects.create(kind=kind, format=export_format, params=params or {}, created_by=user)
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to Running. The conditional
+    UPDATE makes it safe to run several workers against one database.
+    """
+    while True:
+        job = ExportJob.objects.filter(status='Queued').order_by('created_at').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = ExportJob.objects.filter(pk=job.pk, status='Queued').update(
+            status='Running', started_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def requeue_stale_jobs(stale_after):
+    """
+    Put Running jobs whose worker has not recorded progress for
+    ``stale_after`` (a timedelta) back in the queue, so exports orphaned by a
+    crashed or redeployed worker are picked up again. Returns how many.
+    """
+    cutoff = timezone.now() - stale_after
+    stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    return ExportJob.objects.filter(stale, status='Running').update(
+        status='Queued', started_at=None, heartbeat_at=None, rows_total=0, rows_written=0,
+    )
+
+
+def run_job(job):
+    """Write the export file for ``job``, recording progress after every chunk."""
+    build_queryset, chunks, header, build_row = EXPORTERS[job.kind]
+    queryset = build_queryset(job.params)
+    name = f'exports/{job.kind}_{job.pk}_{uuid.uuid4().hex}.{job.format}'
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    try:
+        rows_total = queryset.count()
+        ExportJob.objects.filter(pk=job.pk).update(rows_total=rows_total)
+        rows_written = 0
+        with _open(path + '.part', job.format) as handle:
+            writer = NdjsonWriter(handle, header) if job.format == 'ndjson' else CsvWriter(handle, header)
+            for chunk in chunks(queryset):
+                for obj in chunk:
+                    writer.write(build_row(obj))
+                rows_written += len(chunk)
+                ExportJob.objects.filter(pk=job.pk).update(rows_written=rows_written, heartbeat_at=timezone.now())
+        os.replace(path + '.part', path)
+    except Exception as e:
+        if os.path.exists(path + '.part'):
+            os.remove(path + '.part')
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='Failed', error=str(e), finished_at=timezone.now(),
+        )
+    else:
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='Done', file=name, rows_written=rows_written, finished_at=timezone.now(),
+        )
+    job.refresh_from_db()
+    return job
+
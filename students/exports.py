@@ -0,0 +1,168 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, prefetch_related_objects
+from .models import Locker
+
+CHUNK_SIZE = 500
+
+STUDENT_HEADER = [
+    'ID', 'Name', 'Email', 'Mobile', 'Date of Birth', 'Aadhaar Number', 'Address',
+    'Father Name', 'Mother Name', 'Parent Mobile', 'Registration Fees', 'Status',
+    'Date Added', 'Photo URL', 'Admissions', 'Lockers', 'Payments'
+]
+
+
+def _date(value):
+    return value.strftime('%Y-%m-%d') if value else ''
+
+
+def keyset_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Walk ``queryset`` in primary-key order, ``chunk_size`` rows at a time,
+    using keyset pagination so every chunk is an indexed range read.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Student chunks with admissions, lockers (with their TotalLockers) and
+    payments prefetched per chunk, so memory stays bounded by the chunk size.
+    """
+    for chunk in keyset_chunks(queryset, chunk_size):
+        prefetch_related_objects(
+            chunk,
+            'admissions',
+            Prefetch('lockers', queryset=Locker.objects.select_related('total_locker')),
+            'payments',
+        )
+        yield chunk
+
+
+def student_row(student):
+    admissions_data = json.dumps([
+        {
+            'start_date': _date(a.start_date),
+            'end_date': _date(a.end_date),
+            'hours': a.hours,
+            'slot_timing': a.slot_timing,
+            'seat_number': a.seat_number,
+            'seat_type': a.seat_type,
+            'admission_fees': str(a.admission_fees)
+        } for a in student.admissions.all()
+    ], cls=DjangoJSONEncoder)
+
+    lockers_data = json.dumps([
+        {
+            'required': l.required,
+            'security_fees': str(l.security_fees),
+            'start_date': _date(l.start_date),
+            'end_date': _date(l.end_date),
+            'locker_number': l.total_locker.locker_number,
+            'monthly_fees': str(l.monthly_fees)
+        } for l in student.lockers.all()
+    ], cls=DjangoJSONEncoder)
+
+    payments_data = json.dumps([
+        {
+            'amount': str(p.amount),
+            'payment_date': _date(p.payment_date),
+            'payment_mode': p.payment_mode,
+            'payment_type': p.payment_type,
+            'remarks': p.remarks
+        } for p in student.payments.all()
+    ], cls=DjangoJSONEncoder)
+
+    return [
+        student.id,
+        student.name,
+        student.email,
+        student.mobile,
+        _date(student.date_of_birth),
+        student.aadhaar_number,
+        student.address,
+        student.father_name,
+        student.mother_name,
+        student.parent_mobile,
+        str(student.registration_fees),
+        student.status,
+        student.created_at.strftime('%Y-%m-%d'),
+        student.photo.url if student.photo else '',
+        admissions_data,
+        lockers_data,
+        payments_data
+    ]
+
+
+PAYMENT_HEADER = [
+    'ID', 'Student ID', 'Student Name', 'Amount', 'Payment Date', 'Payment Mode',
+    'Payment Type', 'Remarks'
+]
+
+
+def payment_row(payment):
+    return [
+        payment.id,
+        payment.student_id,
+        payment.student.name,
+        str(payment.amount),
+        _date(payment.payment_date),
+        payment.payment_mode,
+        payment.payment_type,
+        payment.remarks or '',
+    ]
+
+
+def payment_chunks(queryset, chunk_size=CHUNK_SIZE):
+    return keyset_chunks(queryset.select_related('student'), chunk_size)
+
+
+LOCKER_HEADER = [
+    'Locker Number', 'Available', 'Student ID', 'Student Name', 'Required',
+    'Security Fees', 'Start Date', 'End Date', 'Monthly Fees'
+]
+
+
+def locker_row(total_locker):
+    locker = getattr(total_locker, 'assigned_locker', None)
+    if locker is None:
+        return [total_locker.locker_number, total_locker.is_available, '', '', '', '', '', '', '']
+    return [
+        total_locker.locker_number,
+        total_locker.is_available,
+        locker.student_id,
+        locker.student.name,
+        locker.required,
+        str(locker.security_fees),
+        _date(locker.start_date),
+        _date(locker.end_date),
+        str(locker.monthly_fees),
+    ]
+
+
+def locker_chunks(queryset, chunk_size=CHUNK_SIZE):
+    return keyset_chunks(queryset.select_related('assigned_locker__student'), chunk_size)
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the csv writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_student_csv(queryset, chunk_size=CHUNK_SIZE):
+    """Yield CSV lines for ``queryset`` without holding the whole export in memory."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(STUDENT_HEADER)
+    for chunk in iter_chunks(queryset, chunk_size):
+        yield ''.join(writer.writerow(student_row(student)) for student in chunk)
@@ -0,0 +1,121 @@
+import os
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+from .cache import invalidate
+from .storage import photo_storage, touch
+
+# Longest edge kept for the stored original
+MAX_ORIGINAL_SIZE = 1600
+
+# name -> (box size in px, crop to a square). Sizes are 2x the CSS size.
+RENDITIONS = {
+    'avatar': (80, True),
+    'detail': (300, False),
+}
+
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+RENDITION_DIR = 'student_photos/renditions'
+
+
+def _load(fileobj):
+    image = Image.open(fileobj)
+    # Apply the EXIF rotation before the metadata is dropped on re-encode
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _encode(image, export_format):
+    pil_format, options = FORMATS[export_format]
+    buffer = BytesIO()
+    # No exif= argument, so nothing from the upload's metadata is written back
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def _stem(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def prepare_upload(uploaded):
+    """
+    Re-encode an uploaded photo as a JPEG no larger than MAX_ORIGINAL_SIZE
+    on its longest edge, with EXIF and other metadata stripped.
+    """
+    image = _load(uploaded)
+    image.thumbnail((MAX_ORIGINAL_SIZE, MAX_ORIGINAL_SIZE), Image.LANCZOS)
+    return ContentFile(_encode(image, 'jpeg'), name=_stem(uploaded.name) + '.jpg')
+
+
+def build_renditions(fileobj, name):
+    """
+    Write every rendition of the image in ``fileobj`` to storage and return
+    ``{rendition: {format: storage name}}`` for ``Student.photo_renditions``.
+    """
+    return _save_renditions(_load(fileobj), name)
+
+
+def _save_renditions(image, name):
+    renditions = {}
+    for rendition, (size, crop) in RENDITIONS.items():
+        if crop:
+            resized = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+        renditions[rendition] = {
+            export_format: _save_rendition(
+                f'{RENDITION_DIR}/{_stem(name)}_{rendition}.{export_format}',
+                resized,
+                export_format,
+            )
+            for export_format in FORMATS
+        }
+    return renditions
+
+
+def _save_rendition(name, image, export_format):
+    # Photos are stored under their content hash, so an existing rendition
+    # with the same name was made from identical pixels and can be reused
+    if default_storage.exists(name):
+        touch(default_storage, name)
+        return name
+    return default_storage.save(name, ContentFile(_encode(image, export_format)))
+
+
+def process_student_photo(student):
+    """Regenerate the renditions for ``student.photo`` and store them on the student."""
+    renditions = {}
+    if student.photo:
+        with student.photo.open('rb') as fileobj:
+            renditions = build_renditions(fileobj, student.photo.name)
+    type(student).objects.filter(pk=student.pk).update(photo_renditions=renditions)
+    invalidate('students')
+    student.photo_renditions = renditions
+    return renditions
+
+
+def process_stored_photo(name):
+    """
+    Backfill helper: cap and re-encode the stored original at ``name`` into
+    content-addressed storage and build its renditions. Touches storage only,
+    never the database, so it can run in a worker process. The old file is
+    left for collect_media. Returns ``(new name, renditions)``.
+    """
+    with default_storage.open(name, 'rb') as fileobj:
+        image = _load(fileobj)
+    image.thumbnail((MAX_ORIGINAL_SIZE, MAX_ORIGINAL_SIZE), Image.LANCZOS)
+    new_name = photo_storage.save(
+        f'{os.path.dirname(name)}/{_stem(name)}.jpg', ContentFile(_encode(image, 'jpeg'))
+    )
+    return new_name, _save_renditions(image, new_name)
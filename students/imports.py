@@ -0,0 +1,356 @@
+import csv
+import io
+import json
+import os
+import re
+import uuid
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .cache import invalidate
+from .dues import refresh_balances
+from .expiry import recompute_statuses, refresh_admission_summaries
+from .models import Student, Admission, Payment, ImportJob
+from .rollups import add_payments
+
+CHUNK_SIZE = 1000
+
+# Model fields read from each kind of file. Columns are matched to fields
+# ignoring case, spaces and underscores, so both the export headers
+# ("Aadhaar Number") and raw field names ("aadhaar_number") work. Unknown
+# columns (ID, Date Added, the error report's Row/Errors) are ignored.
+STUDENT_FIELDS = [
+    'name', 'email', 'mobile', 'date_of_birth', 'aadhaar_number', 'address',
+    'father_name', 'mother_name', 'parent_mobile', 'registration_fees', 'status',
+]
+ADMISSION_FIELDS = [
+    'student_id', 'start_date', 'end_date', 'hours', 'slot_timing', 'seat_number', 'seat_type', 'admission_fees',
+]
+PAYMENT_FIELDS = ['student_id', 'amount', 'payment_date', 'payment_mode', 'payment_type', 'remarks']
+
+# Nested JSON columns of the student export, imported with their student
+NESTED = {'admissions': (Admission, ADMISSION_FIELDS[1:]), 'payments': (Payment, PAYMENT_FIELDS[1:])}
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be imported (unreadable, missing columns)."""
+
+
+def _key(label):
+    return re.sub(r'[^a-z0-9]', '', str(label).lower())
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Spreadsheets store long digit strings such as mobile numbers as floats
+        return str(int(value))
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _csv_rows(name):
+    with default_storage.open(name, 'rb') as handle:
+        for row in csv.reader(io.TextIOWrapper(handle, encoding='utf-8-sig', newline='')):
+            yield [_cell(value) for value in row]
+
+
+def _xlsx_rows(name):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('Reading .xlsx files needs the openpyxl package; upload a CSV instead.')
+    with default_storage.open(name, 'rb') as handle:
+        workbook = load_workbook(handle, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield [_cell(value) for value in row]
+        finally:
+            workbook.close()
+
+
+def read_rows(name):
+    """Rows of the stored upload ``name`` as lists of cells, header first, read lazily."""
+    return _xlsx_rows(name) if name.lower().endswith('.xlsx') else _csv_rows(name)
+
+
+def _instance(model, fields, values):
+    """
+    Build an unsaved ``model`` from ``values`` and validate it with the model's
+    own field validators. Blank cells fall back to the field default.
+    """
+    obj = model()
+    for field_name in fields:
+        value = values.get(field_name, '')
+        if value == '':
+            continue
+        setattr(obj, field_name, value)
+    if 'student_id' in fields:
+        # The student's existence is checked in bulk per chunk instead of per row
+        obj.student_id = model._meta.get_field('student').target_field.to_python(obj.student_id)
+    obj.full_clean(exclude=['student'], validate_unique=False, validate_constraints=False)
+    return obj
+
+
+def _errors(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f'{field}: {" ".join(messages)}' for field, messages in error.message_dict.items())
+    return ' '.join(error.messages) if hasattr(error, 'messages') else str(error)
+
+
+class Importer:
+    """Validates and inserts one chunk of rows at a time for an import kind."""
+
+    def __init__(self, kind, header):
+        self.kind = kind
+        fields = STUDENT_FIELDS if kind == 'students' else ADMISSION_FIELDS if kind == 'admissions' else PAYMENT_FIELDS
+        by_key = {_key(field): field for field in fields + (list(NESTED) if kind == 'students' else [])}
+        self.columns = {index: by_key[_key(label)] for index, label in enumerate(header) if _key(label) in by_key}
+        required = [
+            field for field in fields
+            if not self._model._meta.get_field(field.removesuffix('_id')).has_default()
+            and not self._model._meta.get_field(field.removesuffix('_id')).blank
+        ]
+        missing = [field for field in required if field not in self.columns.values()]
+        if missing:
+            raise ImportFileError(f'Missing required columns: {", ".join(missing)}')
+        self.fields = fields
+        self.seen_aadhaar = set()
+
+    @property
+    def _model(self):
+        return {'students': Student, 'admissions': Admission, 'payments': Payment}[self.kind]
+
+    def _values(self, row):
+        return {field: row[index] if index < len(row) else '' for index, field in self.columns.items()}
+
+    def import_chunk(self, rows):
+        """
+        Validate and insert ``rows`` (``(row number, cells)`` pairs) in one
+        transaction. Returns ``(imported, [(row number, cells, message)])``.
+        """
+        valid, failed = [], []
+        for number, cells in rows:
+            values = self._values(cells)
+            try:
+                valid.append((number, cells, values, self._build(values)))
+            except (ValidationError, ValueError) as e:
+                failed.append((number, cells, _errors(e)))
+
+        valid, rejected = self._check_references(valid)
+        failed += rejected
+        with transaction.atomic():
+            self._insert([built for _, _, _, built in valid])
+        failed.sort(key=lambda failure: failure[0])
+        return len(valid), failed
+
+    def _build(self, values):
+        if self.kind != 'students':
+            return _instance(self._model, self.fields, values)
+        student = _instance(Student, self.fields, values)
+        nested = {}
+        for column, (model, fields) in NESTED.items():
+            raw = values.get(column) or '[]'
+            try:
+                items = json.loads(raw) if isinstance(raw, str) else raw
+            except json.JSONDecodeError:
+                raise ValueError(f'{column}: not valid JSON')
+            if not isinstance(items, list):
+                raise ValueError(f'{column}: expected a JSON list')
+            try:
+                nested[column] = [_instance(model, fields, {k: _cell(v) for k, v in item.items()}) for item in items]
+            except (ValidationError, AttributeError) as e:
+                raise ValueError(f'{column}: {_errors(e)}')
+        return student, nested
+
+    def _check_references(self, valid):
+        """Drop rows that point at missing students or repeat an Aadhaar number, with one query per chunk."""
+        rejected = []
+        if self.kind == 'students':
+            numbers = [built[0].aadhaar_number for _, _, _, built in valid]
+            existing = set(Student.objects.filter(aadhaar_number__in=numbers).values_list('aadhaar_number', flat=True))
+            kept = []
+            for number, cells, values, built in valid:
+                aadhaar = built[0].aadhaar_number
+                if aadhaar in existing or aadhaar in self.seen_aadhaar:
+                    rejected.append((number, cells, 'aadhaar_number: A student with this Aadhaar number already exists.'))
+                else:
+                    self.seen_aadhaar.add(aadhaar)
+                    kept.append((number, cells, values, built))
+            return kept, rejected
+
+        ids = {built.student_id for _, _, _, built in valid}
+        existing = set(Student.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        kept = []
+        for number, cells, values, built in valid:
+            if built.student_id in existing:
+                kept.append((number, cells, values, built))
+            else:
+                rejected.append((number, cells, f'student_id: No student with ID {values.get("student_id")}.'))
+        return kept, rejected
+
+    def _insert(self, built):
+        if not built:
+            return
+        if self.kind == 'students':
+            students = Student.objects.bulk_create([student for student, _ in built])
+            admissions, payments = [], []
+            for student, (_, nested) in zip(students, built):
+                for admission in nested['admissions']:
+                    admission.student = student
+                    admissions.append(admission)
+                for payment in nested['payments']:
+                    payment.student = student
+                    payments.append(payment)
+            Admission.objects.bulk_create(admissions)
+            Payment.objects.bulk_create(payments)
+            add_payments(payments)
+            student_ids = [student.pk for student in students]
+            refresh_admission_summaries(student_ids)
+            recompute_statuses(student_ids)
+            refresh_balances(student_ids)
+            invalidate('students', 'admissions', 'payments')
+        elif self.kind == 'admissions':
+            Admission.objects.bulk_create(built)
+            student_ids = {admission.student_id for admission in built}
+            refresh_admission_summaries(student_ids)
+            recompute_statuses(student_ids)
+            refresh_balances(student_ids)
+            invalidate('admissions')
+        else:
+            Payment.objects.bulk_create(built)
+            add_payments(built)
+            refresh_balances({payment.student_id for payment in built})
+            invalidate('payments')
+
+
+class ErrorReport:
+    """
+    CSV of rejected rows: the original cells plus Row and Errors columns,
+    written on first use. A resumed job appends to the report it started.
+    """
+
+    def __init__(self, job, header):
+        self.job = job
+        self.header = header
+        self.resumed = bool(job.error_report)
+        self.name = job.error_report.name or f'imports/errors_{job.pk}_{uuid.uuid4().hex}.csv'
+        self.handle = None
+
+    def write(self, failures):
+        if not failures:
+            return
+        if self.handle is None:
+            path = default_storage.path(self.name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.handle = open(path, 'a' if self.resumed else 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.handle)
+            if not self.resumed:
+                self.writer.writerow(list(self.header) + ['Row', 'Errors'])
+        for number, cells, message in failures:
+            cells = list(cells[:len(self.header)])
+            self.writer.writerow(cells + [''] * (len(self.header) - len(cells)) + [number, message])
+        # On disk before the chunk commits, so a resumed job does not lose them
+        self.handle.flush()
+
+    @property
+    def written(self):
+        return self.name if self.resumed or self.handle is not None else ''
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+        return self.written
+
+
+def create_import(kind, uploaded, user=None):
+    if kind not in dict(ImportJob.KIND_CHOICES):
+        raise ValueError(f'Unknown import kind: {kind}')
+    extension = os.path.splitext(uploaded.name)[1].lower()
+    if extension not in ('.csv', '.xlsx'):
+        raise ValueError('Upload a .csv or .xlsx file.')
+    job = ImportJob(kind=kind, original_name=uploaded.name, created_by=user)
+    job.file.save(f'{kind}_{uuid.uuid4().hex}{extension}', uploaded, save=False)
+    job.save()
+    return job
+
+
+def claim_next_import():
+    """Atomically move the oldest queued import to Running, like claim_next_job for exports."""
+    while True:
+        job = ImportJob.objects.filter(status='Queued').order_by('created_at').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(pk=job.pk, status='Queued').update(
+            status='Running', started_at=now, heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def requeue_stale_imports(stale_after):
+    """
+    Put Running imports whose worker has not committed a chunk for
+    ``stale_after`` (a timedelta) back in the queue, like requeue_stale_jobs
+    for exports. They keep their progress and resume after the last
+    committed chunk. Returns how many.
+    """
+    cutoff = timezone.now() - stale_after
+    stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    return ImportJob.objects.filter(stale, status='Running').update(status='Queued', started_at=None, heartbeat_at=None)
+
+
+def run_import(job, chunk_size=CHUNK_SIZE):
+    """
+    Stream the uploaded file, validating and inserting ``chunk_size`` rows per
+    transaction and recording progress in the same transaction. Rejected rows
+    go to the job's error report; accepted rows stay imported. A requeued job
+    skips the rows its committed chunks already processed.
+    """
+    report = None
+    try:
+        rows_total = max(sum(1 for _ in read_rows(job.file.name)) - 1, 0)
+        ImportJob.objects.filter(pk=job.pk).update(rows_total=rows_total)
+
+        rows = read_rows(job.file.name)
+        header = next(rows, None)
+        if not header:
+            raise ImportFileError('The file is empty.')
+        importer = Importer(job.kind, header)
+        report = ErrorReport(job, header)
+        numbered = ((number, cells) for number, cells in enumerate(rows, start=2) if any(cell != '' for cell in cells))
+
+        processed, imported, failed = job.rows_processed, job.rows_imported, job.rows_failed
+        numbered = islice(numbered, processed, None)
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+            with transaction.atomic():
+                ok, failures = importer.import_chunk(chunk)
+                report.write(failures)
+                processed += len(chunk)
+                imported += ok
+                failed += len(failures)
+                ImportJob.objects.filter(pk=job.pk).update(
+                    rows_processed=processed, rows_imported=imported, rows_failed=failed,
+                    error_report=report.written, heartbeat_at=timezone.now(),
+                )
+    except Exception as e:
+        ImportJob.objects.filter(pk=job.pk).update(
+            status='Failed', error=str(e), error_report=report.close() if report else '', finished_at=timezone.now(),
+        )
+    else:
+        ImportJob.objects.filter(pk=job.pk).update(
+            status='Done', rows_total=processed, error_report=report.close(), finished_at=timezone.now(),
+        )
+    job.refresh_from_db()
+    return job
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Sum, Count, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Student, Payment, RevenueRollup
+from .cache import acached, cached
+
+ZERO = Decimal('0.00')
+
+
+def _sum(condition=None):
+    return Coalesce(Sum('total_amount', filter=condition), ZERO)
+
+
+def month_bounds(today=None):
+    """Start dates of the current and the previous month."""
+    today = today or timezone.localdate()
+    current_month_start = today.replace(day=1)
+    last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
+    return current_month_start, last_month_start
+
+
+def _revenue_aggregates(today):
+    current_month_start, last_month_start = month_bounds(today)
+    aggregates = {
+        'total_' + payment_type.lower(): _sum(Q(payment_type=payment_type))
+        for payment_type, _ in Payment.PAYMENT_TYPE_CHOICES
+    }
+    aggregates['current_month_revenue'] = _sum(Q(month__gte=current_month_start))
+    aggregates['last_month_revenue'] = _sum(
+        Q(month__gte=last_month_start, month__lt=current_month_start)
+    )
+    return aggregates
+
+
+def revenue_totals(today=None):
+    """
+    All payment KPIs in a single conditional-aggregation query: lifetime
+    totals per ``payment_type`` plus current and previous month revenue.
+    Reads the monthly ``RevenueRollup`` so the cost does not grow with Payment.
+    """
+    return RevenueRollup.objects.aggregate(**_revenue_aggregates(today))
+
+
+async def arevenue_totals(today=None):
+    return await RevenueRollup.objects.aaggregate(**_revenue_aggregates(today))
+
+
+def _status_counts():
+    return Student.objects.order_by().values_list('status').annotate(Count('id'))
+
+
+def _counts(by_status):
+    return {
+        'total_students': sum(by_status.values()),
+        'active_students': by_status.get('Active', 0),
+        'inactive_students': by_status.get('Inactive', 0),
+        'expiring_soon': by_status.get('Expiring Soon', 0),
+    }
+
+
+def student_counts():
+    """Student counts per status from one grouped query."""
+    return _counts(dict(_status_counts()))
+
+
+async def astudent_counts():
+    return _counts({status: count async for status, count in _status_counts()})
+
+
+def cached_revenue_totals(today=None):
+    today = today or timezone.localdate()
+    return cached(['payments'], f'revenue_totals:{today}', lambda: revenue_totals(today))
+
+
+def cached_student_counts():
+    return cached(['students'], 'student_counts', student_counts)
+
+
+async def acached_revenue_totals(today=None):
+    today = today or timezone.localdate()
+    return await acached(['payments'], f'revenue_totals:{today}', lambda: arevenue_totals(today))
+
+
+async def acached_student_counts():
+    return await acached(['students'], 'student_counts', astudent_counts)
+
+
+def percentage_change(current, previous):
+    if previous > 0:
+        return (current - previous) / previous * 100
+    return 100 if current > 0 else 0
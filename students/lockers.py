@@ -0,0 +1,206 @@
+import csv
+import io
+import re
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+from .cache import invalidate
+from .dues import refresh_balances
+from .models import Locker, TotalLockers
+
+# Rounds of "pick candidates, claim them" before giving up on a busy pool
+CLAIM_ATTEMPTS = 5
+
+# Largest number of lockers one provisioning request may create
+MAX_PROVISION = 5000
+
+# Inserts retried after losing a race to another provisioning request
+PROVISION_ATTEMPTS = 3
+
+LOCKER_RANGE = re.compile(r'^([A-Za-z]*)(\d+)\s*-\s*([A-Za-z]*)(\d+)$')
+
+
+class LockerUnavailable(Exception):
+    """The requested locker, or enough free lockers, could not be claimed."""
+
+
+def _candidates(count, locking):
+    free = TotalLockers.objects.filter(is_available=True).order_by('locker_number')
+    if locking:
+        # Lockers being claimed by another transaction are skipped, not waited on
+        free = free.select_for_update(skip_locked=True)
+    return list(free.values_list('pk', flat=True)[:count])
+
+
+def _claim(pks, locking):
+    now = timezone.now()
+    if locking:
+        # Every candidate is row-locked by this transaction, so all of them are ours
+        TotalLockers.objects.filter(pk__in=pks).update(is_available=False, updated_at=now)
+        return pks
+    # Without row locks the conditional UPDATE is the arbiter: 0 rows means someone else won
+    return [
+        pk for pk in pks
+        if TotalLockers.objects.filter(pk=pk, is_available=True).update(is_available=False, updated_at=now)
+    ]
+
+
+def claim_lockers(count):
+    """
+    Mark ``count`` free lockers as taken and return their ids, lowest
+    locker numbers first. Call inside a transaction; raises LockerUnavailable
+    if the pool runs out.
+    """
+    locking = connections[TotalLockers.objects.db].features.has_select_for_update_skip_locked
+    claimed = []
+    for _ in range(CLAIM_ATTEMPTS):
+        needed = count - len(claimed)
+        if not needed:
+            break
+        candidates = _candidates(needed, locking)
+        if not candidates:
+            break
+        claimed += _claim(candidates, locking)
+    if len(claimed) < count:
+        raise LockerUnavailable(f'Only {len(claimed)} of {count} lockers could be assigned.')
+    return claimed
+
+
+def claim_locker_number(locker_number):
+    """Mark the locker ``locker_number`` as taken and return its id."""
+    pk = TotalLockers.objects.filter(locker_number=locker_number).values_list('pk', flat=True).first()
+    claimed = pk is not None and TotalLockers.objects.filter(pk=pk, is_available=True).update(
+        is_available=False, updated_at=timezone.now(),
+    )
+    if not claimed:
+        raise LockerUnavailable(f'Locker {locker_number} is not available.')
+    return pk
+
+
+def assign_lockers(students, locker_number=None, **terms):
+    """
+    Give each of ``students`` a locker in one transaction: either the next
+    free lockers in number order, or ``locker_number`` for a single student.
+    ``terms`` are Locker fields (start_date, end_date, fees, required).
+    All or nothing; raises LockerUnavailable.
+    """
+    students = list(students)
+    terms.setdefault('required', False)
+    with transaction.atomic():
+        if locker_number:
+            if len(students) != 1:
+                raise ValueError('A specific locker number can only go to one student.')
+            pks = [claim_locker_number(locker_number)]
+        else:
+            pks = claim_lockers(len(students))
+        # bulk_create skips Locker.save(), which would claim the locker again
+        lockers = Locker.objects.bulk_create([
+            Locker(student=student, total_locker_id=pk, **terms)
+            for student, pk in zip(students, pks)
+        ])
+        refresh_balances([student.pk for student in students])
+        invalidate('lockers')
+    return lockers
+
+
+def assign_locker(student, locker_number=None, **terms):
+    return assign_lockers([student], locker_number, **terms)[0]
+
+
+def release_lockers(lockers):
+    """
+    Mark the lockers behind the ``lockers`` queryset as free again, unless
+    retired, e.g. before the Locker rows go in a cascading delete that skips
+    Locker.delete().
+    """
+    released = TotalLockers.objects.filter(assigned_locker__in=lockers, retired=False).update(
+        is_available=True, updated_at=timezone.now(),
+    )
+    invalidate('lockers')
+    return released
+
+
+def parse_locker_numbers(spec):
+    """
+    Expand a spec such as ``L001-L500, B01-B20, X9`` into locker numbers.
+    Ranges keep the prefix and zero padding of their first number.
+    """
+    numbers = []
+    for part in filter(None, (part.strip() for part in spec.split(','))):
+        match = LOCKER_RANGE.match(part)
+        if not match:
+            numbers.append(part)
+            continue
+        prefix, first, end_prefix, last = match.groups()
+        if end_prefix and end_prefix != prefix:
+            raise ValueError(f'Range {part} mixes prefixes {prefix} and {end_prefix}.')
+        if int(last) < int(first):
+            raise ValueError(f'Range {part} ends before it starts.')
+        if int(last) - int(first) >= MAX_PROVISION:
+            raise ValueError(f'Range {part} is larger than {MAX_PROVISION} lockers.')
+        numbers.extend(f'{prefix}{number:0{len(first)}d}' for number in range(int(first), int(last) + 1))
+    return _checked(numbers)
+
+
+def locker_numbers_from_csv(uploaded):
+    """Locker numbers from the first column of an uploaded CSV, with or without a header row."""
+    reader = csv.reader(io.TextIOWrapper(uploaded, encoding='utf-8-sig'))
+    numbers = [row[0].strip() for row in reader if row and row[0].strip()]
+    if numbers and numbers[0].lower().replace(' ', '_') == 'locker_number':
+        numbers = numbers[1:]
+    return _checked(numbers)
+
+
+def _checked(numbers):
+    max_length = TotalLockers._meta.get_field('locker_number').max_length
+    too_long = [number for number in numbers if len(number) > max_length]
+    if too_long:
+        raise ValueError(f'Locker numbers are limited to {max_length} characters: {too_long[0]}')
+    if len(numbers) > MAX_PROVISION:
+        raise ValueError(f'At most {MAX_PROVISION} lockers can be added at once.')
+    return list(dict.fromkeys(numbers))
+
+
+def _existing_numbers(numbers):
+    return set(TotalLockers.objects.filter(locker_number__in=numbers).values_list('locker_number', flat=True))
+
+
+def provision_lockers(numbers):
+    """
+    Create a TotalLockers row for each of ``numbers`` in one transaction.
+    Numbers that already exist are left alone. Returns ``(created, skipped)``;
+    raises IntegrityError if the insert still fails after PROVISION_ATTEMPTS.
+    """
+    with transaction.atomic():
+        for attempt in range(PROVISION_ATTEMPTS):
+            existing = _existing_numbers(numbers)
+            new = [number for number in numbers if number not in existing]
+            try:
+                with transaction.atomic():
+                    TotalLockers.objects.bulk_create(
+                        [TotalLockers(locker_number=number) for number in new], batch_size=500,
+                    )
+                break
+            except IntegrityError:
+                # A concurrent request added some of the numbers; look again
+                if attempt == PROVISION_ATTEMPTS - 1:
+                    raise
+        invalidate('lockers')
+    return len(new), len(existing)
+
+
+def set_lockers_available(lockers, available):
+    """
+    Enable or retire the ``lockers`` queryset. Retiring takes the lockers out
+    of service in one UPDATE; one still assigned keeps its student and stays
+    retired when released. Enabling returns unassigned lockers to the pool.
+    Returns the number changed.
+    """
+    now = timezone.now()
+    if not available:
+        changed = lockers.filter(retired=False).update(retired=True, is_available=False, updated_at=now)
+    else:
+        lockers = lockers.filter(retired=True)
+        changed = lockers.filter(assigned_locker__isnull=True).update(retired=False, is_available=True, updated_at=now)
+        changed += lockers.update(retired=False, updated_at=now)
+    invalidate('lockers')
+    return changed
@@ -0,0 +1,51 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from students.benchmark import Harness, compare, load
+
+
+class Command(BaseCommand):
+    help = 'Measure latency percentiles, queries and peak memory for every students view and save them as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per view (default: 20)')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed requests per view first (default: 1)')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--view', action='append', default=[], help='Only measure this URL name (repeatable)')
+        parser.add_argument(
+            '--output', default='bench_results.json',
+            help='Where to write the JSON results (default: bench_results.json)',
+        )
+        parser.add_argument('--compare', help='Earlier results to compare against')
+        parser.add_argument(
+            '--threshold', type=float, default=20.0,
+            help='With --compare, fail when a p95 grows by more than this percentage (default: 20)',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        harness = Harness(options['requests'], options['warmup'], options['cold'], options['view'])
+        self.stdout.write(f'{"view":<45} {"p50":>8} {"p95":>8} {"p99":>8} {"queries":>8} {"peak KiB":>10}')
+        results = harness.run(progress=self.report)
+
+        with open(options['output'], 'w') as handle:
+            json.dump(results, handle, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+
+        if options['compare']:
+            regressions = compare(load(options['compare']), results, options['threshold'])
+            for name, metric, before, after in regressions:
+                self.stderr.write(f'{name}: {metric} {before} -> {after}')
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}'))
+
+    def report(self, name, result):
+        if 'skipped' in result:
+            self.stdout.write(f'{name:<45} skipped: {result["skipped"]}')
+            return
+        line = (
+            f'{name:<45} {result["p50_ms"]:>8} {result["p95_ms"]:>8} {result["p99_ms"]:>8} '
+            f'{result["queries"]:>8} {result["peak_memory_kib"]:>10}'
+        )
+        self.stdout.write(line if result['status'] < 400 else self.style.WARNING(f'{line}  HTTP {result["status"]}'))
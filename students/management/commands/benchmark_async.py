@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from students.benchmark import ASYNC_PAGES, concurrency_throughput
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput of the read-heavy pages under WSGI with sync views and ASGI with async views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode (default: 200)')
+        parser.add_argument('--concurrency', type=int, default=10, help='Requests in flight at once (default: 10)')
+        parser.add_argument(
+            '--view', action='append', choices=ASYNC_PAGES, default=[],
+            help='Only request this page (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+        throughput = concurrency_throughput(options['requests'], options['concurrency'], options['view'] or ASYNC_PAGES)
+        self.stdout.write(f'Database: {throughput["database"]}, concurrency {throughput["concurrency"]}')
+        self.stdout.write(f'{"mode":<6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7}')
+        for mode, result in throughput['results'].items():
+            self.stdout.write(
+                f'{mode:<6} {result["requests_per_second"]:>8} {result["p50_ms"]:>8} '
+                f'{result["p95_ms"]:>8} {result["errors"]:>7}'
+            )
+        if any(result['errors'] for result in throughput['results'].values()):
+            raise CommandError('Some requests failed; the numbers above are not comparable')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from students.benchmark import CONNECTION_MODES, connection_overhead
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-request cost of fresh, persistent and pooled database connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycles', type=int, default=200, help='Request cycles per mode (default: 200)')
+        parser.add_argument(
+            '--mode', action='append', choices=list(CONNECTION_MODES), default=[],
+            help='Only measure this mode (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        if options['cycles'] < 1:
+            raise CommandError('--cycles must be at least 1')
+        overhead = connection_overhead(options['cycles'], options['mode'] or tuple(CONNECTION_MODES))
+        results = overhead['results']
+        self.stdout.write(f'Database: {overhead["database"]}')
+        self.stdout.write(f'{"mode":<12} {"p50 ms":>8} {"p95 ms":>8} {"mean ms":>9} {"connects":>9}')
+        for mode, result in results.items():
+            if 'skipped' in result:
+                self.stdout.write(f'{mode:<12} skipped: {result["skipped"]}')
+                continue
+            self.stdout.write(
+                f'{mode:<12} {result["p50_ms"]:>8} {result["p95_ms"]:>8} {result["mean_ms"]:>9} {result["connects"]:>9}'
+            )
+
+        fresh = results.get('fresh', {}).get('mean_ms')
+        for mode in ('persistent', 'pool'):
+            reused = results.get(mode, {}).get('mean_ms')
+            if fresh is not None and reused is not None:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{mode}: {fresh - reused:.3f} ms less per request than a fresh connection'
+                ))
@@ -0,0 +1,52 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from students.models import Student
+from students.storage import photo_storage
+
+PHOTO_DIR = 'student_photos'
+
+# Files served directly by templates rather than referenced from a Student
+KEEP = {'student_photos/user.jpg'}
+
+
+class Command(BaseCommand):
+    help = 'Delete student photos and renditions in MEDIA_ROOT that no student references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='List orphaned files without deleting them')
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Skip files modified within this many seconds, e.g. uploads in flight (default: 3600)',
+        )
+
+    def referenced_names(self):
+        referenced = set(KEEP)
+        for photo, renditions in Student.objects.exclude(photo='').values_list('photo', 'photo_renditions').iterator():
+            if photo:
+                referenced.add(photo)
+            for formats in (renditions or {}).values():
+                referenced.update(formats.values())
+        return referenced
+
+    def handle(self, *args, **options):
+        referenced = self.referenced_names()
+        cutoff = time.time() - options['min_age']
+        root = os.path.join(settings.MEDIA_ROOT, PHOTO_DIR)
+
+        orphans = freed = 0
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+                if name in referenced or os.path.getmtime(path) > cutoff:
+                    continue
+                orphans += 1
+                freed += os.path.getsize(path)
+                self.stdout.write(name)
+                if not options['dry_run']:
+                    photo_storage.delete(name)
+
+        action = 'Found' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{action} {orphans} orphaned files ({freed / 1024 / 1024:.1f} MB)'))
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from students.expiry import sweep_expired_admissions
+
+
+class Command(BaseCommand):
+    help = 'Expire finished admissions, release their lockers and recompute student statuses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running and sweep every N seconds (default: run once)',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        while True:
+            sweep = sweep_expired_admissions()
+            self.stdout.write(self.style.SUCCESS(
+                f'Swept through {sweep.swept_through}: '
+                f'{sweep.admissions_deleted} admissions deleted, '
+                f'{sweep.lockers_released} lockers released, '
+                f'{sweep.students_deactivated} students deactivated'
+            ))
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from students.export_jobs import claim_next_job, requeue_stale_jobs, run_job
+from students.imports import claim_next_import, requeue_stale_imports, run_import
+
+
+class Command(BaseCommand):
+    help = 'Process queued export and import jobs, writing export files to MEDIA_ROOT/exports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of polling for new jobs',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=2.0,
+            help='Seconds to wait between checks of an empty queue (default: 2)',
+        )
+        parser.add_argument(
+            '--stale-after', type=float, default=600,
+            help='Requeue Running exports and imports with no progress for this many seconds, '
+                 'left behind by a worker that died (default: 600)',
+        )
+
+    def handle(self, *args, **options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        while True:
+            requeued = requeue_stale_jobs(stale_after)
+            if requeued:
+                self.stderr.write(self.style.WARNING(f'Requeued {requeued} stale export(s)'))
+            requeued = requeue_stale_imports(stale_after)
+            if requeued:
+                self.stderr.write(self.style.WARNING(f'Requeued {requeued} stale import(s)'))
+            job = claim_next_job()
+            if job is not None:
+                job = run_job(job)
+                if job.status == 'Done':
+                    self.stdout.write(self.style.SUCCESS(f'{job}: {job.rows_written} rows -> {job.file.name}'))
+                else:
+                    self.stderr.write(self.style.ERROR(f'{job}: {job.error}'))
+                continue
+            job = claim_next_import()
+            if job is not None:
+                job = run_import(job)
+                if job.status == 'Done':
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{job}: {job.rows_imported} imported, {job.rows_failed} failed'
+                    ))
+                else:
+                    self.stderr.write(self.style.ERROR(f'{job}: {job.error}'))
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll'])
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from students.synthetic import generate
+
+
+class Command(BaseCommand):
+    help = 'Add synthetic students, admissions, lockers, payments and leads for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='Number of students to add (default: 1000)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Students created per transaction (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['students'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--students and --batch-size must be positive')
+        started = time.perf_counter()
+        counts = generate(
+            options['students'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            progress=lambda done: self.stdout.write(f'{done} / {options["students"]} students'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Added ' + ', '.join(f'{count} {name}' for name, count in counts.items())
+            + f' in {time.perf_counter() - started:.1f}s'
+        ))
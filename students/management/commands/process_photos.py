@@ -0,0 +1,55 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from students.images import process_stored_photo
+from students.cache import bump
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Cap stored student photos and generate their renditions, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Number of worker processes (default: CPU count)',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Reprocess photos that already have renditions',
+        )
+
+    def handle(self, *args, **options):
+        students = Student.objects.exclude(photo='').exclude(photo__isnull=True)
+        if not options['all']:
+            students = students.filter(photo_renditions={})
+
+        # Several students may point at the same file; process each file once
+        by_name = defaultdict(list)
+        for student_id, name in students.values_list('id', 'photo'):
+            by_name[name].append(student_id)
+        if not by_name:
+            self.stdout.write('No photos to process')
+            return
+
+        # Workers only touch storage; close connections so none are shared across fork
+        connections.close_all()
+        processed = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = {pool.submit(process_stored_photo, name): name for name in by_name}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    new_name, renditions = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f'{name}: {e}'))
+                    continue
+                Student.objects.filter(id__in=by_name[name]).update(photo=new_name, photo_renditions=renditions)
+                processed += 1
+
+        bump('students')
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} photos, {failed} failed'))
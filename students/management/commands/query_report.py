@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.test.utils import override_settings
+from students import performance, profiling
+from students.benchmark import Harness
+
+
+class Command(BaseCommand):
+    help = 'Rank the SQL fingerprints of timed requests by cost, optionally with their query plans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Fingerprints to show (default: 20)')
+        parser.add_argument(
+            '--sort', choices=['total', 'mean', 'max', 'count'], default='total',
+            help='Rank by total, mean or max time, or by how often the query ran (default: total)',
+        )
+        parser.add_argument(
+            '--explain', action='store_true',
+            help='Show the plan of each sample query (EXPLAIN ANALYZE on PostgreSQL, which runs it); '
+            'queries with parameters only with --run',
+        )
+        parser.add_argument(
+            '--run', action='store_true',
+            help='Drive the views through the benchmark harness here instead of reading what the workers recorded',
+        )
+        parser.add_argument('--view', action='append', default=[], help='With --run, only this URL name (repeatable)')
+        parser.add_argument('--requests', type=int, default=3, help='With --run, requests per view (default: 3)')
+
+    def handle(self, *args, **options):
+        if options['run']:
+            if options['requests'] < 1:
+                raise CommandError('--requests must be at least 1')
+            registry = performance.registry
+            registry.clear()
+            registry.keep_params = options['explain']
+            try:
+                with override_settings(PERF_SAMPLE_RATE=1):
+                    Harness(options['requests'], warmup=0, only=options['view']).run()
+            finally:
+                registry.keep_params = False
+            queries = registry.snapshot()['queries']
+            params = dict(registry.params)
+            registry.params.clear()
+        else:
+            # Workers publish no parameters, so only parameterless samples can be explained
+            queries = performance.collect()[2]
+            params = {}
+        if not queries:
+            self.stdout.write('No queries recorded yet; is PERF_SAMPLE_RATE above 0?')
+            return
+
+        ranked = profiling.rank(queries, options['sort'], options['limit'])
+        self.stdout.write(f'{"#":>3} {"total ms":>10} {"mean ms":>9} {"max ms":>9} {"count":>7}  views')
+        for number, (key, stats) in enumerate(ranked, start=1):
+            views = sorted(stats['views'].items(), key=lambda item: -item[1])
+            self.stdout.write(
+                f'{number:>3} {stats["total"] * 1000:>10.1f} {stats["total"] / stats["count"] * 1000:>9.2f} '
+                f'{stats["max"] * 1000:>9.2f} {stats["count"]:>7}  '
+                + ', '.join(f'{view} ({count})' for view, count in views[:3])
+            )
+            self.stdout.write(f'    {key}')
+            if stats.get('origin'):
+                self.stdout.write(f'    from {stats["origin"]}')
+            if options['explain']:
+                self.plan(stats, params.get(key))
+            self.stdout.write('')
+
+    def plan(self, stats, params):
+        if not stats.get('sql'):
+            self.stdout.write('    plan: no sample to explain')
+            return
+        if params is None:
+            if '%s' in stats['sql']:
+                self.stdout.write('    plan: parameters not recorded (explain needs --run)')
+                return
+            params = ()
+        try:
+            lines = profiling.explain(stats['sql'], params)
+        except (ValueError, DatabaseError) as e:
+            self.stdout.write(f'    plan: {e}')
+            return
+        for line in lines:
+            self.stdout.write(f'    | {line}')
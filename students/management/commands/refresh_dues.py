@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from students import dues
+
+
+class Command(BaseCommand):
+    help = 'Verify the stored student balances against fees and payments and recompute them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report drift; exit with an error if any is found',
+        )
+
+    def handle(self, *args, **options):
+        drift = dues.find_drift()
+        for student_id, stored, expected in drift:
+            self.stdout.write(f'Student {student_id}: stored ₹{stored}, expected ₹{expected}')
+
+        if options['verify']:
+            if drift:
+                raise CommandError(f'{len(drift)} student balances have drifted')
+            self.stdout.write(self.style.SUCCESS('Student balances are up to date'))
+            return
+
+        updated = dues.refresh_balances()
+        self.stdout.write(self.style.SUCCESS(f'Recomputed student balances: {updated} corrected'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from students import rollups
+
+
+class Command(BaseCommand):
+    help = 'Verify the revenue rollup against Payment and rebuild it from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Only report drift; exit with an error if any is found',
+        )
+
+    def handle(self, *args, **options):
+        drift = rollups.find_drift()
+        for (month, payment_type, payment_mode), stored, expected in drift:
+            self.stdout.write(
+                f'{month:%Y-%m} {payment_type}/{payment_mode}: '
+                f'stored ₹{stored[0]} ({stored[1]} payments), '
+                f'expected ₹{expected[0]} ({expected[1]} payments)'
+            )
+
+        if options['verify']:
+            if drift:
+                raise CommandError(f'{len(drift)} rollup rows have drifted')
+            self.stdout.write(self.style.SUCCESS('Revenue rollup is up to date'))
+            return
+
+        rows = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt revenue rollup: {rows} rows, {len(drift)} drifted rows corrected'
+        ))
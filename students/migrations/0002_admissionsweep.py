@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionSweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('swept_through', models.DateField()),
+                ('admissions_deleted', models.PositiveIntegerField(default=0)),
+                ('lockers_released', models.PositiveIntegerField(default=0)),
+                ('students_deactivated', models.PositiveIntegerField(default=0)),
+                ('ran_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-ran_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:26
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollup(apps, schema_editor):
+    Payment = apps.get_model('students', 'Payment')
+    RevenueRollup = apps.get_model('students', 'RevenueRollup')
+    rows = (
+        Payment.objects.order_by()
+        .annotate(month=TruncMonth('payment_date'))
+        .values('month', 'payment_type', 'payment_mode')
+        .annotate(total_amount=Sum('amount'), payment_count=Count('id'))
+    )
+    RevenueRollup.objects.bulk_create([RevenueRollup(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_admissionsweep'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('payment_type', models.CharField(choices=[('Registration', 'Registration Fees'), ('Admission', 'Admission Fees'), ('Locker', 'Locker Fees'), ('Monthly', 'Monthly Fees')], max_length=20)),
+                ('payment_mode', models.CharField(choices=[('Cash', 'Cash'), ('Online', 'Online'), ('Card', 'Card'), ('UPI', 'UPI')], max_length=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-month', 'payment_type', 'payment_mode'],
+                'constraints': [models.UniqueConstraint(fields=('month', 'payment_type', 'payment_mode'), name='unique_revenue_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_revenuerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(fields=['end_date'], name='admission_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(fields=['seat_type', 'student'], name='admission_seat_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(fields=['hours', 'student'], name='admission_hours_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactlead',
+            index=models.Index(fields=['-created_at'], name='contactlead_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-payment_date'], name='payment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_type', 'payment_date'], name='payment_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['student', '-payment_date'], name='payment_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-created_at'], name='student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['status', '-created_at'], name='student_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='totallockers',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['locker_number'], name='totallockers_available_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='photo_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:34
+
+import students.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0007_student_photo_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='photo',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=students.storage.ContentAddressedStorage(), upload_to='student_photos/'),
+        ),
+    ]
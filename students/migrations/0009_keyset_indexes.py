@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0008_content_addressed_photos'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='contactlead',
+            name='contactlead_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='student',
+            name='student_status_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='contactlead',
+            index=models.Index(fields=['-created_at', '-id'], name='contactlead_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locker',
+            index=models.Index(fields=['-created_at', '-id'], name='locker_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-created_at', '-id'], name='student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='student_status_created_idx'),
+        ),
+    ]
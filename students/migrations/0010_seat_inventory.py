@@ -0,0 +1,124 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:42
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+DEFAULT_SLOTS = [
+    ('Morning', datetime.time(6, 0), datetime.time(12, 0)),
+    ('Afternoon', datetime.time(12, 0), datetime.time(18, 0)),
+    ('Evening', datetime.time(18, 0), datetime.time(22, 0)),
+    ('Full Day', datetime.time(6, 0), datetime.time(22, 0)),
+]
+
+# Two bookings of one seat clash when both their date ranges and their
+# slot times overlap. Dates are inclusive, times are half-open.
+POSTGRES_CONSTRAINT = """
+    ALTER TABLE students_admission ADD CONSTRAINT admission_seat_no_overlap EXCLUDE USING gist (
+        seat_id WITH =,
+        daterange(start_date, end_date, '[]') WITH &&,
+        tsrange(DATE '2000-01-01' + slot_start, DATE '2000-01-01' + slot_end) WITH &&
+    ) WHERE (seat_id IS NOT NULL AND slot_start IS NOT NULL)
+"""
+
+# SQLite drops triggers when Django rebuilds a table, so a later migration
+# that alters students_admission has to run create_booking_constraint again.
+SQLITE_TRIGGER = """
+    CREATE TRIGGER admission_seat_no_overlap_{event} BEFORE {event} ON students_admission
+    WHEN NEW.seat_id IS NOT NULL AND NEW.slot_start IS NOT NULL
+    BEGIN
+        SELECT RAISE(ABORT, 'admission_seat_no_overlap') WHERE EXISTS (
+            SELECT 1 FROM students_admission a
+            WHERE a.seat_id = NEW.seat_id AND a.id IS NOT NEW.id AND a.slot_start IS NOT NULL
+              AND a.start_date <= NEW.end_date AND NEW.start_date <= a.end_date
+              AND a.slot_start < NEW.slot_end AND NEW.slot_start < a.slot_end
+        );
+    END
+"""
+
+
+def create_booking_constraint(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        schema_editor.execute(POSTGRES_CONSTRAINT)
+    elif vendor == 'sqlite':
+        for event in ('INSERT', 'UPDATE'):
+            schema_editor.execute(SQLITE_TRIGGER.format(event=event))
+
+
+def drop_booking_constraint(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE students_admission DROP CONSTRAINT IF EXISTS admission_seat_no_overlap')
+    elif vendor == 'sqlite':
+        for event in ('INSERT', 'UPDATE'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS admission_seat_no_overlap_{event}')
+
+
+def create_default_slots(apps, schema_editor):
+    Slot = apps.get_model('students', 'Slot')
+    for name, start_time, end_time in DEFAULT_SLOTS:
+        Slot.objects.get_or_create(name=name, defaults={'start_time': start_time, 'end_time': end_time})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Seat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(max_length=10, unique=True)),
+                ('seat_type', models.CharField(choices=[('Reserved', 'Reserved'), ('Non-Reserved', 'Non-Reserved')], default='Non-Reserved', max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='admission',
+            name='slot_end',
+            field=models.TimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='admission',
+            name='slot_start',
+            field=models.TimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='admission',
+            name='seat',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='admissions', to='students.seat'),
+        ),
+        migrations.CreateModel(
+            name='Slot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, unique=True)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+            ],
+            options={
+                'ordering': ['start_time', 'end_time'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_time__gt', models.F('start_time'))), name='slot_ends_after_start')],
+            },
+        ),
+        migrations.AddField(
+            model_name='admission',
+            name='slot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='admissions', to='students.slot'),
+        ),
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(fields=['seat', 'end_date'], name='admission_seat_end_idx'),
+        ),
+        migrations.RunPython(create_booking_constraint, drop_booking_constraint),
+        migrations.RunPython(create_default_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0011_importjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admission',
+            index=models.Index(fields=['student', 'end_date'], name='admission_student_end_idx'),
+        ),
+    ]
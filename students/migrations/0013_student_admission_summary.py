@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:55
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def copy_latest_admissions(apps, schema_editor):
+    # Same UPDATE as students.expiry.refresh_admission_summaries
+    Admission = apps.get_model('students', 'Admission')
+    Student = apps.get_model('students', 'Student')
+    latest = Admission.objects.filter(student=OuterRef('pk')).order_by('-end_date', '-pk')
+    Student.objects.update(
+        current_seat_type=Coalesce(Subquery(latest.values('seat_type')[:1]), Value('')),
+        current_hours=Coalesce(Subquery(latest.values('hours')[:1]), Value('')),
+        current_seat_number=Coalesce(Subquery(latest.values('seat_number')[:1]), Value('')),
+        current_end_date=Subquery(latest.values('end_date')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0012_admission_student_end_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='admission',
+            name='admission_seat_type_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='admission',
+            name='admission_hours_idx',
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='current_end_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='current_hours',
+            field=models.CharField(blank=True, editable=False, max_length=2),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='current_seat_number',
+            field=models.CharField(blank=True, editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='current_seat_type',
+            field=models.CharField(blank=True, choices=[('Reserved', 'Reserved'), ('Non-Reserved', 'Non-Reserved')], editable=False, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['current_seat_type', '-created_at', '-id'], name='student_seat_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['current_hours', '-created_at', '-id'], name='student_hours_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['current_end_date'], name='student_current_end_idx'),
+        ),
+        migrations.RunPython(copy_latest_admissions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:57
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, ExtractDay, ExtractMonth, ExtractYear
+
+MONEY = models.DecimalField(max_digits=12, decimal_places=2)
+
+
+def compute_balances(apps, schema_editor):
+    # Same balance as students.dues.balance_expression at the time, before charges existed
+    Student = apps.get_model('students', 'Student')
+
+    def total(model_name, amount):
+        rows = apps.get_model('students', model_name).objects.filter(student=OuterRef('pk')).order_by().values('student')
+        summed = Subquery(rows.annotate(total=Sum(amount, output_field=MONEY)).values('total'))
+        return Coalesce(summed, Value(Decimal('0.00'), output_field=MONEY))
+
+    months = (
+        (ExtractYear('end_date') - ExtractYear('start_date')) * 12
+        + ExtractMonth('end_date') - ExtractMonth('start_date')
+        + Case(When(end_date__day__gte=ExtractDay('start_date'), then=Value(1)), default=Value(0))
+    )
+    locker_fees = ExpressionWrapper(F('security_fees') + F('monthly_fees') * months, output_field=MONEY)
+    Student.objects.update(balance_due=(
+        F('registration_fees') + total('Admission', 'admission_fees') + total('Locker', locker_fees)
+        - total('Payment', 'amount')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0013_student_admission_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='balance_due',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(condition=models.Q(('balance_due__gt', 0)), fields=['-balance_due', '-id'], name='student_defaulters_idx'),
+        ),
+        migrations.RunPython(compute_balances, migrations.RunPython.noop),
+    ]
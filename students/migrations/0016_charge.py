@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0015_exportjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Charge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('Admission', 'Admission Fees'), ('Locker', 'Locker Fees')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('reference', models.CharField(blank=True, max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='charges', to='students.student')),
+            ],
+            options={
+                'ordering': ['-end_date'],
+                'indexes': [models.Index(fields=['student', '-end_date'], name='charge_student_end_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:37
+
+from django.db import migrations, models
+
+
+def mark_retired(apps, schema_editor):
+    # Until now a retired locker was one that was unavailable without a student
+    TotalLockers = apps.get_model('students', 'TotalLockers')
+    TotalLockers.objects.filter(is_available=False, assigned_locker__isnull=True).update(retired=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0016_charge'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='totallockers',
+            name='retired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_retired, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.core.validators import RegexValidator
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .storage import photo_storage
 import os
 
 class Student(models.Model):
@@ -22,7 +25,8 @@ class Student(models.Model):
     date_of_birth = models.DateField()
     aadhaar_number = models.CharField(max_length=12, validators=[RegexValidator(regex=r'^\d{12}$')])
     address = models.TextField()
-    photo = models.ImageField(upload_to='student_photos/', blank=True, null=True)
+    photo = models.ImageField(upload_to='student_photos/', storage=photo_storage, blank=True, null=True, db_index=True)
+    photo_renditions = models.JSONField(default=dict, blank=True)  # written by students.images
     
     # Parent Information
     father_name = models.CharField(max_length=100)
@@ -32,6 +36,16 @@ class Student(models.Model):
     # Registration
     registration_fees = models.DecimalField(max_digits=10, decimal_places=2, default=200.00)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Active')
+
+    # Latest admission, copied by students.expiry.refresh_admission_summaries
+    # so the list filters and status recompute read one table
+    current_seat_type = models.CharField(max_length=20, choices=SEAT_CHOICES, blank=True, editable=False)
+    current_hours = models.CharField(max_length=2, blank=True, editable=False)
+    current_seat_number = models.CharField(max_length=10, blank=True, editable=False)
+    current_end_date = models.DateField(null=True, blank=True, editable=False)
+
+    # Fees expected minus payments, kept by students.dues.refresh_balances
+    balance_due = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -41,6 +55,49 @@ class Student(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='student_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='student_status_created_idx'),
+            models.Index(fields=['current_seat_type', '-created_at', '-id'], name='student_seat_type_created_idx'),
+            models.Index(fields=['current_hours', '-created_at', '-id'], name='student_hours_created_idx'),
+            models.Index(fields=['current_end_date'], name='student_current_end_idx'),
+            models.Index(
+                fields=['-balance_due', '-id'], condition=models.Q(balance_due__gt=0), name='student_defaulters_idx',
+            ),
+            # Prefix search in students.search
+            models.Index(Lower('name'), name='student_name_lower_idx'),
+            models.Index(Lower('email'), name='student_email_lower_idx'),
+            models.Index(fields=['mobile'], name='student_mobile_idx'),
+            models.Index(fields=['aadhaar_number'], name='student_aadhaar_idx'),
+        ]
+
+class Seat(models.Model):
+    number = models.CharField(max_length=10, unique=True)
+    seat_type = models.CharField(max_length=20, choices=Student.SEAT_CHOICES, default='Non-Reserved')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.number
+
+    class Meta:
+        ordering = ['number']
+
+
+class Slot(models.Model):
+    name = models.CharField(max_length=20, unique=True)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    def __str__(self):
+        return f"{self.name} ({self.start_time:%H:%M} - {self.end_time:%H:%M})"
+
+    class Meta:
+        ordering = ['start_time', 'end_time']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(end_time__gt=models.F('start_time')), name='slot_ends_after_start'),
+        ]
+
 
 class Admission(models.Model):
     HOUR_CHOICES = [
@@ -61,6 +118,11 @@ class Admission(models.Model):
     hours = models.CharField(max_length=2, choices=HOUR_CHOICES, default='2')
     slot_timing = models.CharField(max_length=20)
     seat_number = models.CharField(max_length=10)
+    slot = models.ForeignKey(Slot, on_delete=models.PROTECT, related_name='admissions', null=True, blank=True)
+    seat = models.ForeignKey(Seat, on_delete=models.PROTECT, related_name='admissions', null=True, blank=True)
+    # Copied from the slot so the no-double-booking constraint can see them
+    slot_start = models.TimeField(null=True, blank=True, editable=False)
+    slot_end = models.TimeField(null=True, blank=True, editable=False)
     seat_type = models.CharField(max_length=20, choices=Student.SEAT_CHOICES, default='Non-Reserved')
     admission_fees = models.DecimalField(max_digits=10, decimal_places=2, default=1900.00)
     
@@ -72,10 +134,24 @@ class Admission(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['end_date'], name='admission_end_date_idx'),
+            models.Index(fields=['seat', 'end_date'], name='admission_seat_end_idx'),
+            models.Index(fields=['student', 'end_date'], name='admission_student_end_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.slot_id:
+            self.slot_start, self.slot_end = self.slot.start_time, self.slot.end_time
+            self.slot_timing = self.slot.name
+        if self.seat_id:
+            self.seat_number = self.seat.number
+        super().save(*args, **kwargs)
 
 class TotalLockers(models.Model):
     locker_number = models.CharField(max_length=10, unique=True)  # e.g., "L001", "L002", etc.
     is_available = models.BooleanField(default=True)  # Tracks if the locker is available
+    retired = models.BooleanField(default=False)  # Out of service; stays unavailable when released
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -86,6 +162,9 @@ class TotalLockers(models.Model):
     class Meta:
         verbose_name_plural = "Total Lockers"
         ordering = ['locker_number']
+        indexes = [
+            models.Index(fields=['locker_number'], condition=models.Q(is_available=True), name='totallockers_available_idx'),
+        ]
 
 class Locker(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='lockers')
@@ -104,18 +183,30 @@ class Locker(models.Model):
     
     class Meta:
         ordering = ['total_locker__locker_number']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='locker_created_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        if not self.pk and self.total_locker:  # Only on creation
+        if self.pk or not self.total_locker_id:
+            return super().save(*args, **kwargs)
+        # Claim the locker with a conditional UPDATE so two concurrent saves
+        # cannot both take it; see students.lockers for the allocation service
+        with transaction.atomic():
+            claimed = TotalLockers.objects.filter(pk=self.total_locker_id, is_available=True).update(
+                is_available=False, updated_at=timezone.now(),
+            )
+            if not claimed:
+                raise IntegrityError(f'Locker {self.total_locker.locker_number} is already assigned.')
             self.total_locker.is_available = False
-            self.total_locker.save()
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
-        if self.total_locker:
-            self.total_locker.is_available = True
-            self.total_locker.save()
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            TotalLockers.objects.filter(pk=self.total_locker_id, retired=False).update(
+                is_available=True, updated_at=timezone.now(),
+            )
+            return super().delete(*args, **kwargs)
 
 class Payment(models.Model):
     PAYMENT_MODE_CHOICES = [
@@ -147,6 +238,56 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['-payment_date'], name='payment_date_idx'),
+            models.Index(fields=['payment_type', 'payment_date'], name='payment_type_date_idx'),
+            models.Index(fields=['student', '-payment_date'], name='payment_student_date_idx'),
+        ]
+
+class Charge(models.Model):
+    # Fees of an admission or locker that ended and was removed, recorded by
+    # students.dues.close_charges so payments made for it still balance
+    KIND_CHOICES = [
+        ('Admission', 'Admission Fees'),
+        ('Locker', 'Locker Fees'),
+    ]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='charges')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    reference = models.CharField(max_length=10, blank=True)  # seat or locker number
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.student.name} - {self.kind} ₹{self.amount} ({self.start_date} to {self.end_date})"
+
+    class Meta:
+        ordering = ['-end_date']
+        indexes = [
+            models.Index(fields=['student', '-end_date'], name='charge_student_end_idx'),
+        ]
+
+class RevenueRollup(models.Model):
+    # Running Payment totals per month/type/mode, maintained by students.rollups
+    month = models.DateField()  # first day of the month
+    payment_type = models.CharField(max_length=20, choices=Payment.PAYMENT_TYPE_CHOICES)
+    payment_mode = models.CharField(max_length=20, choices=Payment.PAYMENT_MODE_CHOICES)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.month:%b %Y} {self.payment_type}/{self.payment_mode} - ₹{self.total_amount}"
+
+    class Meta:
+        ordering = ['-month', 'payment_type', 'payment_mode']
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'payment_type', 'payment_mode'], name='unique_revenue_rollup'),
+        ]
 
 class ContactLead(models.Model):
     STATUS_CHOICES = [
@@ -170,4 +311,117 @@ class ContactLead(models.Model):
         return f"{self.name} - {self.status}"
     
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='contactlead_created_idx'),
+        ]
+
+class AdmissionSweep(models.Model):
+    # One row per run of the expiry sweeper; the latest row is the watermark
+    swept_through = models.DateField()  # admissions ending before this date were expired
+    admissions_deleted = models.PositiveIntegerField(default=0)
+    lockers_released = models.PositiveIntegerField(default=0)
+    students_deactivated = models.PositiveIntegerField(default=0)
+
+    ran_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Sweep through {self.swept_through} ({self.admissions_deleted} admissions)"
+
+    class Meta:
+        ordering = ['-ran_at']
+
+
+class ExportJob(models.Model):
+    KIND_CHOICES = [
+        ('students', 'Students'),
+        ('payments', 'Payments'),
+        ('lockers', 'Lockers'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('csv.gz', 'CSV (gzip)'),
+        ('ndjson', 'JSON Lines'),
+    ]
+
+    STATUS_CHOICES = [
+        ('Queued', 'Queued'),
+        ('Running', 'Running'),
+        ('Done', 'Done'),
+        ('Failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='students')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv')
+    params = models.JSONField(default=dict, blank=True)  # list-page filters for student exports
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Queued')
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)  # last progress write of a Running job
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} export #{self.pk} ({self.status})"
+
+    @property
+    def progress(self):
+        if self.status == 'Done':
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(100, int(self.rows_written * 100 / self.rows_total))
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_idx'),
+        ]
+
+
+class ImportJob(models.Model):
+    KIND_CHOICES = [
+        ('students', 'Students'),
+        ('admissions', 'Admissions'),
+        ('payments', 'Payments'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='students')
+    status = models.CharField(max_length=20, choices=ExportJob.STATUS_CHOICES, default='Queued')
+    file = models.FileField(upload_to='imports/')
+    original_name = models.CharField(max_length=255, blank=True)
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    error_report = models.FileField(upload_to='imports/', blank=True)  # CSV of rejected rows
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)  # last chunk committed by a Running job
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import #{self.pk} ({self.status})"
+
+    @property
+    def progress(self):
+        if self.status == 'Done':
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(100, int(self.rows_processed * 100 / self.rows_total))
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='importjob_status_idx'),
+        ]
@@ -0,0 +1,92 @@
+from datetime import timedelta
+from django.db.models import Max, Min
+from .cache import cached
+from .models import Admission, Seat, Slot
+
+# Used when no slots are defined
+DEFAULT_HOURS = (6, 22)
+DAYS = 7
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def opening_hours():
+    bounds = Slot.objects.aggregate(start=Min('start_time'), end=Max('end_time'))
+    if bounds['start'] is None:
+        return DEFAULT_HOURS
+    end = bounds['end'].hour + (1 if bounds['end'].minute or bounds['end'].second else 0)
+    return bounds['start'].hour, end
+
+
+def _hour_mask(slot_start, slot_end, first_hour, last_hour):
+    # Every hour the slot touches, even partly, counts as busy
+    start = max(slot_start.hour, first_hour)
+    end = min(slot_end.hour + (1 if slot_end.minute or slot_end.second else 0), last_hour)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << (start - first_hour)
+
+
+def occupancy_matrix(start):
+    """
+    Seats x hourly columns for the ``DAYS`` days from ``start``. Each seat's
+    row is a Python int used as a bit array, column ``day * hours + hour``,
+    so a booking is OR-ed into its row in a couple of big-int operations
+    however many days and hours it spans.
+    """
+    end = start + timedelta(days=DAYS - 1)
+    first_hour, last_hour = opening_hours()
+    width = last_hour - first_hour
+    day_stride = (1 << width) - 1
+
+    seats = list(Seat.objects.filter(is_active=True).values_list('id', 'number'))
+    rows = dict.fromkeys((seat_id for seat_id, _ in seats), 0)
+    bookings = Admission.objects.filter(
+        seat__isnull=False, slot_start__isnull=False, start_date__lte=end, end_date__gte=start,
+    ).values_list('seat_id', 'start_date', 'end_date', 'slot_start', 'slot_end').order_by()
+
+    for seat_id, start_date, end_date, slot_start, slot_end in bookings:
+        if seat_id not in rows:
+            continue
+        first_day = max((start_date - start).days, 0)
+        last_day = min((end_date - start).days, DAYS - 1)
+        # Repeat the hour mask on every booked day: multiplying by
+        # 1 + 2**width + 2**(2 * width) + ... copies it without carries
+        days = ((1 << (width * (last_day + 1))) - (1 << (width * first_day))) // day_stride
+        rows[seat_id] |= _hour_mask(slot_start, slot_end, first_hour, last_hour) * days
+
+    columns = width * DAYS
+    # format() writes the bits out in C; reversed so column 0 comes first
+    matrix = [
+        [int(bit) for bit in format(rows[seat_id], f'0{columns}b')[::-1]]
+        for seat_id, _ in seats
+    ]
+    busy_per_column = [sum(column) for column in zip(*matrix)] if matrix else [0] * columns
+
+    seat_count = len(seats)
+    total_busy = sum(busy_per_column)
+    return {
+        'start': start.isoformat(),
+        'days': [(start + timedelta(days=day)).isoformat() for day in range(DAYS)],
+        'hours': list(range(first_hour, last_hour)),
+        'seats': [number for _, number in seats],
+        'matrix': matrix,
+        'utilization': {
+            'overall': _percent(total_busy, seat_count * columns),
+            'by_seat': [_percent(rows[seat_id].bit_count(), columns) for seat_id, _ in seats],
+            'by_column': [_percent(busy, seat_count) for busy in busy_per_column],
+        },
+    }
+
+
+def _percent(part, whole):
+    return round(100 * part / whole, 1) if whole else 0.0
+
+
+def cached_occupancy(start):
+    # Slots set the opening hours, so they are part of the key as well
+    return cached(
+        ['admissions', 'seats', 'slots'], f'occupancy:{start.isoformat()}', lambda: occupancy_matrix(start),
+    )
@@ -0,0 +1,297 @@
+import asyncio
+import base64
+import binascii
+import json
+from functools import cached_property
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+
+# Rows counted exactly before falling back to an estimate
+COUNT_CAP = 1000
+
+
+class EstimatedCount:
+    def __init__(self, value, exact):
+        self.value = value
+        self.exact = exact
+
+    def __str__(self):
+        if self.exact:
+            return f'{self.value:,}'
+        if self.value > COUNT_CAP:
+            return f'~{self.value:,}'
+        return f'{COUNT_CAP:,}+'
+
+
+def estimate_count(queryset):
+    """
+    Count ``queryset`` exactly up to COUNT_CAP rows. Past that, PostgreSQL
+    answers with the planner's row estimate and other databases report
+    "COUNT_CAP+", so the cost never grows with the table.
+    """
+    count = queryset.order_by()[:COUNT_CAP + 1].count()
+    if count <= COUNT_CAP:
+        return EstimatedCount(count, True)
+    return _planner_estimate(queryset, count)
+
+
+async def aestimate_count(queryset):
+    """estimate_count() for async views."""
+    count = await queryset.order_by()[:COUNT_CAP + 1].acount()
+    if count <= COUNT_CAP:
+        return EstimatedCount(count, True)
+    # EXPLAIN needs a raw cursor, which has no async API
+    return await sync_to_async(_planner_estimate)(queryset, count)
+
+
+def _planner_estimate(queryset, count):
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return EstimatedCount(max(int(plan[0]['Plan']['Plan Rows']), count), False)
+    return EstimatedCount(count, False)
+
+
+def _encode(value):
+    if isinstance(value, (int, float, str)):
+        return value
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over ``queryset``'s ordering with the primary key as
+    the tie-breaker. Each page is fetched with ``WHERE key < cursor LIMIT n``
+    on an index, so page 5,000 costs the same as page 1, and links stay
+    stable when rows are added in front of the current page.
+
+    Pages are not addressable by number; the window around the current page
+    is built from one keys-only lookahead and one lookbehind query.
+    """
+
+    def __init__(self, queryset, per_page, window=2, param='cursor'):
+        ordering = [str(field) for field in (queryset.query.order_by or queryset.model._meta.ordering)]
+        if not any(field.lstrip('-') in ('pk', queryset.model._meta.pk.name) for field in ordering):
+            ordering.append('-pk' if ordering and ordering[-1].startswith('-') else 'pk')
+        self.queryset = queryset.order_by(*ordering)
+        self.ordering = ordering
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.per_page = per_page
+        self.window = window
+        self.param = param
+
+    def get_page(self, query_dict):
+        """The page named by the cursor in ``query_dict``; the first page if it is missing or invalid."""
+        return KeysetPage(self, query_dict, self.decode(query_dict.get(self.param)))
+
+    async def aget_page(self, query_dict):
+        """get_page() for async views, with everything the page template reads already fetched."""
+        page = self.get_page(query_dict)
+        await page.aload()
+        return page
+
+    def encode(self, direction, keys, number):
+        payload = json.dumps({'d': direction, 'k': [_encode(key) for key in keys], 'n': number})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        if not cursor:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            direction, keys, number = payload['d'], payload['k'], int(payload['n'])
+            if direction not in ('next', 'prev') or len(keys) != len(self.fields) or number < 2:
+                return None
+            return direction, [self._to_python(field, key) for field, key in zip(self.fields, keys)], number
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+            return None
+
+    def _to_python(self, field, value):
+        opts = self.queryset.model._meta
+        if field == 'pk':
+            return opts.pk.to_python(value)
+        try:
+            return opts.get_field(field).to_python(value)
+        except FieldDoesNotExist:
+            # Annotations such as a search rank are plain JSON numbers
+            return value
+
+    def _seek(self, keys, forward):
+        """Rows strictly after ``keys`` in the ordering (or before, when not ``forward``)."""
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            descending = field.startswith('-') == forward
+            name = self.fields[i]
+            step = Q(**{f'{name}__{"lt" if descending else "gt"}': keys[i]})
+            for prior, key in zip(self.fields[:i], keys[:i]):
+                step &= Q(**{prior: key})
+            condition |= step
+        # The redundant bound on the leading column gives the planner an index range
+        first = self.ordering[0].startswith('-') == forward
+        bound = Q(**{f'{self.fields[0]}__{"lte" if first else "gte"}': keys[0]})
+        queryset = self.queryset.filter(bound & condition)
+        if not forward:
+            queryset = queryset.reverse()
+        return queryset
+
+    def keys_of(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+
+class KeysetPage:
+    def __init__(self, paginator, query_dict, cursor):
+        self.paginator = paginator
+        self.query_dict = query_dict
+        self.cursor = cursor
+
+    def _first_rows(self):
+        return self.paginator.queryset[:self.paginator.per_page]
+
+    def _cursor_rows(self):
+        direction, keys, _ = self.cursor
+        return self.paginator._seek(keys, direction == 'next')[:self.paginator.per_page]
+
+    def _settle(self, rows):
+        """``(rows, number)`` for the rows found at the cursor, or None to restart from the top."""
+        direction, _, number = self.cursor
+        if direction == 'prev':
+            rows = rows[::-1]
+        if not rows or (direction == 'prev' and len(rows) < self.paginator.per_page):
+            # Rows were removed around the cursor
+            return None
+        return rows, number
+
+    @cached_property
+    def _loaded(self):
+        settled = self.cursor and self._settle(list(self._cursor_rows()))
+        return settled or (list(self._first_rows()), 1)
+
+    async def aload(self):
+        """Fetch the rows and the links' lookahead and lookbehind with the async ORM."""
+        settled = self.cursor and self._settle([row async for row in self._cursor_rows()])
+        self._loaded = settled or ([row async for row in self._first_rows()], 1)
+        self._ahead, self._behind = await asyncio.gather(_alist(self._ahead_rows()), _alist(self._behind_rows()))
+
+    @property
+    def object_list(self):
+        return self._loaded[0]
+
+    @property
+    def number(self):
+        return self._loaded[1]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def _ahead_rows(self):
+        rows, per_page = self.object_list, self.paginator.per_page
+        if len(rows) < per_page:
+            return None
+        keys = self.paginator.keys_of(rows[-1])
+        return self.paginator._seek(keys, True).values_list(*self.paginator.fields)[:per_page * self.paginator.window]
+
+    def _behind_rows(self):
+        if self.number == 1 or not self.object_list:
+            return None
+        keys = self.paginator.keys_of(self.object_list[0])
+        return self.paginator._seek(keys, False).values_list(*self.paginator.fields)[:self.paginator.per_page * self.paginator.window]
+
+    @cached_property
+    def _ahead(self):
+        rows = self._ahead_rows()
+        return [] if rows is None else list(rows)
+
+    @cached_property
+    def _behind(self):
+        rows = self._behind_rows()
+        return [] if rows is None else list(rows)
+
+    def _query(self, cursor):
+        # The rest of the query string (filters, search) is carried over
+        params = self.query_dict.copy()
+        params.pop(self.paginator.param, None)
+        if cursor:
+            params[self.paginator.param] = cursor
+        return params.urlencode()
+
+    def _link(self, number):
+        paginator, per_page = self.paginator, self.paginator.per_page
+        offset = number - self.number
+        if number == 1:
+            cursor = None
+        elif offset > 0:
+            keys = paginator.keys_of(self.object_list[-1]) if offset == 1 else self._ahead[per_page * (offset - 1) - 1]
+            cursor = paginator.encode('next', keys, number)
+        else:
+            offset = -offset
+            keys = paginator.keys_of(self.object_list[0]) if offset == 1 else self._behind[per_page * (offset - 1) - 1]
+            cursor = paginator.encode('prev', keys, number)
+        return {'number': number, 'query': self._query(cursor), 'current': False}
+
+    def has_next(self):
+        return bool(self._ahead)
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    @property
+    def next_query(self):
+        return self._link(self.number + 1)['query']
+
+    @property
+    def previous_query(self):
+        return self._link(self.number - 1)['query']
+
+    @property
+    def first_query(self):
+        return self._query(None)
+
+    @property
+    def show_first(self):
+        # Page 1 is not already in the window
+        return self.number > self.paginator.window + 1
+
+    @property
+    def page_window(self):
+        """Links for the pages within ``window`` of this one that are known to exist."""
+        per_page, window = self.paginator.per_page, self.paginator.window
+        before = [
+            self.number - k for k in range(window, 0, -1)
+            if self.number - k >= 1 and (k == 1 or self.number - k == 1 or len(self._behind) >= per_page * (k - 1))
+        ]
+        after = [self.number + k for k in range(1, window + 1) if len(self._ahead) > per_page * (k - 1)]
+        return [self._link(number) for number in before] + [
+            {'number': self.number, 'query': None, 'current': True}
+        ] + [self._link(number) for number in after]
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.paginator.queryset)
+
+    @property
+    def start_index(self):
+        return (self.number - 1) * self.paginator.per_page + 1 if self.object_list else 0
+
+    @property
+    def end_index(self):
+        return self.start_index + len(self.object_list) - 1 if self.object_list else 0
+
+
+async def _alist(queryset):
+    return [] if queryset is None else [row async for row in queryset]
@@ -0,0 +1,361 @@
+import bisect
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.template.backends.django import DjangoTemplates, Template
+from .profiling import fingerprint, log_slow_query, origin
+
+logger = logging.getLogger(__name__)
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (1, 2, 5, 10, 20, 50, 100, 200)
+BYTES = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2)
+
+# Per-view histograms: name -> (help text, bucket upper bounds)
+HISTOGRAMS = {
+    'request_duration_seconds': ('Wall time spent serving the request.', SECONDS),
+    'db_duration_seconds': ('Time spent running database queries.', SECONDS),
+    'db_queries': ('Database queries run by the request.', QUERIES),
+    'template_duration_seconds': ('Time spent rendering templates.', SECONDS),
+    'response_size_bytes': ('Size of the response body.', BYTES),
+}
+PREFIX = 'pathshala_'
+
+# Each worker publishes its histograms to the shared cache at most this
+# often, so /metrics/ reports every gunicorn worker, not just the one it hit
+FLUSH_INTERVAL = 10
+WORKER_TTL = 24 * 60 * 60
+WORKERS_KEY = 'performance:workers'
+
+# Distinct query fingerprints kept per worker; later ones are pooled
+MAX_FINGERPRINTS = 500
+OTHER_QUERIES = '<other>'
+
+_timings = ContextVar('performance_timings', default=None)
+
+
+def _view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else '<unresolved>'
+
+
+class Timings:
+    """
+    What one sampled request spent. Called for each of its queries, which it
+    counts, adds to the fingerprint stats and logs when slow.
+    """
+
+    __slots__ = ('request', 'slow', 'queries', 'db', 'template')
+
+    def __init__(self, request):
+        self.request = request
+        self.slow = settings.PERF_SLOW_QUERY_MS / 1000
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db += elapsed
+            self.queries += 1
+            view = _view_name(self.request)
+            registry.observe_query(sql, None if many else (params or ()), elapsed, view)
+            if self.slow and elapsed >= self.slow:
+                log_slow_query(sql, elapsed, view)
+
+
+def _execute(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """
+    connection_created receiver installing the query timer on every new
+    connection. Connections belong to threads, and under ASGI queries run in
+    sync_to_async threads, so the sampled request is found through a
+    context variable rather than by wrapping connections per request.
+    """
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _timings.get()
+        if timings is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders of sampled requests."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def _worker():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Registry:
+    """
+    Cumulative per-view histograms of this process. Each row holds a count
+    per bucket, one for +Inf and the sum of observed values. ``queries``
+    holds count, total and max seconds per SQL fingerprint, with the views
+    that ran it and the SQL of the slowest run as a sample.
+
+    Query parameters carry session keys and students' details, so they never
+    reach ``queries`` or the shared cache. With ``keep_params`` on, the
+    slowest run's are kept in ``params`` in this process only, for
+    ``query_report --run --explain``.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keep_params = False
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.histograms = {}
+            self.requests = {}
+            self.queries = {}
+            self.params = {}
+            self.flushed = 0.0
+
+    def observe(self, view, method, status, values):
+        with self.lock:
+            key = (view, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            for name, value in values.items():
+                if value is None:
+                    continue
+                buckets = HISTOGRAMS[name][1]
+                row = self.histograms.get((name, view))
+                if row is None:
+                    row = self.histograms[(name, view)] = [0] * (len(buckets) + 1) + [0]
+                row[bisect.bisect_left(buckets, value)] += 1
+                row[-1] += value
+
+    def observe_query(self, sql, params, elapsed, view):
+        key = fingerprint(sql)
+        with self.lock:
+            stats = self.queries.get(key)
+            if stats is None:
+                if len(self.queries) >= MAX_FINGERPRINTS:
+                    key, sql, params = OTHER_QUERIES, '', None
+                    stats = self.queries.get(key)
+                if stats is None:
+                    stats = self.queries[key] = {'count': 0, 'total': 0.0, 'max': -1.0, 'views': {}}
+            stats['count'] += 1
+            stats['total'] += elapsed
+            stats['views'][view] = stats['views'].get(view, 0) + 1
+            if elapsed > stats['max']:
+                # Keep the slowest run as the sample to EXPLAIN
+                stats.update(max=elapsed, sql=sql, origin=origin())
+                if self.keep_params:
+                    self.params[key] = params
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'histograms': [[name, view, list(row)] for (name, view), row in self.histograms.items()],
+                'requests': [[*key, count] for key, count in self.requests.items()],
+                'queries': {key: {**stats, 'views': dict(stats['views'])} for key, stats in self.queries.items()},
+            }
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.flushed < FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        worker = _worker()
+        cache.set(f'performance:{worker}', self.snapshot(), WORKER_TTL)
+        workers = cache.get(WORKERS_KEY) or set()
+        if worker not in workers:
+            cache.set(WORKERS_KEY, workers | {worker}, None)
+
+
+registry = Registry()
+
+
+def collect():
+    """Histograms, request counts and query stats summed over every worker that published recently."""
+    if registry.requests:
+        registry.flush(force=True)
+    workers = cache.get(WORKERS_KEY) or set()
+    snapshots = cache.get_many([f'performance:{worker}' for worker in workers])
+    if len(snapshots) < len(workers):
+        # Forget workers whose snapshot expired (restarted or idle for a day)
+        cache.set(WORKERS_KEY, {key.split(':', 1)[1] for key in snapshots}, None)
+
+    histograms, requests, queries = {}, {}, {}
+    for snapshot in snapshots.values():
+        for name, view, row in snapshot['histograms']:
+            if name not in HISTOGRAMS:
+                continue
+            total = histograms.setdefault((name, view), [0] * len(row))
+            for i, value in enumerate(row):
+                total[i] += value
+        for view, method, status, count in snapshot['requests']:
+            requests[(view, method, status)] = requests.get((view, method, status), 0) + count
+        for key, stats in snapshot.get('queries', {}).items():
+            total = queries.get(key)
+            if total is None:
+                queries[key] = {**stats, 'views': dict(stats['views'])}
+                continue
+            total['count'] += stats['count']
+            total['total'] += stats['total']
+            for view, count in stats['views'].items():
+                total['views'][view] = total['views'].get(view, 0) + count
+            if stats['max'] > total['max']:
+                total.update(max=stats['max'], sql=stats['sql'], origin=stats['origin'])
+    return histograms, requests, queries
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def exposition():
+    """All metrics in the Prometheus text exposition format."""
+    histograms, requests, _ = collect()
+    lines = [
+        f'# HELP {PREFIX}requests_total Requests served, by view, method and status.',
+        f'# TYPE {PREFIX}requests_total counter',
+    ]
+    for (view, method, status), count in sorted(requests.items()):
+        lines.append(f'{PREFIX}requests_total{_labels(view=view, method=method, status=status)} {count}')
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {PREFIX}{name} {help_text}', f'# TYPE {PREFIX}{name} histogram']
+        for (metric, view), row in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], row[:-1]):
+                cumulative += count
+                lines.append(f'{PREFIX}{name}_bucket{_labels(view=view, le=bound)} {cumulative}')
+            lines.append(f'{PREFIX}{name}_sum{_labels(view=view)} {row[-1]}')
+            lines.append(f'{PREFIX}{name}_count{_labels(view=view)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def _size(response):
+    if not response.streaming:
+        return len(response.content)
+    length = response.get('Content-Length')
+    return int(length) if length else None
+
+
+def _sampled():
+    rate = settings.PERF_SAMPLE_RATE
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+class PerformanceMiddleware:
+    """
+    Times a ``PERF_SAMPLE_RATE`` share of requests: wall time, queries and
+    their time, template rendering and response size. Sampled responses get a
+    ``Server-Timing`` header, a JSON log line and an entry in the per-view
+    histograms behind /metrics/. Unsampled requests pass straight through.
+
+    Streaming bodies are produced after the response leaves here, so their
+    time and queries are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _sampled():
+            return self.get_response(request)
+        timings = Timings(request)
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        response = self.record(request, response, timings, time.perf_counter() - started)
+        registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        if not _sampled():
+            return await self.get_response(request)
+        timings = Timings(request)
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        response = self.record(request, response, timings, time.perf_counter() - started)
+        # Publishing reads and writes the cache, which blocks
+        await sync_to_async(registry.flush)()
+        return response
+
+    def record(self, request, response, timings, elapsed):
+        view = _view_name(request)
+        size = _size(response)
+        response['Server-Timing'] = (
+            f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries", '
+            f'tpl;dur={timings.template * 1000:.1f}, total;dur={elapsed * 1000:.1f}'
+        )
+        registry.observe(view, request.method, response.status_code, {
+            'request_duration_seconds': elapsed,
+            'db_duration_seconds': timings.db,
+            'db_queries': timings.queries,
+            'template_duration_seconds': timings.template,
+            'response_size_bytes': size,
+        })
+
+        level = logging.WARNING if elapsed * 1000 >= settings.PERF_SLOW_REQUEST_MS else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'duration_ms': round(elapsed * 1000, 1),
+                'db_queries': timings.queries,
+                'db_ms': round(timings.db * 1000, 1),
+                'template_ms': round(timings.template * 1000, 1),
+                'bytes': size,
+            }))
+        return response
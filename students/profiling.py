@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import re
+import sys
+from functools import lru_cache
+import sqlparse
+from sqlparse import tokens as T
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Tokens standing for values rather than query shape
+VALUE_TOKENS = (T.Literal.Number, T.Literal.String.Single, T.Name.Placeholder)
+VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+REPEATED_LISTS = re.compile(r'\(\.\.\.\)(?:, \(\.\.\.\))+')
+
+# Frames in these files are the profiler, the benchmark driving the views
+# or middleware every request passes through, never a query's origin
+HERE = os.path.dirname(os.path.abspath(__file__))
+OWN_FILES = {os.path.join(HERE, name) for name in ('profiling.py', 'performance.py', 'benchmark.py')} | {
+    os.path.join(os.path.dirname(HERE), 'libraryms', 'middleware.py'),
+}
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """
+    ``sql`` with its values replaced by ``?``, whitespace collapsed,
+    keywords upper-cased and IN lists / multi-row VALUES folded, so every
+    run of the same query shape maps to one string.
+    """
+    parts = []
+    for token in sqlparse.parse(sql)[0].flatten() if sql.strip() else ():
+        if token.is_whitespace or token.ttype in T.Comment:
+            if parts and parts[-1] != ' ':
+                parts.append(' ')
+        elif any(token.ttype in kind for kind in VALUE_TOKENS):
+            parts.append('?')
+        elif token.is_keyword:
+            parts.append(token.normalized)
+        else:
+            parts.append(token.value)
+    text = ''.join(parts).strip()
+    return REPEATED_LISTS.sub('(...), ...', VALUE_LIST.sub('(...)', text))
+
+
+def origin():
+    """``path:line in function`` of the innermost project frame on the stack, outside site-packages."""
+    base = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(base) and filename not in OWN_FILES and 'site-packages' not in filename:
+            return f'{os.path.relpath(filename, base)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return ''
+
+
+def log_slow_query(sql, elapsed, view):
+    """Log one query that took PERF_SLOW_QUERY_MS or longer, with the view and code that ran it."""
+    logger.warning(json.dumps({
+        'view': view,
+        'duration_ms': round(elapsed * 1000, 1),
+        'origin': origin(),
+        'fingerprint': fingerprint(sql),
+    }))
+
+
+def explain(sql, params=(), using='default'):
+    """
+    The plan of the SELECT ``sql`` as text lines: ``EXPLAIN (ANALYZE,
+    BUFFERS)`` on PostgreSQL, which runs the query, and ``EXPLAIN QUERY
+    PLAN`` on SQLite. Runs in a transaction that is rolled back.
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        raise ValueError('Only SELECT statements are explained.')
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+        transaction.set_rollback(True, using=using)
+
+    if connection.vendor != 'sqlite':
+        return [' '.join(str(value) for value in row) for row in rows]
+    # (id, parent, notused, detail): indent each step under its parent
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+
+def rank(queries, sort='total', limit=20):
+    """
+    The ``limit`` most expensive fingerprints of ``queries`` (as collected by
+    students.performance) by ``sort``: total, mean or max seconds, or count.
+    """
+    keys = {
+        'total': lambda stats: stats['total'],
+        'mean': lambda stats: stats['total'] / stats['count'],
+        'max': lambda stats: stats['max'],
+        'count': lambda stats: stats['count'],
+    }
+    return sorted(queries.items(), key=lambda item: keys[sort](item[1]), reverse=True)[:limit]
@@ -0,0 +1,111 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Sum, Count
+from django.db.models.functions import TruncMonth
+from .models import Payment, RevenueRollup
+from .cache import invalidate
+
+
+def _entry(payment):
+    # Signals see the raw POST strings views assign before saving, so normalise them here
+    amount = Payment._meta.get_field('amount').to_python(payment.amount)
+    payment_date = Payment._meta.get_field('payment_date').to_python(payment.payment_date)
+    return payment_date.replace(day=1), payment.payment_type, payment.payment_mode, amount
+
+
+def _bump(month, payment_type, payment_mode, amount, count):
+    row, _ = RevenueRollup.objects.get_or_create(
+        month=month, payment_type=payment_type, payment_mode=payment_mode,
+    )
+    RevenueRollup.objects.filter(pk=row.pk).update(
+        total_amount=F('total_amount') + amount,
+        payment_count=F('payment_count') + count,
+    )
+
+
+def save_payment(payment, previous=None):
+    """
+    Count a saved ``payment``, moving it out of the row its ``previous``
+    stored state (None for a new payment) was counted in. Called from
+    the Payment post_save signal.
+    """
+    entry = _entry(payment)
+    if previous is not None:
+        if _entry(previous) == entry:
+            return
+        remove_payment(previous)
+    _bump(*entry, 1)
+
+
+def remove_payment(payment):
+    month, payment_type, payment_mode, amount = _entry(payment)
+    _bump(month, payment_type, payment_mode, -amount, -1)
+
+
+def add_payments(payments):
+    """Add a list of newly bulk-created payments, one rollup update per group."""
+    totals = {}
+    for payment in payments:
+        month, payment_type, payment_mode, amount = _entry(payment)
+        key = (month, payment_type, payment_mode)
+        total, count = totals.get(key, (0, 0))
+        totals[key] = (total + amount, count + 1)
+    for (month, payment_type, payment_mode), (amount, count) in totals.items():
+        _bump(month, payment_type, payment_mode, amount, count)
+
+
+def remove_payments(payments):
+    """Subtract a whole queryset of payments, e.g. before a cascading delete."""
+    for row in _grouped(payments):
+        _bump(row['month'], row['payment_type'], row['payment_mode'], -row['total_amount'], -row['payment_count'])
+
+
+def _grouped(payments):
+    return (
+        payments.order_by()
+        .annotate(month=TruncMonth('payment_date'))
+        .values('month', 'payment_type', 'payment_mode')
+        .annotate(total_amount=Sum('amount'), payment_count=Count('id'))
+    )
+
+
+def _key(row):
+    return (row['month'], row['payment_type'], row['payment_mode'])
+
+
+def find_drift():
+    """
+    Compare the stored rollup with a fresh aggregate over Payment. Returns a
+    list of ``(key, stored, expected)`` tuples where each side is an
+    ``(amount, count)`` pair.
+    """
+    zero = (Decimal('0'), 0)
+    expected = {_key(row): (row['total_amount'], row['payment_count']) for row in _grouped(Payment.objects.all())}
+    stored = {
+        _key(row): (row['total_amount'], row['payment_count'])
+        for row in RevenueRollup.objects.values('month', 'payment_type', 'payment_mode', 'total_amount', 'payment_count')
+    }
+    drift = []
+    for key in sorted(expected.keys() | stored.keys()):
+        have, want = stored.get(key, zero), expected.get(key, zero)
+        if have[0] != want[0] or have[1] != want[1]:
+            drift.append((key, have, want))
+    return drift
+
+
+def rebuild():
+    """Recompute the whole rollup from Payment. Returns the number of rows written."""
+    with transaction.atomic():
+        RevenueRollup.objects.all().delete()
+        rows = RevenueRollup.objects.bulk_create([
+            RevenueRollup(
+                month=row['month'],
+                payment_type=row['payment_type'],
+                payment_mode=row['payment_mode'],
+                total_amount=row['total_amount'],
+                payment_count=row['payment_count'],
+            )
+            for row in _grouped(Payment.objects.all())
+        ])
+        invalidate('payments')
+    return len(rows)
@@ -0,0 +1,112 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, When, Value, Q, FloatField
+from django.db.models.functions import Greatest, Lower, Upper
+from .models import Student
+
+# Shortest text query retried as a substring search, which scans the table
+MIN_SUBSTRING_QUERY = 3
+
+
+def _prefix_range(field, prefix):
+    """
+    ``field`` starts with ``prefix``, written as a half-open range so a plain
+    B-tree (or expression) index can answer it on any backend.
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+
+
+def _numeric_q(query):
+    return Q(pk=int(query)) | _prefix_range('mobile', query) | _prefix_range('aadhaar_number', query)
+
+
+def filter_students(filter_type='all', hours_filter='', search_query='', substrings=False):
+    """The student queryset behind the list page filters, hours and search box."""
+    if filter_type == 'active':
+        students = Student.objects.filter(status='Active')
+    elif filter_type == 'inactive':
+        students = Student.objects.filter(status='Inactive')
+    elif filter_type == 'expiring':
+        students = Student.objects.filter(status='Expiring Soon')
+    elif filter_type == 'reserved':
+        students = Student.objects.filter(current_seat_type='Reserved')
+    elif filter_type == 'non_reserved':
+        students = Student.objects.filter(current_seat_type='Non-Reserved')
+    else:
+        students = Student.objects.all()
+
+    if hours_filter:
+        students = students.filter(current_hours=hours_filter)
+
+    if search_query:
+        students = search_students(students, search_query, substrings)
+    return students
+
+
+def search_students(students, query, substrings=False):
+    """
+    Filter ``students`` by ``query`` and order the matches by relevance.
+
+    Numeric queries match the ID exactly and mobile/Aadhaar numbers by
+    prefix. Text queries use pg_trgm similarity on PostgreSQL and indexed
+    prefix lookups on name and email elsewhere, or with ``substrings`` match
+    anywhere in them, which scans the table (see substring_fallback).
+    """
+    query = query.strip()
+    if not query:
+        return students
+
+    if connections[students.db].vendor == 'postgresql':
+        return _search_postgres(students, query)
+    return _search_prefix(students, query, substrings)
+
+
+def substring_fallback(search_query, substrings=False):
+    """
+    Whether a prefix search for ``search_query`` that found nothing should be
+    run again with ``substrings``: off PostgreSQL, whose trigram search
+    already matches inside names, for text queries of MIN_SUBSTRING_QUERY
+    characters or more. Deciding on the empty page costs nothing extra
+    when the prefix search matches.
+    """
+    query = search_query.strip()
+    return (
+        not substrings and len(query) >= MIN_SUBSTRING_QUERY and not query.isdigit()
+        and connections[Student.objects.db].vendor != 'postgresql'
+    )
+
+
+def _search_postgres(students, query):
+    # Both icontains (UPPER(col) LIKE) and the trigram operator on UPPER(col)
+    # are answered by the gin_trgm_ops indexes on UPPER(name)/UPPER(email)
+    needle = query.upper()
+    students = students.annotate(name_upper=Upper('name'), email_upper=Upper('email'))
+    match = (
+        Q(name__icontains=query) | Q(email__icontains=query) |
+        Q(name_upper__trigram_similar=needle) | Q(email_upper__trigram_similar=needle)
+    )
+    rank = Greatest(TrigramSimilarity('name_upper', needle), TrigramSimilarity('email_upper', needle))
+    if query.isdigit():
+        match |= _numeric_q(query)
+        rank = Case(When(pk=int(query), then=Value(2.0)), default=rank, output_field=FloatField())
+    return students.filter(match).annotate(rank=rank).order_by('-rank', '-created_at')
+
+
+def _search_prefix(students, query, substrings=False):
+    if query.isdigit():
+        return students.filter(_numeric_q(query)).annotate(
+            rank=Case(When(pk=int(query), then=Value(2)), default=Value(1)),
+        ).order_by('-rank', '-created_at')
+
+    prefix = query.lower()
+    if substrings:
+        match = Q(name__icontains=query) | Q(email__icontains=query)
+    else:
+        match = _prefix_range('name_lower', prefix) | _prefix_range('email_lower', prefix)
+    return students.annotate(
+        name_lower=Lower('name'),
+        email_lower=Lower('email'),
+    ).filter(match).annotate(
+        rank=Case(When(name_lower=prefix, then=Value(2)), default=Value(1)),
+    ).order_by('-rank', '-created_at')
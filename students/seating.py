@@ -0,0 +1,104 @@
+from django.db import IntegrityError, connections
+from django.db.models.expressions import RawSQL
+from .cache import version
+from .models import Admission, Seat
+
+# Name of the exclusion constraint (PostgreSQL) / trigger (SQLite) that
+# refuses overlapping bookings of one seat, see migration 0010
+BOOKING_CONSTRAINT = 'admission_seat_no_overlap'
+
+
+class IntervalTree:
+    """
+    Static interval tree over closed ``(low, high, value)`` intervals: the
+    intervals sorted by ``low`` form an implicit balanced tree, each node
+    remembering the largest ``high`` below it. ``overlapping`` visits only
+    subtrees that can contain a hit, so a query costs O(log n + hits).
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=lambda interval: interval[0])
+        self.max_high = [None] * len(self.intervals)
+        self._build(0, len(self.intervals))
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        highs = [self.intervals[mid][1]]
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None:
+                highs.append(child)
+        self.max_high[mid] = max(highs)
+        return self.max_high[mid]
+
+    def overlapping(self, low, high):
+        """Values of every interval that overlaps ``[low, high]``."""
+        found = []
+        stack = [(0, len(self.intervals))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_high[mid] < low:
+                continue
+            start, end, value = self.intervals[mid]
+            stack.append((lo, mid))
+            if start <= high:
+                if end >= low:
+                    found.append(value)
+                stack.append((mid + 1, hi))
+        return found
+
+    def __len__(self):
+        return len(self.intervals)
+
+
+# One tree per process, rebuilt when the admissions cache version moves
+_tree = (None, None)
+
+
+def booking_tree():
+    """Interval tree of seat bookings by date, values ``(seat_id, slot_start, slot_end)``."""
+    global _tree
+    current = version('admissions')
+    if _tree[0] != current:
+        bookings = Admission.objects.filter(seat__isnull=False, slot_start__isnull=False).values_list(
+            'start_date', 'end_date', 'seat_id', 'slot_start', 'slot_end',
+        ).order_by()
+        _tree = (current, IntervalTree(
+            (start_date, end_date, (seat_id, slot_start, slot_end))
+            for start_date, end_date, seat_id, slot_start, slot_end in bookings
+        ))
+    return _tree[1]
+
+
+def booked_seat_ids(start_date, end_date, slot):
+    """IDs of seats with a booking that overlaps the dates and the slot's hours."""
+    return {
+        seat_id
+        for seat_id, slot_start, slot_end in booking_tree().overlapping(start_date, end_date)
+        if slot_start < slot.end_time and slot.start_time < slot_end
+    }
+
+
+def available_seats(start_date, end_date, slot, seat_type=None):
+    """Active seats that are free for the whole date range during ``slot``."""
+    seats = Seat.objects.filter(is_active=True)
+    if seat_type:
+        seats = seats.filter(seat_type=seat_type)
+    if connections[seats.db].vendor == 'postgresql':
+        # The same expressions as the exclusion constraint, so its GiST index answers the overlap
+        return seats.exclude(pk__in=RawSQL(
+            "SELECT seat_id FROM students_admission WHERE seat_id IS NOT NULL AND slot_start IS NOT NULL "
+            "AND daterange(start_date, end_date, '[]') && daterange(%s, %s, '[]') "
+            "AND tsrange(DATE '2000-01-01' + slot_start, DATE '2000-01-01' + slot_end) "
+            "&& tsrange(DATE '2000-01-01' + %s::time, DATE '2000-01-01' + %s::time)",
+            [start_date, end_date, slot.start_time, slot.end_time],
+        ))
+    return seats.exclude(pk__in=booked_seat_ids(start_date, end_date, slot))
+
+
+def is_double_booking(error):
+    return isinstance(error, IntegrityError) and BOOKING_CONSTRAINT in str(error)
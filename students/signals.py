@@ -0,0 +1,100 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from .models import Student, Admission, Locker, TotalLockers, Payment, Charge, RevenueRollup, Seat, Slot
+from .cache import invalidate
+from .expiry import recompute_statuses, refresh_admission_summaries
+from .dues import refresh_balances
+from .rollups import remove_payment, remove_payments, save_payment
+from .performance import instrument_connection
+
+# Cache namespaces (see students.cache) touched by writes to each model
+CACHE_NAMESPACES = {
+    Student: ['students'],
+    Admission: ['admissions'],
+    Locker: ['lockers'],
+    TotalLockers: ['lockers'],
+    Payment: ['payments'],
+    RevenueRollup: ['payments'],
+    Seat: ['seats'],
+    Slot: ['slots'],
+}
+
+
+def _refresh_students(instance, origin, refresh):
+    """
+    Run ``refresh`` for the student of a saved or deleted ``instance``. A
+    cascade from Student leaves nothing to refresh; the students touched by
+    one queryset delete (admin bulk actions, ``filter(...).delete()``) are
+    refreshed together once it commits.
+    """
+    if origin is None or origin is instance:
+        refresh([instance.student_id])
+    elif not (isinstance(origin, Student) or getattr(origin, 'model', None) is Student):
+        key = f'_pending_{refresh.__name__}'
+        pending = origin.__dict__.get(key)
+        if pending is None:
+            pending = origin.__dict__[key] = set()
+            transaction.on_commit(lambda: refresh(list(pending)))
+        pending.add(instance.student_id)
+
+
+def refresh_admissions(student_ids):
+    refresh_admission_summaries(student_ids)
+    recompute_statuses(student_ids)
+
+
+@receiver(post_save, sender=Admission)
+@receiver(post_delete, sender=Admission)
+def refresh_student_admission(sender, instance, origin=None, **kwargs):
+    _refresh_students(instance, origin, refresh_admissions)
+
+
+@receiver(post_save, sender=Student)
+def refresh_student_balance(sender, instance, **kwargs):
+    # Registration fees are part of the balance
+    refresh_balances([instance.pk])
+
+
+def refresh_dues(sender, instance, origin=None, **kwargs):
+    _refresh_students(instance, origin, refresh_balances)
+
+
+@receiver(pre_save, sender=Payment)
+def remember_stored_payment(sender, instance, **kwargs):
+    # The row as it was, so an edit moves the amount out of its old rollup row;
+    # read from the database because the instance may be stale or deferred
+    instance._stored_payment = Payment.objects.filter(pk=instance.pk).first() if instance.pk else None
+
+
+@receiver(post_save, sender=Payment)
+def count_saved_payment(sender, instance, **kwargs):
+    save_payment(instance, instance.__dict__.pop('_stored_payment', None))
+
+
+@receiver(post_delete, sender=Payment)
+def uncount_deleted_payment(sender, instance, origin=None, **kwargs):
+    # A cascade from Student was subtracted in bulk by the receiver below
+    if not (isinstance(origin, Student) or getattr(origin, 'model', None) is Student):
+        remove_payment(instance)
+
+
+@receiver(pre_delete, sender=Student)
+def uncount_student_payments(sender, instance, **kwargs):
+    remove_payments(instance.payments.all())
+
+
+def invalidate_cache(sender, **kwargs):
+    invalidate(*CACHE_NAMESPACES[sender])
+
+
+for model in CACHE_NAMESPACES:
+    post_save.connect(invalidate_cache, sender=model, dispatch_uid=f'invalidate_cache_{model.__name__}_save')
+    post_delete.connect(invalidate_cache, sender=model, dispatch_uid=f'invalidate_cache_{model.__name__}_delete')
+
+for model in (Admission, Locker, Payment, Charge):
+    post_save.connect(refresh_dues, sender=model, dispatch_uid=f'refresh_dues_{model.__name__}_save')
+    post_delete.connect(refresh_dues, sender=model, dispatch_uid=f'refresh_dues_{model.__name__}_delete')
+
+connection_created.connect(instrument_connection, dispatch_uid='instrument_connection')
@@ -0,0 +1,48 @@
+import hashlib
+import os
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names every file after the SHA-256 of its
+    content, keeping the directory and extension of the requested name.
+    Saving identical content twice stores it once and returns the same name.
+    """
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest.hexdigest() + extension).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(self.generate_filename(name), content)
+        if self.exists(name):
+            touch(self, name)
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+photo_storage = ContentAddressedStorage()
+
+
+def touch(storage, name):
+    """
+    Mark the stored file ``name`` as just saved. Shared files are never
+    deleted inline; collect_media removes unreferenced ones once their
+    modification time is older than --min-age, so reusing a file must
+    reset it until the new reference is committed.
+    """
+    os.utime(storage.path(name))
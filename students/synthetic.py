@@ -0,0 +1,168 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from .cache import invalidate
+from .dues import refresh_balances
+from .expiry import recompute_statuses, refresh_admission_summaries
+from .models import Student, Admission, Locker, Payment, ContactLead, TotalLockers
+from .rollups import rebuild
+
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Aditya', 'Ananya', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Krishna', 'Meera',
+    'Neha', 'Nikhil', 'Pooja', 'Priya', 'Rahul', 'Riya', 'Rohan', 'Saanvi', 'Sahil', 'Shreya',
+    'Siddharth', 'Sneha', 'Tanvi', 'Varun', 'Vihaan', 'Vikram', 'Yash', 'Zara',
+]
+LAST_NAMES = [
+    'Agarwal', 'Bansal', 'Chauhan', 'Desai', 'Gupta', 'Iyer', 'Jain', 'Joshi', 'Kapoor', 'Kumar',
+    'Mehta', 'Mishra', 'Nair', 'Patel', 'Rao', 'Reddy', 'Saxena', 'Sharma', 'Singh', 'Verma', 'Yadav',
+]
+CITIES = ['Delhi', 'Lucknow', 'Jaipur', 'Patna', 'Kanpur', 'Varanasi', 'Prayagraj', 'Noida', 'Indore', 'Bhopal']
+SLOTS = ['6-12', '12-6', '6-10', '9-3', '8-8']
+LEAD_MESSAGES = ['', 'Looking for a reserved seat', 'Fees for the full day?', 'Is there parking?', 'Need a locker too']
+
+# Share of students given a locker, and how many months each runs
+LOCKER_SHARE = 0.3
+ADMISSION_MONTHS = [1, 1, 1, 3, 3, 6]
+
+
+class Generator:
+    """
+    Deterministic synthetic data: the same ``seed`` always produces the same
+    rows. Numbers (mobile, Aadhaar, lockers) continue from ``offset`` so
+    repeated runs do not collide with earlier ones.
+    """
+
+    def __init__(self, seed=0, offset=0, today=None):
+        self.random = random.Random(seed)
+        self.offset = offset
+        self.today = today or timezone.localdate()
+
+    def student(self, n):
+        first, last = self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+        return Student(
+            name=f'{first} {last}',
+            email=f'{first}.{last}.{n}@example.com'.lower(),
+            mobile=f'9{n:09d}',
+            date_of_birth=self.today - timedelta(days=self.random.randint(16 * 365, 35 * 365)),
+            aadhaar_number=f'{n:012d}',
+            address=f'{self.random.randint(1, 999)}, Sector {self.random.randint(1, 60)}, {self.random.choice(CITIES)}',
+            father_name=f'{self.random.choice(FIRST_NAMES)} {last}',
+            mother_name=f'{self.random.choice(FIRST_NAMES)} {last}',
+            parent_mobile=f'8{n:09d}',
+            registration_fees=Decimal('200.00'),
+        )
+
+    def admission(self, student):
+        months = self.random.choice(ADMISSION_MONTHS)
+        # Spread start dates so most admissions run on, some are ending and some have ended
+        start = self.today - timedelta(days=self.random.randint(0, 30 * months + 20))
+        hours = self.random.choice(Admission.HOUR_CHOICES)[0]
+        return Admission(
+            student=student,
+            start_date=start,
+            end_date=start + timedelta(days=30 * months),
+            hours=hours,
+            slot_timing=self.random.choice(SLOTS),
+            seat_number=str(self.random.randint(1, 400)),
+            seat_type=self.random.choice(Student.SEAT_CHOICES)[0],
+            admission_fees=Decimal(150 * int(hours) + 400) * months,
+        )
+
+    def payments(self, student, admission, locker):
+        # Most students pay in full; the rest leave something owing
+        paid_up = self.random.random() < 0.8
+        mode = lambda: self.random.choice(Payment.PAYMENT_MODE_CHOICES)[0]
+        payments = [Payment(
+            student=student, amount=student.registration_fees, payment_date=admission.start_date,
+            payment_mode=mode(), payment_type='Registration',
+        )]
+        fees = admission.admission_fees if paid_up else (admission.admission_fees / 2).quantize(Decimal('1'))
+        payments.append(Payment(
+            student=student, amount=fees, payment_date=admission.start_date,
+            payment_mode=mode(), payment_type='Admission',
+        ))
+        if locker is not None:
+            payments.append(Payment(
+                student=student, amount=locker.security_fees, payment_date=locker.start_date,
+                payment_mode=mode(), payment_type='Locker',
+            ))
+            # Months started between the dates, as students.dues.locker_months counts them
+            start, end = locker.start_date, locker.end_date
+            months = (end.year - start.year) * 12 + end.month - start.month + (1 if end.day >= start.day else 0)
+            for month in range(months if paid_up else months - 1):
+                payments.append(Payment(
+                    student=student, amount=locker.monthly_fees,
+                    payment_date=locker.start_date + timedelta(days=30 * month),
+                    payment_mode=mode(), payment_type='Monthly',
+                ))
+        return payments
+
+    def lead(self, n):
+        first, last = self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+        return ContactLead(
+            name=f'{first} {last}',
+            email=f'lead.{n}@example.com',
+            mobile=f'7{n:09d}',
+            message=self.random.choice(LEAD_MESSAGES),
+            status=self.random.choice(ContactLead.STATUS_CHOICES)[0],
+        )
+
+    def batch(self, start, count):
+        """Create ``count`` students numbered from ``start`` with their related rows, in one transaction."""
+        with transaction.atomic():
+            students = Student.objects.bulk_create([self.student(self.offset + n) for n in range(start, start + count)])
+            admissions = Admission.objects.bulk_create([self.admission(student) for student in students])
+
+            with_locker = [
+                (student, admission) for student, admission in zip(students, admissions)
+                if self.random.random() < LOCKER_SHARE
+            ]
+            total_lockers = TotalLockers.objects.bulk_create([
+                TotalLockers(locker_number=f'G{self.offset + start + i:06d}', is_available=False)
+                for i in range(len(with_locker))
+            ])
+            lockers = Locker.objects.bulk_create([
+                Locker(
+                    student=student, total_locker=total_locker, required=True,
+                    start_date=admission.start_date, end_date=admission.end_date,
+                )
+                for (student, admission), total_locker in zip(with_locker, total_lockers)
+            ])
+            locker_of = {locker.student_id: locker for locker in lockers}
+
+            Payment.objects.bulk_create(
+                [
+                    payment
+                    for student, admission in zip(students, admissions)
+                    for payment in self.payments(student, admission, locker_of.get(student.pk))
+                ],
+                batch_size=5000,
+            )
+            ContactLead.objects.bulk_create([self.lead(self.offset + n) for n in range(start, start + count // 5)])
+
+            created = Student.objects.filter(pk__gte=students[0].pk, pk__lte=students[-1].pk).values('pk')
+            refresh_admission_summaries(created)
+            recompute_statuses(created)
+            refresh_balances(created)
+        return len(students)
+
+
+def generate(students, seed=0, batch_size=5000, progress=None):
+    """
+    Add ``students`` synthetic students with an admission each, lockers for
+    about a third of them, their payments and a lead per five students,
+    ``batch_size`` students per transaction. Returns the row counts added.
+    """
+    before = {model: model.objects.count() for model in (Student, Admission, Locker, Payment, ContactLead)}
+    generator = Generator(seed, offset=before[Student] + 1)
+    done = 0
+    while done < students:
+        done += generator.batch(done, min(batch_size, students - done))
+        if progress:
+            progress(done)
+    # Payments went in through bulk_create, so the rollup is rebuilt once at the end
+    rebuild()
+    invalidate('students', 'admissions', 'lockers', 'payments')
+    return {str(model._meta.verbose_name_plural): model.objects.count() - count for model, count in before.items()}
@@ -0,0 +1,31 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+DEFAULT_PHOTO = '/media/student_photos/user.jpg'
+
+
+@register.simple_tag
+def student_photo(student, rendition='avatar', **attrs):
+    """
+    ``<picture>`` for one of the student's photo renditions: WebP with a
+    JPEG fallback. Falls back to the original upload when no renditions
+    exist yet, and to the default avatar when there is no photo at all.
+    """
+    alt = f"{student.name}'s photo" if student.photo else 'Default avatar'
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    formats = (student.photo_renditions or {}).get(rendition)
+
+    if not formats:
+        src = student.photo.url if student.photo else DEFAULT_PHOTO
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', src, alt, extra)
+
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp"><img src="{}" alt="{}" loading="lazy"{}></picture>',
+        default_storage.url(formats['webp']),
+        default_storage.url(formats['jpeg']),
+        alt,
+        extra,
+    )
@@ -1,3 +1,1963 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.db.models import Sum
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+from .models import Student, Admission, AdmissionSweep, Charge, Locker, Payment, ContactLead, TotalLockers, ExportJob, ImportJob, Seat, Slot, RevenueRollup
+from .search import filter_students, search_students, substring_fallback
+from .exports import iter_chunks
+from .seating import IntervalTree, available_seats
+from .imports import Importer, ImportFileError, claim_next_import, run_import
+from .rollups import find_drift, rebuild
+from .kpis import percentage_change, revenue_totals, student_counts
+from .dues import find_drift as find_balance_drift, locker_months, refresh_balances, students_owing, with_dues
+from .expiry import expired_admissions, recompute_statuses, refresh_admission_summaries, sweep_expired_admissions
+from .performance import _worker, collect, registry
+from .benchmark import ASYNC_PAGES, views_mode
+from .profiling import explain, fingerprint
+from .lockers import (
+    LockerUnavailable, assign_locker, assign_lockers, parse_locker_numbers, provision_lockers, release_lockers,
+    set_lockers_available,
+)
 
-# Create your tests here.
+
+def seed_students(count, today=None):
+    """Bulk-create ``count`` students with one admission and a few payments each."""
+    today = today or date.today()
+    students = Student.objects.bulk_create([
+        Student(
+            name=f'Student {i}',
+            email=f'student{i}@example.com',
+            mobile=f'98{i:08d}',
+            date_of_birth=date(2000, 1, 1),
+            aadhaar_number=f'{i:012d}',
+            address='Address',
+            father_name='Father',
+            mother_name='Mother',
+            parent_mobile=f'97{i:08d}',
+            status=['Active', 'Inactive', 'Expiring Soon'][i % 3],
+        )
+        for i in range(count)
+    ])
+    Admission.objects.bulk_create([
+        Admission(
+            student=student,
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=i % 60),
+            hours=['2', '4', '6', '15'][i % 4],
+            slot_timing='9-11',
+            seat_number=str(i % 200),
+            seat_type=['Reserved', 'Non-Reserved'][i % 2],
+        )
+        for i, student in enumerate(students)
+    ])
+    refresh_admission_summaries()
+    Payment.objects.bulk_create([
+        Payment(
+            student=student,
+            amount=100 + i % 50,
+            payment_date=today - timedelta(days=(i * 7 + n * 31) % 400),
+            payment_mode=['Cash', 'UPI'][n % 2],
+            payment_type=['Registration', 'Admission', 'Locker', 'Monthly'][n],
+        )
+        for i, student in enumerate(students)
+        for n in range(4)
+    ])
+    total_lockers = TotalLockers.objects.bulk_create([
+        TotalLockers(locker_number=f'L{i:05d}', is_available=i % 4 != 0)
+        for i in range(count // 2)
+    ])
+    Locker.objects.bulk_create([
+        Locker(
+            student=students[i],
+            total_locker=total_locker,
+            required=True,
+            start_date=today - timedelta(days=30),
+            end_date=today + timedelta(days=30),
+        )
+        for i, total_locker in enumerate(total_lockers)
+        if not total_locker.is_available
+    ])
+    ContactLead.objects.bulk_create([
+        ContactLead(name=f'Lead {i}', email=f'lead{i}@example.com', mobile=f'96{i:08d}')
+        for i in range(count // 2)
+    ])
+    refresh_balances()
+    return students
+
+
+class KpiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+        cls.student = seed_students(6)[0]
+        Payment.objects.all().delete()
+        RevenueRollup.objects.all().delete()
+        for amount, payment_date, payment_type in [
+            (200, date(2026, 1, 10), 'Registration'),
+            (1900, date(2026, 2, 3), 'Admission'),
+            (300, date(2026, 2, 28), 'Locker'),
+            (100, date(2026, 3, 1), 'Monthly'),
+            (150, date(2026, 3, 14), 'Monthly'),
+        ]:
+            Payment.objects.create(student=cls.student, amount=amount, payment_date=payment_date, payment_type=payment_type)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_revenue_totals_are_one_query(self):
+        with self.assertNumQueries(1):
+            revenue = revenue_totals(today=date(2026, 3, 15))
+        self.assertEqual(revenue, {
+            'total_registration': 200, 'total_admission': 1900, 'total_locker': 300, 'total_monthly': 250,
+            'current_month_revenue': 250, 'last_month_revenue': 2200,
+        })
+        self.assertEqual(revenue_totals(today=date(2026, 5, 1))['last_month_revenue'], 0)
+
+    def test_student_counts_are_one_query(self):
+        with self.assertNumQueries(1):
+            counts = student_counts()
+        self.assertEqual(counts, {
+            'total_students': 6,
+            'active_students': Student.objects.filter(status='Active').count(),
+            'inactive_students': Student.objects.filter(status='Inactive').count(),
+            'expiring_soon': Student.objects.filter(status='Expiring Soon').count(),
+        })
+
+    def test_percentage_change(self):
+        self.assertEqual(percentage_change(150, 100), 50)
+        self.assertEqual(percentage_change(50, 100), -50)
+        self.assertEqual(percentage_change(10, 0), 100)
+        self.assertEqual(percentage_change(0, 0), 0)
+
+    def test_dashboards_show_the_totals(self):
+        self.client.force_login(self.user)
+        context = self.client.get(reverse('dashboard')).context
+        self.assertEqual(context['total_revenue'], 200 + 1900 + 300)
+        self.assertEqual(context['total_students'], 6)
+        context = self.client.get(reverse('finance_dashboard')).context
+        self.assertEqual(context['total_revenue'], 2650)
+        self.assertEqual(context['total_monthly'], 250)
+
+
+class RevenueRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', password='password')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # Seeded payments are bulk-created, so the rollup starts out empty
+        self.student = seed_students(20)[0]
+
+    def rollup(self):
+        return {
+            (row.month, row.payment_type, row.payment_mode): (row.total_amount, row.payment_count)
+            for row in RevenueRollup.objects.exclude(payment_count=0)
+        }
+
+    def test_views_and_admin_keep_the_rollup_current(self):
+        Payment.objects.all().delete()
+        RevenueRollup.objects.all().delete()
+        self.client.post(reverse('payment_create', args=[self.student.id]), {
+            'amount': '500', 'payment_date': '2026-01-05', 'payment_mode': 'UPI', 'payment_type': 'Monthly',
+        })
+        payment = Payment.objects.get()
+        self.assertEqual(self.rollup(), {(date(2026, 1, 1), 'Monthly', 'UPI'): (500, 1)})
+
+        self.client.post(reverse('payment_update', args=[payment.id]), {
+            'amount': '600', 'payment_date': '2026-02-05', 'payment_mode': 'Cash', 'payment_type': 'Admission',
+        })
+        self.assertEqual(self.rollup(), {(date(2026, 2, 1), 'Admission', 'Cash'): (600, 1)})
+
+        self.client.post(reverse('admin:students_payment_change', args=[payment.id]), {
+            'student': self.student.id, 'amount': '650', 'payment_date': '2026-02-20',
+            'payment_mode': 'Cash', 'payment_type': 'Admission', 'remarks': 'corrected',
+        })
+        self.assertEqual(self.rollup(), {(date(2026, 2, 1), 'Admission', 'Cash'): (650, 1)})
+        self.assertEqual(find_drift(), [])
+
+        self.client.post(reverse('admin:students_payment_delete', args=[payment.id]), {'post': 'yes'})
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual(self.rollup(), {})
+
+        Payment.objects.create(student=self.student, amount=200, payment_date=date(2026, 3, 1), payment_type='Registration')
+        Payment.objects.create(student=self.student, amount=300, payment_date=date(2026, 3, 9), payment_type='Registration')
+        self.assertEqual(self.rollup(), {(date(2026, 3, 1), 'Registration', 'Cash'): (500, 2)})
+        self.client.post(reverse('admin:students_student_delete', args=[self.student.id]), {'post': 'yes'})
+        self.assertFalse(Student.objects.filter(pk=self.student.pk).exists())
+        self.assertEqual(self.rollup(), {})
+        self.assertEqual(find_drift(), [])
+
+    def test_find_drift_and_rebuild(self):
+        drift = find_drift()
+        self.assertTrue(drift)
+        self.assertTrue(all(stored == (0, 0) for _, stored, _ in drift))
+
+        self.assertEqual(rebuild(), len(drift))
+        self.assertEqual(find_drift(), [])
+        self.assertEqual(
+            RevenueRollup.objects.aggregate(total=Sum('total_amount'))['total'],
+            Payment.objects.aggregate(total=Sum('amount'))['total'],
+        )
+
+    def test_revenue_rollup_command(self):
+        with self.assertRaises(CommandError):
+            call_command('revenue_rollup', '--verify', stdout=io.StringIO())
+
+        out = io.StringIO()
+        call_command('revenue_rollup', stdout=out)
+        self.assertIn('drifted rows corrected', out.getvalue())
+        self.assertEqual(find_drift(), [])
+
+        out = io.StringIO()
+        call_command('revenue_rollup', '--verify', stdout=out)
+        self.assertIn('Revenue rollup is up to date', out.getvalue())
+
+
+class QueryPlanTests(TestCase):
+    """List and dashboard views must be served from indexes, not table scans."""
+
+    # Tables that are read in full by design; they stay tiny regardless of load
+    FULL_SCAN_ALLOWED = {'students_revenuerollup', 'students_admissionsweep'}
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_students(3000)
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def sequential_scans(self, sql):
+        # Without ANALYZE statistics (SQLite) or with seq scans disabled
+        # (PostgreSQL) the planner only scans a table when no index applies.
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                tables = re.findall(r'Seq Scan on (\w+)', plan)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+                tables = re.findall(r'^SCAN (\w+)$', plan, re.MULTILINE)
+        return [table for table in tables if table.startswith('students_') and table not in self.FULL_SCAN_ALLOWED]
+
+    def assertNoSequentialScans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            # Captured SQL has parameters inlined, so plan it as-is
+            scans = self.sequential_scans(sql)
+            self.assertEqual(scans, [], f'{url} scans {scans} in: {sql}')
+
+    def test_dashboard(self):
+        self.assertNoSequentialScans(reverse('dashboard'))
+
+    def test_finance_dashboard(self):
+        self.assertNoSequentialScans(reverse('finance_dashboard'))
+
+    def test_students_list(self):
+        url = reverse('students_list')
+        for filter_type in ['all', 'active', 'inactive', 'expiring', 'reserved', 'non_reserved']:
+            with self.subTest(filter=filter_type):
+                self.assertNoSequentialScans(f'{url}?filter={filter_type}')
+        self.assertNoSequentialScans(f'{url}?hours=4')
+
+    def test_students_search(self):
+        url = reverse('students_list')
+        # Including searches that match nothing and are too short for the substring fallback
+        for query in ['Student 12', 'student42@example', '9800000', '000000000123', '17', 'zz', '55555']:
+            with self.subTest(q=query):
+                self.assertNoSequentialScans(f'{url}?q={query}')
+
+    def test_lockers_list(self):
+        self.assertNoSequentialScans(reverse('lockers_list'))
+
+    def test_contact_leads(self):
+        self.assertNoSequentialScans(reverse('contact_leads'))
+
+    def test_defaulters(self):
+        self.assertNoSequentialScans(reverse('defaulters'))
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed_students(200)
+
+    def search(self, query):
+        return list(search_students(Student.objects.all(), query))
+
+    def test_numeric_query_ranks_exact_id_first(self):
+        student = self.students[15]
+        results = self.search(str(student.pk))
+        self.assertEqual(results[0], student)
+
+    def test_mobile_and_aadhaar_prefix(self):
+        self.assertIn(self.students[7], self.search('9800000007'))
+        self.assertIn(self.students[7], self.search('000000000007'))
+
+    def test_name_and_email_prefix_is_case_insensitive(self):
+        self.assertIn(self.students[3], self.search('student 3'))
+        self.assertEqual(self.search('STUDENT150@'), [self.students[150]])
+        self.assertEqual(self.search('Student 150')[0], self.students[150])
+
+    def test_substrings(self):
+        Student.objects.filter(pk=self.students[5].pk).update(name='Asha Kumari')
+        self.assertEqual(self.search('KUMARI'), [])
+        substrings = lambda query: list(search_students(Student.objects.all(), query, substrings=True))
+        self.assertEqual(substrings('KUMARI'), [self.students[5]])
+        self.assertEqual(len(substrings('0@example')), 20)
+
+        self.assertTrue(substring_fallback(' kum '))
+        self.assertFalse(substring_fallback('ku'))
+        self.assertFalse(substring_fallback('98765'))
+        self.assertFalse(substring_fallback('kum', substrings=True))
+
+    def test_no_match(self):
+        self.assertEqual(self.search('zzz'), [])
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_students(95)
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def get(self, query=''):
+        cache.clear()
+        return self.client.get(reverse('students_list') + '?' + query)
+
+    def ids(self, response):
+        return [student.pk for student in response.context['students']]
+
+    def test_next_links_walk_every_student_once(self):
+        expected = list(Student.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        response, seen, numbers = self.get(), [], []
+        while True:
+            page = response.context['students']
+            seen += self.ids(response)
+            numbers.append(page.number)
+            if not page.has_next():
+                break
+            response = self.get(page.next_query)
+        self.assertEqual(seen, expected)
+        self.assertEqual(numbers, list(range(1, 11)))
+
+    def test_search_falls_back_to_substrings(self):
+        student = Student.objects.order_by('-created_at', '-id')[5]
+        Student.objects.filter(pk=student.pk).update(name='Asha Kumari')
+        response = self.get('q=kumari')
+        self.assertEqual(self.ids(response), [student.pk])
+        self.assertIn('match=substring', response.context['query_string'])
+        self.assertContains(response, '<input type="hidden" name="match" value="substring">')
+
+        # Later pages stay in substring mode
+        response = self.get('q=tudent')
+        self.assertEqual(len(response.context['students']), 10)
+        response = self.get(response.context['students'].next_query)
+        self.assertEqual(len(response.context['students']), 10)
+        self.assertNotIn(student.pk, self.ids(response))
+        self.assertEqual(self.ids(self.get('q=ku')), [])
+
+    def test_previous_link_returns_the_same_rows(self):
+        first = self.get()
+        second = self.get(first.context['students'].next_query)
+        third = self.get(second.context['students'].next_query)
+        back = self.get(third.context['students'].previous_query)
+        self.assertEqual(self.ids(back), self.ids(second))
+        self.assertEqual(back.context['students'].number, 2)
+
+    def test_page_window_links(self):
+        page = self.get().context['students']
+        self.assertEqual([link['number'] for link in page.page_window], [1, 2, 3])
+        fourth = self.get(page.page_window[2]['query'])
+        fourth = self.get(fourth.context['students'].next_query).context['students']
+        self.assertEqual(fourth.number, 4)
+        self.assertEqual([link['number'] for link in fourth.page_window], [2, 3, 4, 5, 6])
+        self.assertEqual(
+            [student.pk for student in self.get(fourth.page_window[0]['query']).context['students']],
+            list(Student.objects.order_by('-created_at', '-id').values_list('pk', flat=True)[10:20]),
+        )
+
+    def test_links_survive_new_rows(self):
+        second = self.get(self.get().context['students'].next_query)
+        query = second.context['students'].next_query
+        Student.objects.create(
+            name='Newest', mobile='9999999999', date_of_birth=date(2000, 1, 1),
+            aadhaar_number='999999999999', address='Address', father_name='Father',
+            mother_name='Mother', parent_mobile='9999999998',
+        )
+        third = self.get(query)
+        self.assertNotIn(self.ids(second)[-1], self.ids(third))
+        self.assertEqual(len(self.ids(third)), 10)
+
+    def test_deep_page_costs_the_same_as_the_first(self):
+        page = self.get().context['students']
+        for _ in range(5):
+            page = self.get(page.next_query).context['students']
+        cache.clear()
+        with self.assertNumQueries(6):
+            self.client.get(reverse('students_list') + '?' + page.next_query)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        self.assertEqual(self.ids(self.get('cursor=garbage')), self.ids(self.get()))
+
+    def test_filters_are_kept_and_not_distinct(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('filter=reserved&hours=2')
+        self.assertNotIn('DISTINCT', ' '.join(query['sql'] for query in queries))
+        page = response.context['students']
+        self.assertIn('filter=reserved', page.next_query)
+        expected = Student.objects.filter(admissions__seat_type='Reserved', admissions__hours=2).count()
+        self.assertEqual(str(page.count), str(expected))
+
+
+class StudentExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed_students(120)
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def test_chunks_use_fixed_queries_per_chunk(self):
+        # one keyset page plus three prefetches per chunk, then an empty page
+        with self.assertNumQueries(4 * 3 + 1):
+            chunks = list(iter_chunks(Student.objects.all(), chunk_size=50))
+        self.assertEqual([len(chunk) for chunk in chunks], [50, 50, 20])
+        with self.assertNumQueries(0):
+            for chunk in chunks:
+                for student in chunk:
+                    [locker.total_locker.locker_number for locker in student.lockers.all()]
+
+    def test_export_streams_every_student(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_students_csv'), {'filter': 'active'})
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:2], ['ID', 'Name'])
+        self.assertEqual(len(rows) - 1, Student.objects.filter(status='Active').count())
+
+
+class ExportJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_students(60)
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+
+    def export(self, **data):
+        self.client.post(reverse('export_jobs'), data)
+        job = ExportJob.objects.latest('id')
+        self.assertEqual(job.status, 'Queued')
+        call_command('export_worker', '--once', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Done', job.error)
+        return job
+
+    def test_student_csv_gz_export_uses_list_filters(self):
+        job = self.export(kind='students', format='csv.gz', filter='inactive')
+        with gzip.open(job.file.path, 'rt') as handle:
+            rows = list(csv.reader(handle))
+        self.assertEqual(len(rows) - 1, Student.objects.filter(status='Inactive').count())
+        self.assertEqual(job.rows_written, len(rows) - 1)
+        self.assertEqual(job.progress, 100)
+
+    def test_payment_ndjson_export(self):
+        job = self.export(kind='payments', format='ndjson')
+        with open(job.file.path) as handle:
+            records = [json.loads(line) for line in handle]
+        self.assertEqual(len(records), Payment.objects.count())
+        self.assertIn('Student Name', records[0])
+
+    def test_locker_export_and_status(self):
+        job = self.export(kind='lockers', format='csv')
+        status = self.client.get(reverse('export_job_status', args=[job.id])).json()
+        self.assertEqual(status['rows_written'], TotalLockers.objects.count())
+        self.assertEqual(status['download_url'], reverse('export_job_download', args=[job.id]))
+
+    def test_download_supports_ranges(self):
+        job = self.export(kind='payments', format='csv')
+        with open(job.file.path, 'rb') as handle:
+            content = handle.read()
+        url = reverse('export_job_download', args=[job.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=10-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-{len(content) - 1}/{len(content)}')
+        self.assertEqual(b''.join(response.streaming_content), content[10:])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), content[-5:])
+
+        response = self.client.get(url, HTTP_RANGE=f'bytes={len(content)}-')
+        self.assertEqual(response.status_code, 416)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=10-', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_jobs_are_private_to_their_creator(self):
+        job = self.export(kind='lockers', format='csv')
+        self.client.force_login(User.objects.create_user('other', password='password', is_staff=True))
+        self.assertEqual(self.client.get(reverse('export_job_status', args=[job.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_job_download', args=[job.id])).status_code, 404)
+
+    def test_worker_requeues_stale_running_jobs(self):
+        long_ago = timezone.now() - timedelta(hours=1)
+        stale = ExportJob.objects.create(kind='lockers', status='Running', started_at=long_ago, heartbeat_at=long_ago)
+        live = ExportJob.objects.create(
+            kind='lockers', status='Running', started_at=long_ago, heartbeat_at=timezone.now(),
+        )
+        call_command('export_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+        stale.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual(stale.status, 'Done', stale.error)
+        self.assertEqual(stale.rows_written, TotalLockers.objects.count())
+        self.assertEqual(live.status, 'Running')
+
+
+def make_jpeg(size=(2400, 1600), orientation=None):
+    image = Image.new('RGB', size, 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'TestCamera'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class StudentPhotoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+
+    def create_student(self, photo):
+        self.client.post(reverse('student_create'), {
+            'name': 'Photo Student', 'email': 'photo@example.com', 'mobile': '9876543210',
+            'date_of_birth': '2000-01-01', 'aadhaar_number': '123412341234', 'address': 'Address',
+            'father_name': 'Father', 'mother_name': 'Mother', 'parent_mobile': '9876543211',
+            'photo': photo,
+        })
+        return Student.objects.get(name='Photo Student')
+
+    def test_upload_is_capped_stripped_and_rendered(self):
+        # Orientation 6 means the camera was rotated; the stored image must be upright
+        student = self.create_student(SimpleUploadedFile('big.jpg', make_jpeg(orientation=6), 'image/jpeg'))
+
+        with Image.open(student.photo.path) as original:
+            self.assertEqual(original.size, (1067, 1600))
+            self.assertEqual(len(original.getexif()), 0)
+
+        self.assertEqual(set(student.photo_renditions), {'avatar', 'detail'})
+        with student.photo.storage.open(student.photo_renditions['avatar']['webp']) as handle:
+            self.assertEqual(Image.open(handle).size, (80, 80))
+        with student.photo.storage.open(student.photo_renditions['detail']['jpeg']) as handle:
+            self.assertLessEqual(max(Image.open(handle).size), 300)
+
+    def test_template_tag_uses_renditions(self):
+        student = self.create_student(SimpleUploadedFile('big.jpg', make_jpeg(), 'image/jpeg'))
+        html = Template("{% load student_photos %}{% student_photo student 'avatar' class='rounded-circle' %}").render(
+            Context({'student': student})
+        )
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(student.photo_renditions['avatar']['jpeg'], html)
+        self.assertIn('class="rounded-circle"', html)
+
+        student.photo = None
+        html = Template("{% load student_photos %}{% student_photo student %}").render(Context({'student': student}))
+        self.assertIn('Default avatar', html)
+
+    def test_backfill_processes_existing_photos(self):
+        students = seed_students(3)
+        name = students[0].photo.storage.save('student_photos/legacy.png', ContentFile(make_jpeg()))
+        Student.objects.filter(pk__in=[s.pk for s in students[:2]]).update(photo=name)
+
+        call_command('process_photos', '--workers', '2', stdout=io.StringIO())
+
+        first, second = Student.objects.filter(pk__in=[s.pk for s in students[:2]])
+        self.assertEqual(first.photo.name, second.photo.name)
+        self.assertTrue(first.photo.name.endswith('.jpg'))
+        # The legacy original is left for collect_media
+        self.assertTrue(first.photo.storage.exists(name))
+        self.assertEqual(first.photo_renditions, second.photo_renditions)
+        with Image.open(first.photo.path) as original:
+            self.assertEqual(max(original.size), 1600)
+
+
+class PhotoStorageTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.first, self.second = seed_students(2)
+
+    def set_photo(self, student, content):
+        student = Student.objects.get(pk=student.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            student.photo = ContentFile(content, name='upload.jpg')
+            student.save()
+        return student
+
+    def test_identical_uploads_share_one_file(self):
+        content = make_jpeg((50, 50))
+        first = self.set_photo(self.first, content)
+        second = self.set_photo(self.second, content)
+        self.assertEqual(first.photo.name, second.photo.name)
+        self.assertEqual(os.listdir(os.path.dirname(first.photo.path)), [os.path.basename(first.photo.name)])
+
+    def test_unreferenced_files_are_left_for_collect_media(self):
+        storage = Student.photo.field.storage
+        shared = self.set_photo(self.first, make_jpeg((50, 50))).photo.name
+        self.set_photo(self.second, make_jpeg((50, 50)))
+        self.set_photo(self.first, make_jpeg((60, 60)))
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.get(pk=self.second.pk).delete()
+        self.assertTrue(storage.exists(shared))
+
+        # Storing the same content again, as an upload about to reference it
+        # does, keeps the file out of the collector's reach
+        os.utime(storage.path(shared), (0, 0))
+        self.assertEqual(storage.save('student_photos/upload.jpg', ContentFile(make_jpeg((50, 50)))), shared)
+        call_command('collect_media', stdout=io.StringIO())
+        self.assertTrue(storage.exists(shared))
+
+        call_command('collect_media', '--min-age', '0', stdout=io.StringIO())
+        self.assertFalse(storage.exists(shared))
+
+    def test_collect_media_deletes_orphans(self):
+        kept = self.set_photo(self.first, make_jpeg((50, 50))).photo.name
+        storage = Student.photo.field.storage
+        orphan = storage.save('student_photos/orphan.jpg', ContentFile(b'orphan'))
+        recent = storage.save('student_photos/recent.jpg', ContentFile(b'recent'))
+        os.utime(storage.path(orphan), (0, 0))
+        os.utime(storage.path(kept), (0, 0))
+
+        call_command('collect_media', '--dry-run', stdout=io.StringIO())
+        self.assertTrue(storage.exists(orphan))
+
+        call_command('collect_media', stdout=io.StringIO())
+        self.assertFalse(storage.exists(orphan))
+        self.assertTrue(storage.exists(kept))
+        self.assertTrue(storage.exists(recent))
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every view runs a fixed number of queries regardless of data volume.
+    Budgets include the session and user lookups made by login_required.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_students(500)
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+        cls.student = Student.objects.filter(lockers__isnull=False).first()
+        cls.locker = cls.student.lockers.first()
+        cls.payment = cls.student.payments.first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertQueryBudget(self, budget, url, method='get', data=None):
+        with self.assertNumQueries(budget):
+            response = getattr(self.client, method)(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+
+    def test_dashboards(self):
+        self.assertQueryBudget(4, reverse('dashboard'))
+        cache.clear()
+        self.assertQueryBudget(4, reverse('finance_dashboard'))
+
+    def test_list_views(self):
+        # One page, one keys-only lookahead for the page window, one capped count
+        url = reverse('students_list')
+        self.assertQueryBudget(5, url)
+        self.assertQueryBudget(5, url, data={'filter': 'reserved', 'hours': '2'})
+        self.assertQueryBudget(5, url, data={'q': 'Student 1'})
+        # No match: the empty prefix page, then no fallback or the substring search's page
+        self.assertQueryBudget(3, url, data={'q': 'zz'})
+        self.assertQueryBudget(4, url, data={'q': 'zzz'})
+        self.assertQueryBudget(5, reverse('contact_leads'))
+        self.assertQueryBudget(6, reverse('lockers_list'))
+        self.assertQueryBudget(3, reverse('export_jobs'))
+
+    def test_student_views(self):
+        student_id = self.student.id
+        self.assertQueryBudget(6, reverse('student_detail', args=[student_id]))
+        self.assertQueryBudget(2, reverse('student_create'))
+        self.assertQueryBudget(3, reverse('student_update', args=[student_id]))
+        self.assertQueryBudget(3, reverse('student_delete', args=[student_id]))
+        self.assertQueryBudget(4, reverse('admission_create', args=[student_id]))
+        self.assertQueryBudget(4, reverse('locker_create', args=[student_id]))
+        self.assertQueryBudget(3, reverse('payment_create', args=[student_id]))
+
+    def test_locker_and_payment_views(self):
+        self.assertQueryBudget(3, reverse('locker_update', args=[self.locker.id]))
+        self.assertQueryBudget(3, reverse('locker_delete', args=[self.locker.id]))
+        self.assertQueryBudget(3, reverse('payment_update', args=[self.payment.id]))
+        self.assertQueryBudget(3, reverse('payment_delete', args=[self.payment.id]))
+
+    def test_reporting_views(self):
+        self.assertQueryBudget(6, reverse('defaulters'))
+        # Opening hours, seats and bookings, then served from the cache
+        self.assertQueryBudget(5, reverse('seat_occupancy_data'))
+        self.assertQueryBudget(2, reverse('seat_occupancy_data'))
+        self.assertQueryBudget(5, reverse('seats_available'), data={
+            'start_date': '2026-01-10', 'end_date': '2026-01-20', 'slot': Slot.objects.first().id,
+        })
+        self.assertQueryBudget(3, reverse('import_jobs'))
+        self.assertQueryBudget(2, reverse('metrics'))
+
+    def test_export_csv(self):
+        # One keyset page and three prefetches per 500-student chunk, plus the final empty page
+        self.assertQueryBudget(2 + 4 + 1, reverse('export_students_csv'), data={'filter': 'active'})
+
+    def test_writes(self):
+        self.assertQueryBudget(12, reverse('payment_create', args=[self.student.id]), 'post', {
+            'amount': '100', 'payment_date': '2025-01-05', 'payment_mode': 'Cash', 'payment_type': 'Monthly',
+        })
+        # Including the Charge that keeps the locker's fees on the balance
+        self.assertQueryBudget(12, reverse('locker_delete', args=[self.locker.id]), 'post')
+
+
+class CacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_students(20)
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_repeat_dashboard_only_loads_session(self):
+        self.client.get(reverse('dashboard'))
+        # Session and user lookups only
+        with self.assertNumQueries(2):
+            self.client.get(reverse('dashboard'))
+
+    def test_saving_a_model_invalidates_dependent_entries(self):
+        response = self.client.get(reverse('dashboard'))
+        total = response.context['total_students']
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(
+                name='New Student', mobile='9999999999', date_of_birth=date(2000, 1, 1),
+                aadhaar_number='999999999999', address='Address', father_name='Father',
+                mother_name='Mother', parent_mobile='9999999998',
+            )
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_students'], total + 1)
+
+    def test_list_fragment_follows_student_changes(self):
+        self.client.get(reverse('students_list'))
+        student = Student.objects.order_by('-created_at').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.filter(pk=student.pk).update(name='Renamed Student')
+            student.save(update_fields=['updated_at'])
+        self.assertContains(self.client.get(reverse('students_list')), 'Renamed Student')
+
+
+class SeatBookingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed_students(3)
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+        cls.seats = Seat.objects.bulk_create([Seat(number=f'A{i:03d}') for i in range(1, 4)])
+        cls.morning = Slot.objects.get(name='Morning')
+        cls.afternoon = Slot.objects.get(name='Afternoon')
+        cls.full_day = Slot.objects.get(name='Full Day')
+
+    def setUp(self):
+        cache.clear()
+
+    def book(self, student, seat, slot, start, end):
+        return Admission.objects.create(
+            student=student, seat=seat, slot=slot, start_date=start, end_date=end, hours='6',
+        )
+
+    def test_interval_tree_matches_brute_force(self):
+        import random
+        rng = random.Random(7)
+        intervals = []
+        for value in range(300):
+            low = rng.randrange(1000)
+            intervals.append((low, low + rng.randrange(50), value))
+        tree = IntervalTree(intervals)
+        for _ in range(200):
+            low = rng.randrange(1000)
+            high = low + rng.randrange(30)
+            expected = {value for start, end, value in intervals if start <= high and end >= low}
+            self.assertEqual(set(tree.overlapping(low, high)), expected)
+
+    def test_database_refuses_overlapping_bookings(self):
+        from django.db import IntegrityError, transaction
+        seat = self.seats[0]
+        self.book(self.students[0], seat, self.morning, date(2026, 1, 1), date(2026, 1, 31))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.book(self.students[1], seat, self.full_day, date(2026, 1, 31), date(2026, 2, 28))
+        # Adjacent hours and later dates are both fine
+        self.book(self.students[1], seat, self.afternoon, date(2026, 1, 1), date(2026, 1, 31))
+        self.book(self.students[2], seat, self.morning, date(2026, 2, 1), date(2026, 2, 28))
+
+    def test_available_seats(self):
+        self.book(self.students[0], self.seats[0], self.morning, date(2026, 1, 1), date(2026, 1, 31))
+        self.book(self.students[1], self.seats[1], self.afternoon, date(2026, 1, 1), date(2026, 1, 31))
+        free = available_seats(date(2026, 1, 15), date(2026, 2, 15), self.full_day)
+        self.assertEqual([seat.number for seat in free], ['A003'])
+        free = available_seats(date(2026, 1, 15), date(2026, 2, 15), self.morning)
+        self.assertEqual([seat.number for seat in free], ['A002', 'A003'])
+        free = available_seats(date(2026, 2, 1), date(2026, 2, 15), self.full_day)
+        self.assertEqual(len(free), 3)
+
+    def test_picker_and_double_booking_in_the_view(self):
+        self.client.force_login(self.user)
+        self.book(self.students[0], self.seats[0], self.morning, date(2026, 1, 1), date(2026, 1, 31))
+        response = self.client.get(reverse('seats_available'), {
+            'start_date': '2026-01-10', 'end_date': '2026-01-20', 'slot': self.morning.id,
+        })
+        self.assertEqual([seat['number'] for seat in response.json()['seats']], ['A002', 'A003'])
+        self.assertEqual(self.client.get(reverse('seats_available')).status_code, 400)
+
+        student = self.students[1]
+        before = list(student.admissions.values_list('id', flat=True))
+        response = self.client.post(reverse('admission_create', args=[student.id]), {
+            'start_date': '2026-01-10', 'end_date': '2026-01-20', 'hours': '6',
+            'slot': self.full_day.id, 'seat': self.seats[0].id, 'seat_type': 'Reserved',
+        }, follow=True)
+        self.assertContains(response, 'already booked')
+        self.assertEqual(list(student.admissions.values_list('id', flat=True)), before)
+
+        self.client.post(reverse('admission_create', args=[student.id]), {
+            'start_date': '2026-01-10', 'end_date': '2026-01-20', 'hours': '6',
+            'slot': self.full_day.id, 'seat': self.seats[1].id, 'seat_type': 'Reserved',
+        })
+        admission = student.admissions.get()
+        self.assertEqual((admission.seat_number, admission.slot_timing), ('A002', 'Full Day'))
+
+    def test_occupancy_matrix(self):
+        from .occupancy import occupancy_matrix
+        monday = date(2026, 1, 5)
+        self.book(self.students[0], self.seats[0], self.morning, date(2026, 1, 1), date(2026, 1, 6))
+        self.book(self.students[1], self.seats[1], self.full_day, date(2026, 1, 11), date(2026, 1, 31))
+        data = occupancy_matrix(monday)
+        self.assertEqual(data['hours'], list(range(6, 22)))
+        width = len(data['hours'])
+        morning = [1] * 6 + [0] * 10
+        self.assertEqual(data['matrix'][0], morning * 2 + [0] * width * 5)
+        self.assertEqual(data['matrix'][1], [0] * width * 6 + [1] * width)
+        self.assertEqual(data['matrix'][2], [0] * width * 7)
+        self.assertEqual(data['utilization']['by_seat'], [round(100 * 12 / 112, 1), round(100 / 7, 1), 0.0])
+        self.assertEqual(data['utilization']['by_column'][0], round(100 * 1 / 3, 1))
+
+    def test_occupancy_endpoint_is_cached_until_admissions_change(self):
+        self.client.force_login(self.user)
+        url = reverse('seat_occupancy_data')
+        self.client.get(url, {'start': '2026-01-05'})
+        with self.assertNumQueries(2):
+            data = self.client.get(url, {'start': '2026-01-07'}).json()
+        self.assertEqual(data['start'], '2026-01-05')
+        self.assertEqual(data['utilization']['overall'], 0.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.students[0], self.seats[0], self.full_day, date(2026, 1, 5), date(2026, 1, 11))
+        data = self.client.get(url, {'start': '2026-01-05'}).json()
+        self.assertEqual(data['utilization']['by_seat'][0], 100.0)
+        self.assertEqual(self.client.get(reverse('seat_occupancy')).status_code, 200)
+
+        # The opening hours come from the slots
+        with self.captureOnCommitCallbacks(execute=True):
+            Slot.objects.create(name='Night', start_time='21:00', end_time='23:30')
+        data = self.client.get(url, {'start': '2026-01-05'}).json()
+        self.assertEqual(data['hours'], list(range(6, 24)))
+
+
+class LockerAllocationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed_students(4)
+        Locker.objects.all().delete()
+        TotalLockers.objects.all().delete()
+        TotalLockers.objects.bulk_create([TotalLockers(locker_number=f'L{i:03d}') for i in range(1, 4)])
+
+    def terms(self):
+        return {'start_date': date(2026, 1, 1), 'end_date': date(2026, 1, 31)}
+
+    def assertConsistent(self):
+        taken = set(TotalLockers.objects.filter(is_available=False).values_list('pk', flat=True))
+        self.assertEqual(taken, set(Locker.objects.values_list('total_locker_id', flat=True)))
+
+    def test_auto_pick_takes_the_lowest_free_number(self):
+        TotalLockers.objects.filter(locker_number='L001').update(is_available=False)
+        locker = assign_locker(self.students[0], **self.terms())
+        self.assertEqual(locker.total_locker.locker_number, 'L002')
+        self.assertFalse(TotalLockers.objects.get(locker_number='L002').is_available)
+
+    def test_specific_locker_cannot_be_taken_twice(self):
+        assign_locker(self.students[0], 'L002', **self.terms())
+        with self.assertRaises(LockerUnavailable):
+            assign_locker(self.students[1], 'L002', **self.terms())
+        with self.assertRaises(LockerUnavailable):
+            assign_locker(self.students[1], 'L999', **self.terms())
+        self.assertEqual(Locker.objects.count(), 1)
+        self.assertConsistent()
+
+    def test_bulk_assignment_is_all_or_nothing(self):
+        with self.assertRaises(LockerUnavailable):
+            assign_lockers(self.students, **self.terms())
+        self.assertEqual(Locker.objects.count(), 0)
+        self.assertFalse(TotalLockers.objects.filter(is_available=False).exists())
+
+        lockers = assign_lockers(self.students[:3], **self.terms())
+        self.assertEqual([locker.total_locker_id for locker in lockers],
+                         list(TotalLockers.objects.values_list('pk', flat=True)))
+        self.assertConsistent()
+
+    def test_lost_race_moves_on_to_the_next_locker(self):
+        from unittest import mock
+        from . import lockers as service
+        first = TotalLockers.objects.get(locker_number='L001')
+        original = service._candidates
+
+        def stale(count, locking):
+            # Another request claims L001 after we picked it as a candidate
+            candidates = original(count, locking)
+            TotalLockers.objects.filter(pk=first.pk).update(is_available=False)
+            return candidates
+
+        with mock.patch.object(service, '_candidates', side_effect=stale):
+            locker = assign_locker(self.students[0], **self.terms())
+        self.assertEqual(locker.total_locker.locker_number, 'L002')
+
+    def test_model_save_and_delete_keep_availability_in_step(self):
+        from django.db import IntegrityError, transaction
+        total = TotalLockers.objects.get(locker_number='L001')
+        locker = Locker.objects.create(student=self.students[0], total_locker=total, required=False, **self.terms())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Locker.objects.create(student=self.students[1], total_locker=total, required=False, **self.terms())
+        self.assertConsistent()
+        locker.delete()
+        self.assertTrue(TotalLockers.objects.get(pk=total.pk).is_available)
+
+    def test_retired_lockers_stay_retired_when_released(self):
+        locker = assign_locker(self.students[0], 'L001', **self.terms())
+        lockers = TotalLockers.objects.filter(locker_number__in=['L001', 'L002'])
+        self.assertEqual(set_lockers_available(lockers, False), 2)
+        self.assertEqual(Locker.objects.get().total_locker_id, locker.total_locker_id)
+
+        locker.delete()
+        release_lockers(Locker.objects.all())
+        self.assertEqual(
+            list(TotalLockers.objects.filter(is_available=True).values_list('locker_number', flat=True)), ['L003'],
+        )
+        with self.assertRaises(LockerUnavailable):
+            assign_locker(self.students[1], 'L001', **self.terms())
+
+        self.assertEqual(set_lockers_available(TotalLockers.objects.all(), True), 2)
+        self.assertFalse(TotalLockers.objects.filter(retired=True).exists())
+        self.assertEqual(TotalLockers.objects.filter(is_available=True).count(), 3)
+
+    def test_deleting_a_student_frees_their_lockers(self):
+        user = User.objects.create_user('staff', password='password', is_staff=True)
+        self.client.force_login(user)
+        assign_lockers(self.students[:2], **self.terms())
+        self.client.post(reverse('student_delete', args=[self.students[0].id]))
+        self.assertEqual(TotalLockers.objects.filter(is_available=True).count(), 2)
+        self.assertConsistent()
+
+
+class LockerConcurrencyTests(TransactionTestCase):
+    """Many requests racing for a small pool never share or leak a locker."""
+
+    WORKERS = 12
+    LOCKERS = 5
+
+    def setUp(self):
+        self.students = seed_students(self.WORKERS)
+        Locker.objects.all().delete()
+        TotalLockers.objects.all().delete()
+        TotalLockers.objects.bulk_create([TotalLockers(locker_number=f'L{i:03d}') for i in range(self.LOCKERS)])
+
+    def test_concurrent_auto_assignment(self):
+        import threading
+        from django.db import OperationalError, connections
+        barrier = threading.Barrier(self.WORKERS)
+        outcomes = []
+
+        def worker(student):
+            barrier.wait()
+            try:
+                for _ in range(200):
+                    try:
+                        assign_locker(student, start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+                        outcomes.append('assigned')
+                        return
+                    except OperationalError:
+                        # SQLite's shared-cache test database reports lock
+                        # contention instead of waiting for it
+                        time.sleep(0.005)
+                outcomes.append('gave up')
+            except LockerUnavailable:
+                outcomes.append('unavailable')
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(student,)) for student in self.students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes.count('assigned'), self.LOCKERS, outcomes)
+        self.assertEqual(outcomes.count('unavailable'), self.WORKERS - self.LOCKERS)
+        assigned = list(Locker.objects.values_list('total_locker_id', flat=True))
+        self.assertEqual(len(assigned), len(set(assigned)))
+        self.assertEqual(
+            set(assigned), set(TotalLockers.objects.filter(is_available=False).values_list('pk', flat=True)),
+        )
+
+
+class LockerProvisioningTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', password='password')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_parse_ranges(self):
+        self.assertEqual(parse_locker_numbers('L008-L011, X9'), ['L008', 'L009', 'L010', 'L011', 'X9'])
+        self.assertEqual(parse_locker_numbers('B1-3'), ['B1', 'B2', 'B3'])
+        self.assertEqual(len(parse_locker_numbers('L001-L500')), 500)
+        for bad in ('L010-L001', 'A01-B05', 'L1-L99999', 'L0000000001-L0000000002'):
+            with self.assertRaises(ValueError):
+                parse_locker_numbers(bad)
+
+    def test_range_inserts_in_a_fixed_number_of_queries(self):
+        TotalLockers.objects.create(locker_number='L002')
+        with CaptureQueriesContext(connection) as queries:
+            created, skipped = provision_lockers(parse_locker_numbers('L001-L500'))
+        # One lookup of existing numbers and a few batched INSERTs (SQLite caps
+        # the parameters per statement) in savepoints, never a round trip per locker
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        self.assertLessEqual(len(inserts), 3)
+        self.assertLessEqual(len(queries), len(inserts) + 5)
+        self.assertEqual((created, skipped), (499, 1))
+        self.assertEqual(TotalLockers.objects.count(), 500)
+
+    def test_rows_added_by_a_concurrent_request_are_not_counted(self):
+        from unittest import mock
+        from . import lockers as service
+        TotalLockers.objects.create(locker_number='L002')
+        # Another request adds L002 between our lookup and our INSERT
+        with mock.patch.object(service, '_existing_numbers', side_effect=[set(), {'L002'}]):
+            self.assertEqual(provision_lockers(['L001', 'L002', 'L003']), (2, 1))
+        self.assertEqual(TotalLockers.objects.count(), 3)
+
+        # A conflict that does not go away is raised, not retried forever
+        with mock.patch.object(service, '_existing_numbers', return_value=set()) as lookup:
+            with self.assertRaises(IntegrityError):
+                provision_lockers(['L003', 'L004'])
+        self.assertEqual(lookup.call_count, service.PROVISION_ATTEMPTS)
+        self.assertEqual(TotalLockers.objects.count(), 3)
+
+    def test_add_locker_view_accepts_ranges_and_csv(self):
+        self.client.post(reverse('add_locker'), {'new_locker_number': 'L001-L010'})
+        upload = SimpleUploadedFile('lockers.csv', b'Locker Number\r\nL010\r\nL011\r\nL012\r\n', content_type='text/csv')
+        response = self.client.post(reverse('add_locker'), {'new_locker_number': '', 'lockers_csv': upload}, follow=True)
+        self.assertContains(response, '2 lockers added successfully! 1 already existed.')
+        self.assertEqual(TotalLockers.objects.count(), 12)
+        response = self.client.post(reverse('add_locker'), {'new_locker_number': 'L001'}, follow=True)
+        self.assertContains(response, 'Locker number already exists.')
+
+    def test_admin_actions_are_set_based_and_keep_assigned_lockers(self):
+        student = seed_students(1)[0]
+        Locker.objects.all().delete()
+        TotalLockers.objects.all().delete()
+        provision_lockers(parse_locker_numbers('L001-L004'))
+        assigned = assign_locker(student, start_date=date(2026, 1, 1), end_date=date(2026, 1, 31))
+        url = reverse('admin:students_totallockers_changelist')
+        ids = list(TotalLockers.objects.values_list('pk', flat=True))
+
+        # Session, user, two changelist counts, one UPDATE
+        with self.assertNumQueries(5):
+            self.client.post(url, {'action': 'make_unavailable', '_selected_action': ids})
+        self.assertFalse(TotalLockers.objects.filter(is_available=True).exists())
+
+        self.client.post(url, {'action': 'make_available', '_selected_action': ids})
+        self.assertEqual(
+            set(TotalLockers.objects.filter(is_available=False).values_list('pk', flat=True)),
+            {assigned.total_locker_id},
+        )
+
+
+    def test_admin_bulk_delete_frees_the_lockers(self):
+        students = seed_students(2)
+        Locker.objects.all().delete()
+        TotalLockers.objects.all().delete()
+        provision_lockers(parse_locker_numbers('L001-L003'))
+        lockers = [assign_locker(student, start_date=date(2026, 1, 1), end_date=date(2026, 1, 31)) for student in students]
+        set_lockers_available(TotalLockers.objects.filter(pk=lockers[1].total_locker_id), False)
+
+        self.client.post(reverse('admin:students_locker_changelist'), {
+            'action': 'delete_selected', '_selected_action': [locker.pk for locker in lockers], 'post': 'yes',
+        })
+        self.assertFalse(Locker.objects.exists())
+        self.assertEqual(list(TotalLockers.objects.filter(is_available=True).values_list('locker_number', flat=True)), [
+            'L001', 'L003',
+        ])
+
+
+class ImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+
+    def run_import(self, kind, content, name='data.csv'):
+        upload = SimpleUploadedFile(name, content.encode() if isinstance(content, str) else content)
+        self.client.post(reverse('import_jobs'), {'kind': kind, 'file': upload})
+        job = ImportJob.objects.latest('id')
+        self.assertEqual(job.status, 'Queued')
+        call_command('export_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+        job.refresh_from_db()
+        return job
+
+    def test_student_export_round_trips(self):
+        seed_students(30)
+        exported = b''.join(self.client.get(reverse('export_students_csv')).streaming_content).decode()
+        admissions, payments = Admission.objects.count(), Payment.objects.count()
+        Student.objects.all().delete()
+        RevenueRollup.objects.all().delete()
+
+        job = self.run_import('students', exported)
+        self.assertEqual(job.status, 'Done', job.error)
+        self.assertEqual((job.rows_total, job.rows_imported, job.rows_failed), (30, 30, 0))
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(Student.objects.count(), 30)
+        self.assertEqual(Admission.objects.count(), admissions)
+        self.assertEqual(Payment.objects.count(), payments)
+        self.assertEqual(find_drift(), [])
+
+        # Importing the same file again only produces duplicates
+        job = self.run_import('students', exported)
+        self.assertEqual((job.rows_imported, job.rows_failed), (0, 30))
+
+    def test_invalid_rows_go_to_the_error_report(self):
+        content = (
+            'name,email,mobile,date_of_birth,aadhaar_number,address,father_name,mother_name,parent_mobile\r\n'
+            'Asha,asha@example.com,9800000001,2001-02-03,111122223333,Addr,F,M,9700000001\r\n'
+            'Bad Mobile,bad@example.com,12345,2001-02-03,111122224444,Addr,F,M,9700000002\r\n'
+            'Repeat,repeat@example.com,9800000003,2001-02-03,111122223333,Addr,F,M,9700000003\r\n'
+            '\r\n'
+            'Bad Date,date@example.com,9800000004,not a date,111122225555,Addr,F,M,9700000004\r\n'
+        )
+        job = self.run_import('students', content)
+        self.assertEqual(job.status, 'Done', job.error)
+        self.assertEqual((job.rows_imported, job.rows_failed), (1, 3))
+        self.assertEqual(list(Student.objects.values_list('name', flat=True)), ['Asha'])
+
+        status = self.client.get(reverse('import_job_status', args=[job.id])).json()
+        self.assertEqual(status['error_report_url'], reverse('import_job_errors', args=[job.id]))
+        response = self.client.get(status['error_report_url'])
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][-2:], ['Row', 'Errors'])
+        self.assertEqual([(row[0], row[-2]) for row in rows[1:]], [('Bad Mobile', '3'), ('Repeat', '4'), ('Bad Date', '6')])
+        self.assertIn('mobile', rows[1][-1])
+        self.assertIn('Aadhaar', rows[2][-1])
+
+        self.client.force_login(User.objects.create_user('other', password='password', is_staff=True))
+        self.assertEqual(self.client.get(reverse('import_job_status', args=[job.id])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('import_job_errors', args=[job.id])).status_code, 404)
+
+    def test_stale_import_resumes_after_its_last_chunk(self):
+        from unittest import mock
+        content = (
+            'name,email,mobile,date_of_birth,aadhaar_number,address,father_name,mother_name,parent_mobile\r\n'
+            'Asha,asha@example.com,9800000001,2001-02-03,111122223333,Addr,F,M,9700000001\r\n'
+            'Bad Mobile,bad@example.com,12345,2001-02-03,111122224444,Addr,F,M,9700000002\r\n'
+            'Chitra,chitra@example.com,9800000003,2001-02-03,111122225555,Addr,F,M,9700000003\r\n'
+            'Dev,dev@example.com,9800000004,2001-02-03,111122226666,Addr,F,M,9700000004\r\n'
+            'Esha,esha@example.com,9800000005,2001-02-03,111122227777,Addr,F,M,9700000005\r\n'
+            'Bad Date,date@example.com,9800000006,not a date,111122228888,Addr,F,M,9700000006\r\n'
+        )
+        upload = SimpleUploadedFile('data.csv', content.encode())
+        self.client.post(reverse('import_jobs'), {'kind': 'students', 'file': upload})
+        job = claim_next_import()
+
+        # The worker is killed while inserting the second chunk
+        import_chunk = Importer.import_chunk
+        def killed_on_second_chunk(importer, rows):
+            if rows[0][0] > 3:
+                raise SystemExit
+            return import_chunk(importer, rows)
+        with mock.patch.object(Importer, 'import_chunk', killed_on_second_chunk):
+            with self.assertRaises(SystemExit):
+                run_import(job, chunk_size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed, job.rows_imported, job.rows_failed), ('Running', 2, 1, 1))
+
+        call_command('export_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Running')
+
+        ImportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        call_command('export_worker', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'Done', job.error)
+        self.assertEqual((job.rows_total, job.rows_imported, job.rows_failed), (6, 4, 2))
+        self.assertEqual(sorted(Student.objects.values_list('name', flat=True)), ['Asha', 'Chitra', 'Dev', 'Esha'])
+        response = self.client.get(reverse('import_job_errors', args=[job.id]))
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row[0], row[-2]) for row in rows], [('name', 'Row'), ('Bad Mobile', '3'), ('Bad Date', '7')])
+
+    def test_payments_need_an_existing_student(self):
+        student = seed_students(1)[0]
+        Payment.objects.all().delete()
+        RevenueRollup.objects.all().delete()
+        content = (
+            'Student ID,Amount,Payment Date,Payment Mode,Payment Type\r\n'
+            f'{student.id},500,2026-01-05,UPI,Monthly\r\n'
+            f'{student.id + 1000},500,2026-01-05,UPI,Monthly\r\n'
+            f'{student.id},500,2026-01-05,Cheque,Monthly\r\n'
+        )
+        job = self.run_import('payments', content)
+        self.assertEqual((job.rows_imported, job.rows_failed), (1, 2))
+        self.assertEqual(student.payments.count(), 1)
+        self.assertEqual(find_drift(), [])
+
+    def test_missing_columns_fail_the_job(self):
+        job = self.run_import('admissions', 'student_id,start_date\r\n1,2026-01-01\r\n')
+        self.assertEqual(job.status, 'Failed')
+        self.assertIn('end_date', job.error)
+        self.assertEqual(job.error_report, '')
+
+        response = self.client.post(reverse('import_jobs'), {
+            'kind': 'students', 'file': SimpleUploadedFile('data.txt', b'x'),
+        }, follow=True)
+        self.assertContains(response, 'Upload a .csv or .xlsx file.')
+
+    def test_chunks_use_fixed_queries(self):
+        student = seed_students(1)[0]
+        importer = Importer('admissions', [
+            'student_id', 'start_date', 'end_date', 'hours', 'slot_timing', 'seat_number', 'seat_type',
+        ])
+        rows = [(n, [str(student.id), '2026-01-01', '2026-01-31', '6', '9-3', str(n), 'Reserved']) for n in range(2, 52)]
+        # Student lookup, then the INSERT, the summary, status and balance UPDATEs inside a savepoint
+        with self.assertNumQueries(1 + 2 + 4 + 1):
+            imported, failures = importer.import_chunk(rows)
+        self.assertEqual((imported, failures), (50, []))
+        with self.assertRaises(ImportFileError):
+            Importer('payments', ['amount'])
+
+
+@override_settings(EXPIRING_SOON_DAYS=7)
+class StudentStatusTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.today = date.today()
+
+    def test_recompute_uses_latest_admission(self):
+        students = seed_students(6)
+        Admission.objects.all().delete()
+        for student, days in zip(students, [30, 7, 0, -1]):
+            Admission.objects.bulk_create([Admission(
+                student=student, start_date=self.today - timedelta(days=60), end_date=self.today + timedelta(days=days),
+                hours='6', slot_timing='9-3', seat_number='1', seat_type='Reserved',
+            )])
+        # An older admission does not hide a later one
+        Admission.objects.bulk_create([Admission(
+            student=students[0], start_date=self.today - timedelta(days=90), end_date=self.today - timedelta(days=60),
+            hours='6', slot_timing='9-3', seat_number='1', seat_type='Reserved',
+        )])
+
+        refresh_admission_summaries()
+        with self.assertNumQueries(2):
+            recompute_statuses()
+        statuses = [Student.objects.get(pk=student.pk).status for student in students]
+        self.assertEqual(statuses, ['Active', 'Expiring Soon', 'Expiring Soon', 'Inactive', 'Inactive', 'Inactive'])
+        self.assertEqual(recompute_statuses(), (0, 0))
+
+        with override_settings(EXPIRING_SOON_DAYS=30):
+            recompute_statuses([students[0].pk])
+        self.assertEqual(Student.objects.get(pk=students[0].pk).status, 'Expiring Soon')
+
+    def test_admission_changes_update_the_status(self):
+        student = seed_students(1)[0]
+        Admission.objects.all().delete()
+        self.client.force_login(self.user)
+        self.client.post(reverse('admission_create', args=[student.id]), {
+            'start_date': self.today, 'end_date': self.today + timedelta(days=3),
+            'hours': '6', 'seat_type': 'Reserved', 'slot_timing': '9-3', 'seat_number': '1',
+        })
+        student.refresh_from_db()
+        self.assertEqual(student.status, 'Expiring Soon')
+        self.assertEqual(self.client.get(reverse('students_list'), {'filter': 'expiring'}).context['students'].object_list, [student])
+
+        admission = student.admissions.get()
+        admission.end_date = self.today + timedelta(days=60)
+        admission.save()
+        student.refresh_from_db()
+        self.assertEqual(student.status, 'Active')
+
+        admission.delete()
+        student.refresh_from_db()
+        self.assertEqual(student.status, 'Inactive')
+
+    def test_status_is_not_editable(self):
+        student = seed_students(1)[0]
+        Admission.objects.all().delete()
+        refresh_admission_summaries()
+        recompute_statuses()
+        self.client.force_login(self.user)
+        url = reverse('student_update', args=[student.id])
+        response = self.client.get(url)
+        self.assertNotContains(response, 'name="status"')
+
+        self.client.post(url, {
+            'name': 'Renamed', 'email': student.email, 'mobile': student.mobile, 'date_of_birth': '2000-01-01',
+            'aadhaar_number': student.aadhaar_number, 'address': 'Address', 'father_name': 'Father',
+            'mother_name': 'Mother', 'parent_mobile': student.parent_mobile, 'status': 'Active',
+        })
+        student.refresh_from_db()
+        self.assertEqual((student.name, student.status), ('Renamed', 'Inactive'))
+
+    def test_sweep_recomputes_every_student(self):
+        students = seed_students(3)
+        Admission.objects.filter(student=students[0]).update(end_date=self.today - timedelta(days=1))
+        Admission.objects.filter(student=students[1]).update(end_date=self.today + timedelta(days=2))
+        Admission.objects.filter(student=students[2]).update(end_date=self.today + timedelta(days=40))
+        refresh_admission_summaries()
+        Student.objects.update(status='Active')
+
+        sweep = sweep_expired_admissions(self.today)
+        self.assertEqual((sweep.admissions_deleted, sweep.students_deactivated), (1, 1))
+        self.assertEqual(
+            [Student.objects.get(pk=student.pk).status for student in students],
+            ['Inactive', 'Expiring Soon', 'Active'],
+        )
+
+    def test_list_filters_read_the_admission_summary(self):
+        students = seed_students(8)
+        student = Student.objects.get(pk=students[0].pk)
+        admission = student.admissions.get()
+        self.assertEqual(
+            (student.current_seat_type, student.current_hours, student.current_seat_number, student.current_end_date),
+            (admission.seat_type, admission.hours, admission.seat_number, admission.end_date),
+        )
+
+        sql = str(filter_students('non_reserved', '4').query)
+        self.assertNotIn('students_admission', sql)
+        self.assertNotIn('DISTINCT', sql)
+        expected = {
+            s.pk for s in students
+            if s.admissions.filter(seat_type='Non-Reserved', hours='4').exists()
+        }
+        self.assertEqual(len(expected), 2)
+        self.assertEqual({s.pk for s in filter_students('non_reserved', '4')}, expected)
+
+        later = Admission.objects.create(
+            student=student, start_date=self.today, end_date=self.today + timedelta(days=90),
+            hours='15', slot_timing='9-3', seat_number='77', seat_type='Non-Reserved',
+        )
+        student.refresh_from_db()
+        self.assertEqual((student.current_hours, student.current_seat_number), ('15', '77'))
+        later.delete()
+        student.refresh_from_db()
+        self.assertEqual(student.current_hours, admission.hours)
+
+
+class AdmissionSweepTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.today = date.today()
+        self.students = seed_students(4)
+        # Students 0 and 1 ended yesterday and a month ago; student 0 holds a locker
+        for student, days in zip(self.students, [-1, -30, 10, 40]):
+            Admission.objects.filter(student=student).update(end_date=self.today + timedelta(days=days))
+        refresh_admission_summaries()
+        Student.objects.update(status='Active')
+
+    def test_first_run_sweeps_everything_expired(self):
+        self.assertFalse(AdmissionSweep.objects.exists())
+        locker = Locker.objects.get(student=self.students[0]).total_locker
+
+        sweep = sweep_expired_admissions(self.today)
+        self.assertEqual(
+            (sweep.swept_through, sweep.admissions_deleted, sweep.lockers_released, sweep.students_deactivated),
+            (self.today, 2, 1, 2),
+        )
+        self.assertEqual(
+            set(Admission.objects.values_list('student_id', flat=True)), {self.students[2].pk, self.students[3].pk},
+        )
+        locker.refresh_from_db()
+        self.assertTrue(locker.is_available)
+        # Their fees stay on the students' balances
+        self.assertEqual(sorted(Charge.objects.values_list('kind', flat=True)), ['Admission', 'Admission', 'Locker'])
+        self.assertEqual(find_balance_drift(), [])
+        self.assertEqual(AdmissionSweep.objects.get(), sweep)
+
+    def test_later_runs_only_look_past_the_watermark(self):
+        last_sweep = sweep_expired_admissions(self.today - timedelta(days=3))
+        self.assertEqual(last_sweep.admissions_deleted, 1)
+        self.assertFalse(Admission.objects.filter(student=self.students[1]).exists())
+        # Ended before the last cutoff and untouched since that run: treated as already swept
+        AdmissionSweep.objects.filter(pk=last_sweep.pk).update(ran_at=timezone.now() - timedelta(days=3))
+        last_sweep.refresh_from_db()
+        old = Admission.objects.create(
+            student=self.students[1], start_date=self.today - timedelta(days=60), end_date=self.today - timedelta(days=30),
+            hours='6', slot_timing='9-3', seat_number='1', seat_type='Reserved',
+        )
+        Admission.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(days=4))
+
+        expired = expired_admissions(self.today, last_sweep)
+        self.assertEqual(list(expired.values_list('student_id', flat=True)), [self.students[0].pk])
+        sweep = sweep_expired_admissions(self.today)
+        self.assertEqual(sweep.admissions_deleted, 1)
+        self.assertTrue(Admission.objects.filter(pk=old.pk).exists())
+
+    def test_admissions_changed_after_the_last_run_are_picked_up(self):
+        sweep_expired_admissions(self.today)
+        back_dated = Admission.objects.get(student=self.students[2])
+        back_dated.end_date = self.today - timedelta(days=10)
+        back_dated.save()
+
+        self.assertEqual(list(expired_admissions(self.today, AdmissionSweep.objects.first())), [back_dated])
+        sweep = sweep_expired_admissions(self.today)
+        self.assertEqual((sweep.admissions_deleted, sweep.students_deactivated), (1, 0))
+        self.assertEqual(Student.objects.get(pk=self.students[2].pk).status, 'Inactive')
+
+    def test_expire_admissions_command(self):
+        out = io.StringIO()
+        call_command('expire_admissions', stdout=out)
+        self.assertIn(
+            f'Swept through {self.today}: 2 admissions deleted, 1 lockers released, 2 students deactivated',
+            out.getvalue(),
+        )
+        out = io.StringIO()
+        call_command('expire_admissions', stdout=out)
+        self.assertIn('0 admissions deleted, 0 lockers released, 0 students deactivated', out.getvalue())
+
+
+class DuesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def expected_balance(self, student):
+        months = lambda l: (l.end_date.year - l.start_date.year) * 12 + l.end_date.month - l.start_date.month + (
+            1 if l.end_date.day >= l.start_date.day else 0
+        )
+        expected = student.registration_fees + sum(a.admission_fees for a in student.admissions.all()) + sum(
+            l.security_fees + l.monthly_fees * months(l) for l in student.lockers.all()
+        ) + sum(c.amount for c in student.charges.all())
+        return expected - sum(p.amount for p in student.payments.all())
+
+    def test_locker_months(self):
+        student = seed_students(2)[0]
+        locker = Locker.objects.get(student=student)
+        cases = [
+            (date(2026, 1, 1), date(2026, 1, 31), 1),
+            (date(2026, 1, 15), date(2026, 2, 14), 1),
+            (date(2026, 1, 15), date(2026, 2, 15), 2),
+            (date(2025, 11, 20), date(2026, 2, 10), 3),
+        ]
+        for start, end, months in cases:
+            with self.subTest(start=start, end=end):
+                Locker.objects.filter(pk=locker.pk).update(start_date=start, end_date=end)
+                self.assertEqual(Locker.objects.annotate(months=locker_months()).get(pk=locker.pk).months, months)
+
+    def test_ledger_is_one_query(self):
+        seed_students(12)
+        with self.assertNumQueries(1):
+            ledger = list(with_dues(Student.objects.all()))
+        for student in ledger:
+            self.assertEqual(student.fees_due, self.expected_balance(student))
+            self.assertEqual(student.fees_expected - student.fees_paid, student.fees_due)
+            self.assertEqual(student.balance_due, student.fees_due)
+        self.assertEqual(find_balance_drift(), [])
+
+    def test_balance_follows_payments_and_fees(self):
+        student = seed_students(1)[0]
+        Payment.objects.all().delete()
+        refresh_balances()
+        student.refresh_from_db()
+        owed = student.balance_due
+        self.assertEqual(owed, self.expected_balance(student))
+
+        self.client.force_login(self.user)
+        self.client.post(reverse('payment_create', args=[student.id]), {
+            'amount': '500', 'payment_date': '2026-01-05', 'payment_mode': 'UPI', 'payment_type': 'Admission',
+        })
+        student.refresh_from_db()
+        self.assertEqual(student.balance_due, owed - 500)
+
+        admission = student.admissions.get()
+        admission.admission_fees = admission.admission_fees + 100
+        admission.save()
+        student.refresh_from_db()
+        self.assertEqual(student.balance_due, owed - 400)
+
+        student.payments.get().delete()
+        student.refresh_from_db()
+        self.assertEqual(student.balance_due, owed + 100)
+        self.assertEqual(find_balance_drift(), [])
+
+    def test_queryset_deletes_refresh_students(self):
+        students = seed_students(3)
+        Payment.objects.all().delete()
+        refresh_balances()
+        student = students[0]
+        Payment.objects.create(student=student, amount=500, payment_date=date.today(), payment_type='Registration')
+        student.refresh_from_db()
+        owed = student.balance_due
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.filter(student=student).delete()
+        student.refresh_from_db()
+        self.assertEqual(student.balance_due, owed + 500)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Admission.objects.filter(student__in=students[:2]).delete()
+        for student in students[:2]:
+            student.refresh_from_db()
+            self.assertEqual(student.status, 'Inactive')
+            self.assertEqual(student.current_seat_number, '')
+            self.assertEqual(student.balance_due, self.expected_balance(student))
+        self.assertEqual(find_balance_drift(), [])
+
+    def test_removed_locker_stays_charged(self):
+        student = seed_students(2)[0]
+        locker = Locker.objects.get(student=student)
+        Payment.objects.all().delete()
+        refresh_balances()
+        student.refresh_from_db()
+        Payment.objects.create(student=student, amount=self.expected_balance(student), payment_date=date.today())
+        student.refresh_from_db()
+        self.assertEqual(student.balance_due, 0)
+
+        self.client.force_login(self.user)
+        self.client.post(reverse('locker_delete', args=[locker.id]))
+        self.assertFalse(Locker.objects.filter(pk=locker.pk).exists())
+        self.assertTrue(TotalLockers.objects.get(pk=locker.total_locker_id).is_available)
+        charge = Charge.objects.get(student=student, kind='Locker')
+        self.assertEqual(charge.reference, locker.total_locker.locker_number)
+        student.refresh_from_db()
+        self.assertEqual(student.balance_due, 0)
+        self.assertEqual(find_balance_drift(), [])
+
+    def test_expired_fees_stay_charged_after_readmission(self):
+        student = seed_students(1, today=date.today() - timedelta(days=60))[0]
+        Locker.objects.all().delete()
+        Payment.objects.all().delete()
+        student.refresh_from_db()
+        admission = student.admissions.get()
+        Payment.objects.create(
+            student=student, amount=student.registration_fees + admission.admission_fees,
+            payment_date=admission.start_date, payment_type='Admission',
+        )
+        student.refresh_from_db()
+        self.assertEqual(student.balance_due, 0)
+
+        sweep_expired_admissions()
+        student.refresh_from_db()
+        self.assertFalse(student.admissions.exists())
+        self.assertEqual(list(student.charges.values_list('kind', 'amount')), [('Admission', admission.admission_fees)])
+        self.assertEqual(student.balance_due, 0)
+
+        self.client.force_login(self.user)
+        self.client.post(reverse('admission_create', args=[student.id]), {
+            'start_date': date.today(), 'end_date': date.today() + timedelta(days=30), 'hours': '6',
+            'slot_timing': '9-3', 'seat_number': '12', 'seat_type': 'Reserved', 'admission_fees': '1900',
+        })
+        student.refresh_from_db()
+        self.assertEqual(student.balance_due, 1900)
+        self.assertEqual(student.balance_due, self.expected_balance(student))
+        self.assertIn(student, students_owing())
+        self.assertEqual(find_balance_drift(), [])
+
+    def test_defaulters_sorted_by_amount_due(self):
+        students = seed_students(30)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('defaulters'))
+        page = response.context['students']
+        dues = [student.balance_due for student in page]
+        self.assertEqual(len(dues), 20)
+        self.assertEqual(dues, sorted(dues, reverse=True))
+        self.assertTrue(all(student.fees_due == student.balance_due for student in page))
+
+        response = self.client.get(reverse('defaulters') + '?' + page.next_query)
+        rest = [student.balance_due for student in response.context['students']]
+        owing = Student.objects.filter(balance_due__gt=0).count()
+        self.assertEqual(len(rest), owing - 20)
+        self.assertLessEqual(rest[0], dues[-1])
+
+    def test_refresh_dues_command(self):
+        student = seed_students(2)[0]
+        Student.objects.filter(pk=student.pk).update(balance_due=0)
+        with self.assertRaises(CommandError):
+            call_command('refresh_dues', '--verify', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('refresh_dues', stdout=out)
+        self.assertIn('1 corrected', out.getvalue())
+        self.assertEqual(find_balance_drift(), [])
+
+
+class LoadTestingTests(TestCase):
+
+    def test_generate_data_is_consistent(self):
+        out = io.StringIO()
+        call_command('generate_data', '--students', '40', '--batch-size', '20', stdout=out)
+        self.assertIn('Added 40 students, 40 admissions', out.getvalue())
+        self.assertEqual(ContactLead.objects.count(), 8)
+        self.assertEqual(Locker.objects.count(), TotalLockers.objects.filter(is_available=False).count())
+        self.assertEqual(find_drift(), [])
+        self.assertEqual(find_balance_drift(), [])
+        self.assertFalse(Student.objects.filter(current_end_date__isnull=True).exists())
+
+        # A second run continues the numbering instead of colliding
+        call_command('generate_data', '--students', '10', stdout=io.StringIO())
+        self.assertEqual(Student.objects.values('aadhaar_number').distinct().count(), 50)
+
+    def test_benchmark_writes_results(self):
+        seed_students(10)
+        output = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        output.close()
+        self.addCleanup(os.unlink, output.name)
+        call_command(
+            'benchmark', '--requests', '3', '--view', 'students_list', '--view', 'student_detail',
+            '--view', 'export_job_status', '--output', output.name, stdout=io.StringIO(),
+        )
+        with open(output.name) as handle:
+            results = json.load(handle)
+        self.assertEqual(results['meta']['rows']['students'], 10)
+        detail = results['results']['student_detail']
+        self.assertEqual(detail['status'], 200)
+        self.assertEqual(detail['requests'], 3)
+        self.assertLessEqual(detail['p50_ms'], detail['p95_ms'])
+        self.assertLessEqual(detail['p95_ms'], detail['p99_ms'])
+        self.assertGreater(detail['queries'], 0)
+        self.assertIn('students_list?filter=active', results['results'])
+        self.assertIn('skipped', results['results']['export_job_status'])
+
+        # Comparing against itself with a generous threshold finds nothing
+        call_command(
+            'benchmark', '--requests', '3', '--view', 'student_detail', '--output', output.name,
+            '--compare', output.name, '--threshold', '1000', stdout=io.StringIO(),
+        )
+
+
+
+@override_settings(PERF_SAMPLE_RATE=1)
+class PerformanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+        seed_students(3)
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.client.force_login(self.user)
+
+    def test_sampled_request_is_timed(self):
+        with self.assertLogs('students.performance', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse('students_list'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['view'], 'students_list')
+        self.assertEqual(line['status'], 200)
+        self.assertEqual(line['db_queries'], len(captured))
+        self.assertEqual(f'"{line["db_queries"]} queries"', re.search(r'"\d+ queries"', timing).group())
+        self.assertGreater(line['template_ms'], 0)
+        self.assertEqual(line['bytes'], len(response.content))
+
+    @override_settings(PERF_SAMPLE_RATE=0)
+    def test_unsampled_request_passes_through(self):
+        response = self.client.get(reverse('students_list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(registry.snapshot()['requests'], [])
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('students_list'))
+        self.client.get(reverse('students_list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('pathshala_requests_total{view="students_list",method="GET",status="200"} 2', body)
+        self.assertIn('# TYPE pathshala_request_duration_seconds histogram', body)
+        self.assertIn('pathshala_request_duration_seconds_bucket{view="students_list",le="+Inf"} 2', body)
+        self.assertIn('pathshala_db_queries_count{view="students_list"} 2', body)
+        self.assertRegex(body, r'pathshala_response_size_bytes_sum\{view="students_list"\} [1-9]')
+
+    @override_settings(PERF_METRICS_TOKEN='scrape-me')
+    def test_metrics_is_staff_only(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-me').status_code, 200)
+
+        clerk = User.objects.create_user('clerk', password='password')
+        self.client.force_login(clerk)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+
+@override_settings(PERF_SAMPLE_RATE=1)
+class QueryProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+        seed_students(3)
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.client.force_login(self.user)
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('select "a"."id" from "a"  where "a"."id" in (%s, %s, %s) and b = \'x\' -- note\n limit 21'),
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" IN (...) AND b = ? LIMIT ?',
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO "a" ("x", "y") VALUES (%s, %s), (%s, %s), (%s,%s)'),
+            'INSERT INTO "a" ("x", "y") VALUES (...), ...',
+        )
+        # The same query shape with different values is one fingerprint
+        one = str(Student.objects.filter(pk__in=[1, 2]).query)
+        two = str(Student.objects.filter(pk__in=[3, 4, 5]).query)
+        self.assertEqual(fingerprint(one), fingerprint(two))
+
+    def test_queries_grouped_by_fingerprint(self):
+        for student in Student.objects.all():
+            self.client.get(reverse('student_detail', args=[student.pk]))
+        queries = registry.snapshot()['queries']
+        by_student = [
+            stats for key, stats in queries.items()
+            if key.startswith('SELECT') and 'FROM "students_student" WHERE "students_student"."id" = ?' in key
+        ]
+        self.assertEqual(len(by_student), 1)
+        self.assertEqual(by_student[0]['count'], 3)
+        self.assertEqual(by_student[0]['views'], {'student_detail': 3})
+        self.assertTrue(by_student[0]['origin'].startswith('students/views.py:'))
+
+    def test_query_parameters_not_shared(self):
+        self.client.get(reverse('students_list'))
+        registry.flush(force=True)
+        self.assertFalse(registry.params)
+        for queries in (registry.snapshot()['queries'], collect()[2]):
+            self.assertTrue(queries)
+            for stats in queries.values():
+                self.assertNotIn('params', stats)
+        self.assertNotIn(self.client.session.session_key, repr(cache.get(f'performance:{_worker()}')))
+
+    @override_settings(PERF_SLOW_QUERY_MS=0.001)
+    def test_slow_queries_logged(self):
+        with self.assertLogs('students.profiling', 'WARNING') as logs:
+            self.client.get(reverse('students_list'))
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['view'], 'students_list')
+        self.assertIn('origin', line)
+        self.assertIn('?', line['fingerprint'])
+
+    def test_explain(self):
+        sql, params = Student.objects.filter(pk=1).query.sql_with_params()
+        plan = explain(sql, params)
+        self.assertTrue(any('students_student' in line for line in plan))
+        with self.assertRaises(ValueError):
+            explain('DELETE FROM students_student')
+        self.assertEqual(Student.objects.count(), 3)
+
+    def test_query_report(self):
+        out = io.StringIO()
+        call_command('query_report', '--run', '--view', 'students_list', '--explain', '--limit', '3', stdout=out)
+        report = out.getvalue()
+        self.assertIn('students_list', report)
+        self.assertRegex(report, r'\n  1 +[\d.]+ +[\d.]+ +[\d.]+ +\d+  students_list')
+        self.assertIn('from students/', report)
+        self.assertNotIn('benchmark.py', report)
+        self.assertIn('    | ', report)
+
+        # Without --run it reads what the workers published to the cache
+        registry.clear()
+        cache.clear()
+        self.client.get(reverse('lockers_list'))
+        out = io.StringIO()
+        call_command('query_report', '--sort', 'count', stdout=out)
+        self.assertIn('lockers_list', out.getvalue())
+        out = io.StringIO()
+        call_command('query_report', '--explain', stdout=out)
+        self.assertIn('plan: parameters not recorded (explain needs --run)', out.getvalue())
+        self.assertFalse(registry.params)
+
+
+class ConnectionSettingsTests(TransactionTestCase):
+    def test_connections_persist_with_health_checks(self):
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], 60)
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', connection.settings_dict['OPTIONS'])
+
+    def test_benchmark_connections(self):
+        original = dict(connection.settings_dict)
+        out = io.StringIO()
+        call_command('benchmark_connections', '--cycles', '5', stdout=out)
+        report = out.getvalue()
+        self.assertIn('Database: sqlite', report)
+        self.assertRegex(report, r'\nfresh +[\d.]+ +[\d.]+ +[\d.]+ +\d+')
+        self.assertRegex(report, r'\npersistent +[\d.]+ +[\d.]+ +[\d.]+ +[01]\n')
+        self.assertIn('pool         skipped: needs PostgreSQL', report)
+        self.assertIn('persistent: ', report)
+        self.assertEqual(connection.settings_dict, original)
+
+
+@override_settings(PERF_SAMPLE_RATE=1)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', password='password', is_staff=True)
+        seed_students(25)
+        ContactLead.objects.bulk_create([
+            ContactLead(name=f'Lead {i}', email=f'lead{i}@example.com', mobile=f'70000000{i:02d}') for i in range(25)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def _page(self, content):
+        return re.sub(r'name="csrfmiddlewaretoken" value="[^"]+"', '', content.decode())
+
+    async def test_async_pages_match_sync_pages(self):
+        urls = [reverse(name) for name in ASYNC_PAGES] + [
+            reverse('students_list') + '?filter=active', reverse('students_list') + '?q=Student+1',
+            reverse('students_list') + '?q=tudent+1',
+            reverse('lockers_list') + '?q=L',
+        ]
+        sync_pages = {}
+        for url in urls:
+            response = await sync_to_async(self.client.get)(url)
+            self.assertEqual(response.status_code, 200, url)
+            sync_pages[url] = self._page(response.content)
+
+        with views_mode(True):
+            self.assertTrue(iscoroutinefunction(resolve(reverse('dashboard')).func))
+            for url in urls:
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                self.assertEqual(self._page(response.content), sync_pages[url], url)
+                # Queries run in sync_to_async threads are still counted
+                self.assertNotIn('desc="0 queries"', response['Server-Timing'], url)
+        self.assertFalse(iscoroutinefunction(resolve(reverse('dashboard')).func))
+
+    async def test_async_pagination(self):
+        first = await sync_to_async(self.client.get)(reverse('contact_leads'))
+        cursor = re.search(r'\?(cursor=[^"&]+)', first.content.decode()).group(1)
+        with views_mode(True):
+            response = await self.async_client.get(f'{reverse("contact_leads")}?{cursor}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['leads'].number, 2)
+        self.assertEqual(len(response.context['leads']), min(await ContactLead.objects.acount() - 20, 20))
+
+    async def test_login_required(self):
+        await self.async_client.alogout()
+        with views_mode(True):
+            response = await self.async_client.get(reverse('finance_dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+
+class AsyncBenchmarkTests(TransactionTestCase):
+    def test_benchmark_async(self):
+        seed_students(5)
+        out = io.StringIO()
+        call_command('benchmark_async', '--requests', '10', '--concurrency', '2', stdout=out)
+        report = out.getvalue()
+        self.assertRegex(report, r'\nwsgi +[\d.]+ +[\d.]+ +[\d.]+ +0\n')
+        self.assertRegex(report, r'\nasgi +[\d.]+ +[\d.]+ +[\d.]+ +0\n')
+        self.assertFalse(iscoroutinefunction(resolve(reverse('students_list')).func))
@@ -1,25 +1,40 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Read-heavy pages, served by coroutines when running under ASGI
+pages = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.dashboard, name='dashboard'),
+    path('', pages.dashboard, name='dashboard'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
-    path('students/', views.students_list, name='students_list'),
+    path('students/', pages.students_list, name='students_list'),
     path('students/create/', views.student_create, name='student_create'),
     path('students/<int:student_id>/', views.student_detail, name='student_detail'),
     path('students/<int:student_id>/edit/', views.student_update, name='student_update'),
     path('students/<int:student_id>/delete/', views.student_delete, name='student_delete'),
     path('students/<int:student_id>/admission/', views.admission_create, name='admission_create'),
+    path('seats/available/', views.seats_available, name='seats_available'),
+    path('seats/occupancy/', views.seat_occupancy, name='seat_occupancy'),
+    path('seats/occupancy/data/', views.seat_occupancy_data, name='seat_occupancy_data'),
     path('students/<int:student_id>/locker/', views.locker_create, name='locker_create'),
     path('students/<int:student_id>/payment/', views.payment_create, name='payment_create'),
     path('lockers/<int:locker_id>/edit/', views.locker_update, name='locker_update'),
     path('lockers/<int:locker_id>/delete/', views.locker_delete, name='locker_delete'),
     path('payments/<int:payment_id>/edit/', views.payment_update, name='payment_update'),
     path('payments/<int:payment_id>/delete/', views.payment_delete, name='payment_delete'),
-    path('leads/', views.contact_leads, name='contact_leads'),
-    path('finance/', views.finance_dashboard, name='finance_dashboard'),
+    path('leads/', pages.contact_leads, name='contact_leads'),
+    path('finance/', pages.finance_dashboard, name='finance_dashboard'),
+    path('finance/defaulters/', views.defaulters, name='defaulters'),
     path('students/export-csv/', views.export_students_csv, name='export_students_csv'),
     path('add-locker/', views.add_locker, name='add_locker'),
-    path('lockers/', views.lockers_list, name='lockers_list'),
+    path('lockers/', pages.lockers_list, name='lockers_list'),
+    path('exports/', views.export_jobs, name='export_jobs'),
+    path('exports/<int:job_id>/status/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
+    path('imports/', views.import_jobs, name='import_jobs'),
+    path('imports/<int:job_id>/status/', views.import_job_status, name='import_job_status'),
+    path('imports/<int:job_id>/errors/', views.import_job_errors, name='import_job_errors'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,16 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.db import IntegrityError, transaction
 from django.db.models import Sum, Count, Q
-from datetime import datetime, timedelta
-from django.utils.timezone import now
-from .models import Student, Admission, Locker, Payment, ContactLead, TotalLockers
-from django.core.paginator import Paginator
-import csv
-from django.core.serializers.json import DjangoJSONEncoder
-import json
+from datetime import date, datetime, timedelta
+import os
+from .models import Student, Admission, Locker, Payment, ContactLead, TotalLockers, ExportJob, ImportJob, Seat, Slot
+from .kpis import cached_revenue_totals, cached_student_counts, percentage_change
+from .cache import fragment_context
+from .pagination import KeysetPaginator, estimate_count
+from .dues import close_charges, students_owing, with_dues
+from .search import filter_students, substring_fallback
+from .exports import stream_student_csv
+from .performance import exposition
+from .export_jobs import create_job
+from .imports import create_import
+from .downloads import ranged_file_response
+from .images import prepare_upload, process_student_photo
+from .seating import available_seats, is_double_booking
+from .occupancy import cached_occupancy, week_start
+from .lockers import (
+    LockerUnavailable, assign_locker, release_lockers, parse_locker_numbers, locker_numbers_from_csv, provision_lockers,
+)
 
 def user_login(request):
     if request.method == 'POST':
@@ -28,41 +45,18 @@ def user_logout(request):
     logout(request)
     return redirect('login')
 
-@login_required
-def dashboard(request):
-    # Cleanup expired admissions
-    today = now().date()
-    expired_admissions = Admission.objects.filter(end_date__lt=today)
-
-    for admission in expired_admissions:
-        student = admission.student
-        # Unassign lockers for this student (delete Locker records, but keep TotalLockers entities)
-        lockers_to_unassign = Locker.objects.filter(student=student)
-        for locker in lockers_to_unassign:
-            # Mark the underlying TotalLockers as available again
-            locker.total_locker.is_available = True
-            locker.total_locker.save()
-            # Delete the Locker record to remove the assignment
-            locker.delete()
-        
-        # Delete the admission
-        admission.delete()
-        
-        # Update student status to Inactive
-        student.status = 'Inactive'
-        student.save()
-
+def dashboard_context(revenue, counts):
     # Finance calculations
-    total_registration = Payment.objects.filter(payment_type='Registration').aggregate(Sum('amount'))['amount__sum'] or 0
-    total_admission = Payment.objects.filter(payment_type='Admission').aggregate(Sum('amount'))['amount__sum'] or 0
-    total_locker = Payment.objects.filter(payment_type='Locker').aggregate(Sum('amount'))['amount__sum'] or 0
+    total_registration = revenue['total_registration']
+    total_admission = revenue['total_admission']
+    total_locker = revenue['total_locker']
     total_revenue = total_registration + total_admission + total_locker
     
     # Student counts
-    total_students = Student.objects.count()
-    active_students = Student.objects.filter(status='Active').count()
-    inactive_students = Student.objects.filter(status='Inactive').count()
-    expiring_soon = Student.objects.filter(status='Expiring Soon').count()
+    total_students = counts['total_students']
+    active_students = counts['active_students']
+    inactive_students = counts['inactive_students']
+    expiring_soon = counts['expiring_soon']
     
     context = {
         'total_revenue': total_revenue,
@@ -74,42 +68,27 @@ def dashboard(request):
         'inactive_students': inactive_students,
         'expiring_soon': expiring_soon,
     }
-    return render(request, 'dashboard.html', context)
+    return context
+
 @login_required
-def students_list(request):
-    filter_type = request.GET.get('filter', 'all')
-    search_query = request.GET.get('q', '')
-    hours_filter = request.GET.get('hours', '')
-    
-    if filter_type == 'active':
-        students = Student.objects.filter(status='Active')
-    elif filter_type == 'inactive':
-        students = Student.objects.filter(status='Inactive')
-    elif filter_type == 'expiring':
-        students = Student.objects.filter(status='Expiring Soon')
-    elif filter_type == 'reserved':
-        students = Student.objects.filter(admissions__seat_type='Reserved').distinct()
-    elif filter_type == 'non_reserved':
-        students = Student.objects.filter(admissions__seat_type='Non-Reserved').distinct()
-    else:
-        students = Student.objects.all()
-    
-    if hours_filter:
-        students = students.filter(admissions__hours=hours_filter).distinct()
-    
-    if search_query:
-        students = students.filter(
-            Q(id__icontains=search_query) |
-            Q(name__icontains=search_query)
-        )
+def dashboard(request):
+    context = dashboard_context(cached_revenue_totals(), cached_student_counts())
+    return render(request, 'dashboard.html', context)
+
+def students_list_filters(request):
+    query = request.GET
+    return query.get('filter', 'all'), query.get('hours', ''), query.get('q', ''), query.get('match') == 'substring'
 
-    paginator = Paginator(students, 10)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+def substring_search(request):
+    """Switch ``request`` to the substring search, so page links and exports keep it."""
+    request.GET = request.GET.copy()
+    request.GET['match'] = 'substring'
+    return students_list_filters(request)
 
+def students_list_context(request, page_obj):
+    filter_type, hours_filter, search_query, substrings = students_list_filters(request)
     query_params = request.GET.copy()
-    if 'page' in query_params:
-        del query_params['page']
+    query_params.pop('cursor', None)
     query_string = query_params.urlencode()
 
     context = {
@@ -118,15 +97,27 @@ def students_list(request):
         'search_query': search_query,
         'hours_filter': hours_filter,
         'query_string': query_string,
+        'substrings': substrings,
         'hour_choices': Admission.HOUR_CHOICES,
     }
+    return context
+
+@login_required
+def students_list(request):
+    filters = students_list_filters(request)
+    page_obj = KeysetPaginator(filter_students(*filters), 10).get_page(request.GET)
+    if not page_obj and substring_fallback(*filters[2:]):
+        filters = substring_search(request)
+        page_obj = KeysetPaginator(filter_students(*filters), 10).get_page(request.GET)
+
+    context = {**students_list_context(request, page_obj), **fragment_context('students')}
     return render(request, 'students/list.html', context)
 
 @login_required
 def student_detail(request, student_id):
     student = get_object_or_404(Student, id=student_id)
     admissions = student.admissions.all()
-    lockers = student.lockers.all()
+    lockers = student.lockers.select_related('total_locker')
     payments = student.payments.all()
     
     context = {
@@ -153,8 +144,10 @@ def student_create(request):
                 parent_mobile=request.POST['parent_mobile'],
                 registration_fees=request.POST.get('registration_fees', 200.00),
                 status='Inactive',  # Set default status to Inactive
-                photo=request.FILES.get('photo')
+                photo=prepare_upload(request.FILES['photo']) if request.FILES.get('photo') else None
             )
+            if student.photo:
+                process_student_photo(student)
             messages.success(request, 'Student added successfully!')
             return redirect('student_detail', student_id=student.id)
         except Exception as e:
@@ -178,12 +171,13 @@ def student_update(request, student_id):
             student.mother_name = request.POST['mother_name']
             student.parent_mobile = request.POST['parent_mobile']
             student.registration_fees = request.POST.get('registration_fees', 200.00)
-            student.status = request.POST['status']
             
             if request.FILES.get('photo'):
-                student.photo = request.FILES['photo']
+                student.photo = prepare_upload(request.FILES['photo'])
                 
             student.save()
+            if request.FILES.get('photo'):
+                process_student_photo(student)
             messages.success(request, 'Student updated successfully!')
             return redirect('student_detail', student_id=student.id)
         except Exception as e:
@@ -198,7 +192,9 @@ def student_delete(request, student_id):
     
     if request.method == 'POST':
         try:
-            student.delete()
+            with transaction.atomic():
+                release_lockers(student.lockers.all())
+                student.delete()
             messages.success(request, 'Student deleted successfully!')
             return redirect('students_list')
         except Exception as e:
@@ -213,50 +209,99 @@ def admission_create(request, student_id):
     student = get_object_or_404(Student, id=student_id)
     
     if request.method == 'POST':
+        slot = Slot.objects.filter(id=request.POST['slot']).first() if request.POST.get('slot') else None
+        seat = Seat.objects.filter(id=request.POST['seat'], is_active=True).first() if request.POST.get('seat') else None
         try:
-            Admission.objects.filter(student=student).delete()
-            admission = Admission.objects.create(
-                student=student,
-                start_date=request.POST['start_date'],
-                end_date=request.POST['end_date'],
-                hours=request.POST['hours'],
-                slot_timing=request.POST['slot_timing'],
-                seat_number=request.POST['seat_number'],
-                seat_type=request.POST['seat_type'],
-                admission_fees=request.POST.get('admission_fees', 1900.00)
-            )
-            # Update student status to Active
-            student.status = 'Active'
-            student.save()
+            if seat and not slot:
+                raise ValueError('Choose a slot to book a fixed seat.')
+            with transaction.atomic():
+                previous = Admission.objects.filter(student=student)
+                close_charges(previous)
+                previous.delete()
+                admission = Admission.objects.create(
+                    student=student,
+                    start_date=request.POST['start_date'],
+                    end_date=request.POST['end_date'],
+                    hours=request.POST['hours'],
+                    slot=slot,
+                    seat=seat,
+                    slot_timing=request.POST.get('slot_timing', ''),
+                    seat_number=request.POST.get('seat_number', '--'),
+                    seat_type=request.POST['seat_type'],
+                    admission_fees=request.POST.get('admission_fees', 1900.00)
+                )
             messages.success(request, 'Admission details added successfully!')
             return redirect('student_detail', student_id=student.id)
+        except IntegrityError as e:
+            if is_double_booking(e):
+                messages.error(request, f'Seat {seat.number} is already booked during that slot for some of those dates.')
+            else:
+                messages.error(request, f'Error creating admission: {str(e)}')
         except Exception as e:
             messages.error(request, f'Error creating admission: {str(e)}')
     
-    context = {'student': student}
+    context = {'student': student, 'slots': Slot.objects.all()}
     return render(request, 'admissions/create.html', context)
 
+
+@login_required
+def seats_available(request):
+    try:
+        start_date = date.fromisoformat(request.GET['start_date'])
+        end_date = date.fromisoformat(request.GET['end_date'])
+        slot = Slot.objects.get(id=request.GET['slot'])
+    except (KeyError, ValueError, Slot.DoesNotExist):
+        return JsonResponse({'error': 'start_date, end_date and slot are required.'}, status=400)
+    if end_date < start_date:
+        return JsonResponse({'error': 'end_date is before start_date.'}, status=400)
+
+    seats = available_seats(start_date, end_date, slot, request.GET.get('seat_type'))
+    return JsonResponse({
+        'seats': list(seats.values('id', 'number', 'seat_type')),
+    })
+
+
+def _occupancy_week(request):
+    try:
+        return week_start(date.fromisoformat(request.GET['start']))
+    except (KeyError, ValueError):
+        return week_start(timezone.localdate())
+
+
+@login_required
+def seat_occupancy(request):
+    start = _occupancy_week(request)
+    context = {
+        'start': start,
+        'previous_week': start - timedelta(days=7),
+        'next_week': start + timedelta(days=7),
+    }
+    return render(request, 'seats/occupancy.html', context)
+
+
+@login_required
+def seat_occupancy_data(request):
+    return JsonResponse(cached_occupancy(_occupancy_week(request)))
+
 @login_required
 def locker_create(request, student_id):
     student = get_object_or_404(Student, id=student_id)
     
     if request.method == 'POST':
         try:
-            locker_number = request.POST['locker_number']
-            total_locker = get_object_or_404(TotalLockers, locker_number=locker_number, is_available=True)
-            locker = Locker.objects.create(
-                student=student,
-                total_locker=total_locker,
+            locker = assign_locker(
+                student,
+                locker_number=request.POST.get('locker_number') or None,
                 required=request.POST.get('required') == 'on',
                 security_fees=request.POST.get('security_fees', 300.00),
                 start_date=request.POST['start_date'],
                 end_date=request.POST['end_date'],
                 monthly_fees=request.POST.get('monthly_fees', 100.00)
             )
-            messages.success(request, 'Locker assigned successfully!')
+            messages.success(request, f'Locker {locker.total_locker.locker_number} assigned successfully!')
             return redirect('student_detail', student_id=student.id)
-        except TotalLockers.DoesNotExist:
-            messages.error(request, 'Selected locker is not available.')
+        except LockerUnavailable as e:
+            messages.error(request, str(e))
         except Exception as e:
             messages.error(request, f'Error creating locker: {str(e)}')
     
@@ -266,7 +311,7 @@ def locker_create(request, student_id):
 
 @login_required
 def locker_update(request, locker_id):
-    locker = get_object_or_404(Locker, id=locker_id)
+    locker = get_object_or_404(Locker.objects.select_related('student', 'total_locker'), id=locker_id)
     
     if request.method == 'POST':
         try:
@@ -287,17 +332,16 @@ def locker_update(request, locker_id):
 
 @login_required
 def locker_delete(request, locker_id):
-    locker = get_object_or_404(Locker, id=locker_id)
+    locker = get_object_or_404(Locker.objects.select_related('student', 'total_locker'), id=locker_id)
     student_id = locker.student.id
     
     if request.method == 'POST':
-        try:
+        with transaction.atomic():
+            # Fees already owed for the locker stay on the student's balance
+            close_charges(lockers=Locker.objects.filter(pk=locker.pk))
             locker.delete()
-            messages.success(request, 'Locker removed successfully!')
-            return redirect('student_detail', student_id=student_id)
-        except Exception as e:
-            messages.error(request, f'Error deleting locker: {str(e)}')
-            return redirect('student_detail', student_id=student_id)
+        messages.success(request, 'Locker removed successfully!')
+        return redirect('student_detail', student_id=student_id)
     
     context = {'locker': locker, 'student': locker.student}
     return render(request, 'lockers/confirm_delete.html', context)
@@ -308,14 +352,15 @@ def payment_create(request, student_id):
     
     if request.method == 'POST':
         try:
-            payment = Payment.objects.create(
-                student=student,
-                amount=request.POST['amount'],
-                payment_date=request.POST['payment_date'],
-                payment_mode=request.POST['payment_mode'],
-                payment_type=request.POST['payment_type'],
-                remarks=request.POST.get('remarks', '')
-            )
+            with transaction.atomic():
+                payment = Payment.objects.create(
+                    student=student,
+                    amount=request.POST['amount'],
+                    payment_date=request.POST['payment_date'],
+                    payment_mode=request.POST['payment_mode'],
+                    payment_type=request.POST['payment_type'],
+                    remarks=request.POST.get('remarks', '')
+                )
             messages.success(request, 'Payment recorded successfully!')
             return redirect('student_detail', student_id=student.id)
         except Exception as e:
@@ -326,17 +371,18 @@ def payment_create(request, student_id):
 
 @login_required
 def payment_update(request, payment_id):
-    payment = get_object_or_404(Payment, id=payment_id)
+    payment = get_object_or_404(Payment.objects.select_related('student'), id=payment_id)
     
     if request.method == 'POST':
         try:
-            payment.amount = request.POST['amount']
-            payment.payment_date = request.POST['payment_date']
-            payment.payment_mode = request.POST['payment_mode']
-            payment.payment_type = request.POST['payment_type']
-            payment.remarks = request.POST.get('remarks', '')
-            
-            payment.save()
+            with transaction.atomic():
+                payment.amount = request.POST['amount']
+                payment.payment_date = request.POST['payment_date']
+                payment.payment_mode = request.POST['payment_mode']
+                payment.payment_type = request.POST['payment_type']
+                payment.remarks = request.POST.get('remarks', '')
+                
+                payment.save()
             messages.success(request, 'Payment updated successfully!')
             return redirect('student_detail', student_id=payment.student.id)
         except Exception as e:
@@ -347,12 +393,13 @@ def payment_update(request, payment_id):
 
 @login_required
 def payment_delete(request, payment_id):
-    payment = get_object_or_404(Payment, id=payment_id)
+    payment = get_object_or_404(Payment.objects.select_related('student'), id=payment_id)
     student_id = payment.student.id
     
     if request.method == 'POST':
         try:
-            payment.delete()
+            with transaction.atomic():
+                payment.delete()
             messages.success(request, 'Payment deleted successfully!')
             return redirect('student_detail', student_id=student_id)
         except Exception as e:
@@ -365,151 +412,67 @@ def payment_delete(request, payment_id):
 @login_required
 def contact_leads(request):
     leads = ContactLead.objects.all()
-    paginator = Paginator(leads, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = KeysetPaginator(leads, 20).get_page(request.GET)
     
     context = {'leads': page_obj}
     return render(request, 'leads/list.html', context)
 
 @login_required
-def finance_dashboard(request):
-    today = datetime.now()
-    current_month_start = today.replace(day=1)
-    last_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
-    
-    current_month_revenue = Payment.objects.filter(
-        payment_date__gte=current_month_start
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    last_month_revenue = Payment.objects.filter(
-        payment_date__gte=last_month_start,
-        payment_date__lt=current_month_start
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
+def defaulters(request):
+    owing = students_owing()
+    page_obj = KeysetPaginator(with_dues(owing), 20).get_page(request.GET)
+
+    context = {
+        'students': page_obj,
+        'total_due': owing.aggregate(total=Sum('balance_due'))['total'] or 0,
+    }
+    return render(request, 'finance/defaulters.html', context)
+
+def finance_context(revenue, recent_payments):
+    current_month_revenue = revenue['current_month_revenue']
+    last_month_revenue = revenue['last_month_revenue']
     
-    percentage_change = ((current_month_revenue - last_month_revenue) / last_month_revenue * 100) if last_month_revenue > 0 else (100 if current_month_revenue > 0 else 0)
+    change = percentage_change(current_month_revenue, last_month_revenue)
     
-    total_registration = Payment.objects.filter(payment_type='Registration').aggregate(Sum('amount'))['amount__sum'] or 0
-    total_admission = Payment.objects.filter(payment_type='Admission').aggregate(Sum('amount'))['amount__sum'] or 0
-    total_locker = Payment.objects.filter(payment_type='Locker').aggregate(Sum('amount'))['amount__sum'] or 0
-    total_monthly = Payment.objects.filter(payment_type='Monthly').aggregate(Sum('amount'))['amount__sum'] or 0
+    total_registration = revenue['total_registration']
+    total_admission = revenue['total_admission']
+    total_locker = revenue['total_locker']
+    total_monthly = revenue['total_monthly']
     
     total_revenue = total_registration + total_admission + total_locker + total_monthly
     
-    recent_payments = Payment.objects.all()[:10]
-    
     context = {
         'total_revenue': total_revenue,
         'current_month_revenue': current_month_revenue,
-        'percentage_change': round(percentage_change, 1),
+        'percentage_change': round(change, 1),
         'total_registration': total_registration,
         'total_admission': total_admission,
         'total_locker': total_locker,
         'total_monthly': total_monthly,
         'recent_payments': recent_payments,
     }
+    return context
+
+@login_required
+def finance_dashboard(request):
+    recent_payments = Payment.objects.select_related('student')[:10]
+    context = {
+        **finance_context(cached_revenue_totals(), recent_payments),
+        **fragment_context('payments', 'students'),
+    }
     return render(request, 'finance/dashboard.html', context)
 
 @login_required
 def export_students_csv(request):
-    filter_type = request.GET.get('filter', 'all')
-    search_query = request.GET.get('q', '')
-    hours_filter = request.GET.get('hours', '')
-
-    if filter_type == 'active':
-        students = Student.objects.filter(status='Active')
-    elif filter_type == 'inactive':
-        students = Student.objects.filter(status='Inactive')
-    elif filter_type == 'expiring':
-        students = Student.objects.filter(status='Expiring Soon')
-    elif filter_type == 'reserved':
-        students = Student.objects.filter(admissions__seat_type='Reserved').distinct()
-    elif filter_type == 'non_reserved':
-        students = Student.objects.filter(admissions__seat_type='Non-Reserved').distinct()
-    else:
-        students = Student.objects.all()
-
-    if hours_filter:
-        students = students.filter(admissions__hours=hours_filter).distinct()
+    students = filter_students(*students_list_filters(request))
 
-    if search_query:
-        students = students.filter(
-            Q(id__icontains=search_query) |
-            Q(name__icontains=search_query)
-        )
-
-    students = students.prefetch_related('admissions', 'lockers', 'payments')
-
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(stream_student_csv(students), content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="students_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow([
-        'ID', 'Name', 'Email', 'Mobile', 'Date of Birth', 'Aadhaar Number', 'Address',
-        'Father Name', 'Mother Name', 'Parent Mobile', 'Registration Fees', 'Status',
-        'Date Added', 'Photo URL', 'Admissions', 'Lockers', 'Payments'
-    ])
-
-    for student in students:
-        admissions_data = json.dumps([
-            {
-                'start_date': a.start_date.strftime('%Y-%m-%d') if a.start_date else '',
-                'end_date': a.end_date.strftime('%Y-%m-%d') if a.end_date else '',
-                'hours': a.hours,
-                'slot_timing': a.slot_timing,
-                'seat_number': a.seat_number,
-                'seat_type': a.seat_type,
-                'admission_fees': str(a.admission_fees)
-            } for a in student.admissions.all()
-        ], cls=DjangoJSONEncoder)
-
-        lockers_data = json.dumps([
-            {
-                'required': l.required,
-                'security_fees': str(l.security_fees),
-                'start_date': l.start_date.strftime('%Y-%m-%d') if l.start_date else '',
-                'end_date': l.end_date.strftime('%Y-%m-%d') if l.end_date else '',
-                'locker_number': l.total_locker.locker_number,
-                'monthly_fees': str(l.monthly_fees)
-            } for l in student.lockers.all()
-        ], cls=DjangoJSONEncoder)
-
-        payments_data = json.dumps([
-            {
-                'amount': str(p.amount),
-                'payment_date': p.payment_date.strftime('%Y-%m-%d') if p.payment_date else '',
-                'payment_mode': p.payment_mode,
-                'payment_type': p.payment_type,
-                'remarks': p.remarks
-            } for p in student.payments.all()
-        ], cls=DjangoJSONEncoder)
-
-        writer.writerow([
-            student.id,
-            student.name,
-            student.email,
-            student.mobile,
-            student.date_of_birth.strftime('%Y-%m-%d') if student.date_of_birth else '',
-            student.aadhaar_number,
-            student.address,
-            student.father_name,
-            student.mother_name,
-            student.parent_mobile,
-            str(student.registration_fees),
-            student.status,
-            student.created_at.strftime('%Y-%m-%d'),
-            student.photo.url if student.photo else '',
-            admissions_data,
-            lockers_data,
-            payments_data
-        ])
-
     return response
 
-@login_required
-def lockers_list(request):
-    search_query = request.GET.get('q', '')
-    assigned_lockers = Locker.objects.select_related('student', 'total_locker')
+def locker_querysets(search_query):
+    """Assigned lockers and free lockers matching the lockers page search."""
+    assigned_lockers = Locker.objects.select_related('student', 'total_locker').order_by('-created_at')
     available_lockers = TotalLockers.objects.filter(is_available=True)
 
     if search_query:
@@ -520,19 +483,19 @@ def lockers_list(request):
         available_lockers = available_lockers.filter(
             locker_number__icontains=search_query
         )
+    return assigned_lockers, available_lockers
 
-    paginator_assigned = Paginator(assigned_lockers, 10)
-    page_number_assigned = request.GET.get('page_assigned', 1)
-    page_obj_assigned = paginator_assigned.get_page(page_number_assigned)
-
-    paginator_available = Paginator(available_lockers, 10)
-    page_number_available = request.GET.get('page_available', 1)
-    page_obj_available = paginator_available.get_page(page_number_available)
+@login_required
+def lockers_list(request):
+    search_query = request.GET.get('q', '')
+    assigned_lockers, available_lockers = locker_querysets(search_query)
+    page_obj_assigned = KeysetPaginator(assigned_lockers, 10).get_page(request.GET)
 
     context = {
         'assigned_lockers': page_obj_assigned,
-        'available_lockers': page_obj_available,
+        'available_count': estimate_count(available_lockers),
         'search_query': search_query,
+        **fragment_context('lockers', 'students'),
     }
     return render(request, 'lockers/list.html', context)
 
@@ -541,13 +504,119 @@ def lockers_list(request):
 def add_locker(request):
     if request.method == 'POST':
         try:
-            locker_number = request.POST['new_locker_number']
-            if TotalLockers.objects.filter(locker_number=locker_number).exists():
-                messages.error(request, 'Locker number already exists.')
+            if request.FILES.get('lockers_csv'):
+                numbers = locker_numbers_from_csv(request.FILES['lockers_csv'])
+            else:
+                numbers = parse_locker_numbers(request.POST.get('new_locker_number', ''))
+            if not numbers:
+                messages.error(request, 'Enter a locker number, a range such as L001-L500, or upload a CSV.')
+                return redirect('lockers_list')
+            created, skipped = provision_lockers(numbers)
+            if created == 1 and not skipped:
+                messages.success(request, f'Locker {numbers[0]} added successfully!')
+            elif created:
+                messages.success(request, f'{created} lockers added successfully!' + (f' {skipped} already existed.' if skipped else ''))
             else:
-                TotalLockers.objects.create(locker_number=locker_number, is_available=True)
-                messages.success(request, f'Locker {locker_number} added successfully!')
+                messages.error(request, 'Locker number already exists.' if len(numbers) == 1 else 'All of those lockers already exist.')
             return redirect('lockers_list')
+        except ValueError as e:
+            messages.error(request, str(e))
         except Exception as e:
             messages.error(request, f'Error adding locker: {str(e)}')
-    return redirect('lockers_list')
\ No newline at end of file
+    return redirect('lockers_list')
+
+@login_required
+def export_jobs(request):
+    if request.method == 'POST':
+        try:
+            params = {key: request.POST.get(key, '') for key in ('filter', 'q', 'hours', 'match')}
+            job = create_job(
+                request.POST.get('kind', 'students'),
+                request.POST.get('format', 'csv'),
+                params=params,
+                user=request.user,
+            )
+            messages.success(request, f'Export #{job.id} queued. It will be ready to download shortly.')
+        except Exception as e:
+            messages.error(request, f'Error queuing export: {str(e)}')
+        return redirect('export_jobs')
+
+    jobs = ExportJob.objects.filter(created_by=request.user)[:20]
+    context = {
+        'jobs': jobs,
+        'kind_choices': ExportJob.KIND_CHOICES,
+        'format_choices': ExportJob.FORMAT_CHOICES,
+    }
+    return render(request, 'exports/list.html', context)
+
+
+@login_required
+def export_job_status(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, created_by=request.user)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'rows_total': job.rows_total,
+        'rows_written': job.rows_written,
+        'progress': job.progress,
+        'error': job.error,
+        'download_url': reverse('export_job_download', args=[job.id]) if job.status == 'Done' else None,
+    })
+
+
+@login_required
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, created_by=request.user, status='Done')
+    return ranged_file_response(request, job.file.path, os.path.basename(job.file.name))
+
+
+@login_required
+def import_jobs(request):
+    if request.method == 'POST':
+        try:
+            uploaded = request.FILES.get('file')
+            if not uploaded:
+                raise ValueError('Choose a file to import.')
+            job = create_import(request.POST.get('kind', 'students'), uploaded, user=request.user)
+            messages.success(request, f'Import #{job.id} queued. Rows are imported in batches as the file is read.')
+        except Exception as e:
+            messages.error(request, f'Error queuing import: {str(e)}')
+        return redirect('import_jobs')
+
+    jobs = ImportJob.objects.filter(created_by=request.user)[:20]
+    context = {
+        'jobs': jobs,
+        'kind_choices': ImportJob.KIND_CHOICES,
+    }
+    return render(request, 'imports/list.html', context)
+
+
+@login_required
+def import_job_status(request, job_id):
+    job = get_object_or_404(ImportJob, id=job_id, created_by=request.user)
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'rows_total': job.rows_total,
+        'rows_processed': job.rows_processed,
+        'rows_imported': job.rows_imported,
+        'rows_failed': job.rows_failed,
+        'progress': job.progress,
+        'error': job.error,
+        'error_report_url': reverse('import_job_errors', args=[job.id]) if job.error_report else None,
+    })
+
+
+@login_required
+def import_job_errors(request, job_id):
+    job = get_object_or_404(ImportJob.objects.exclude(error_report=''), id=job_id, created_by=request.user)
+    return ranged_file_response(request, job.error_report.path, os.path.basename(job.error_report.name))
+
+
+def metrics(request):
+    # Staff session, or the scraper's bearer token; no login redirect for machines
+    token = settings.PERF_METRICS_TOKEN
+    bearer = request.headers.get('Authorization', '')
+    if not request.user.is_staff and not (token and constant_time_compare(bearer, f'Bearer {token}')):
+        return HttpResponseForbidden('Staff only.')
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')